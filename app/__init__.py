@@ -1 +1,7 @@
-from .main import app
\ No newline at end of file
+def __getattr__(name):
+    # ``from app import app`` continua funcionando, mas importar um submódulo
+    # (ex.: app.startup, app.queries) não carrega mais a aplicação inteira
+    if name == "app":
+        from .main import app
+        return app
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -0,0 +1,140 @@
+import asyncio
+import json
+import logging
+from typing import Any, Awaitable, Callable, List, Optional
+
+from .parsing import extract_json
+
+logger = logging.getLogger(__name__)
+
+
+class MicroBatcher:
+    """Agrupa chamadas concorrentes em lotes curtos antes de enviá-las ao modelo.
+
+    Cada ``submit`` entra numa fila; o primeiro item abre uma janela de
+    ``window_ms`` e o lote fecha quando a janela expira ou quando chega a
+    ``max_batch`` itens. ``handler`` recebe a lista de itens e devolve uma
+    lista de resultados na mesma ordem (um ``Exception`` na posição falha só
+    aquele item). No máximo ``max_concurrency`` lotes rodam ao mesmo tempo.
+    """
+
+    def __init__(
+        self,
+        handler: Callable[[List[Any]], Awaitable[List[Any]]],
+        window_ms: float = 20,
+        max_batch: int = 16,
+        max_concurrency: int = 4,
+    ):
+        self.handler = handler
+        self.window = window_ms / 1000
+        self.max_batch = max(1, max_batch)
+        self.max_concurrency = max(1, max_concurrency)
+        self._queue: Optional[asyncio.Queue] = None
+        self._sem: Optional[asyncio.Semaphore] = None
+        self._task: Optional[asyncio.Task] = None
+        self._inflight: set = set()
+        self.batches = 0
+        self.items = 0
+
+    def _ensure_started(self) -> None:
+        if self._task is None or self._task.done():
+            self._queue = asyncio.Queue()
+            self._sem = asyncio.Semaphore(self.max_concurrency)
+            self._task = asyncio.get_running_loop().create_task(self._collect())
+
+    async def submit(self, item: Any) -> Any:
+        """Enfileira ``item`` e aguarda o resultado do lote em que ele entrar."""
+        self._ensure_started()
+        fut = asyncio.get_running_loop().create_future()
+        await self._queue.put((item, fut))
+        return await fut
+
+    async def _collect(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = []
+            try:
+                batch.append(await self._queue.get())
+                deadline = loop.time() + self.window
+                while len(batch) < self.max_batch:
+                    timeout = deadline - loop.time()
+                    if timeout <= 0:
+                        break
+                    try:
+                        batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+                    except asyncio.TimeoutError:
+                        break
+            finally:
+                # no cancelamento (close) o lote parcial já saiu da fila: despacha mesmo assim
+                if batch:
+                    self._start_dispatch(batch)
+
+    def _start_dispatch(self, batch: list) -> None:
+        task = asyncio.get_running_loop().create_task(self._dispatch(batch))
+        self._inflight.add(task)
+        task.add_done_callback(self._inflight.discard)
+
+    async def _dispatch(self, batch: list) -> None:
+        # descarta itens cujo cliente já desistiu (futuro cancelado)
+        batch = [(item, fut) for item, fut in batch if not fut.done()]
+        if not batch:
+            return
+        async with self._sem:
+            self.batches += 1
+            self.items += len(batch)
+            try:
+                results = await self.handler([item for item, _ in batch])
+                if len(results) != len(batch):
+                    raise RuntimeError(f"handler devolveu {len(results)} resultados para {len(batch)} itens")
+            except Exception as exc:
+                logger.warning(f"⚠️ Falha no lote de {len(batch)} itens: {exc}")
+                results = [exc] * len(batch)
+        for (_, fut), res in zip(batch, results):
+            if fut.done():
+                continue
+            if isinstance(res, BaseException):
+                fut.set_exception(res)
+            else:
+                fut.set_result(res)
+
+    async def close(self) -> None:
+        """Encerra o coletor, despacha o lote que estava sendo montado, aguarda os
+        lotes em andamento e falha o que ficou na fila."""
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        if self._inflight:
+            await asyncio.gather(*self._inflight, return_exceptions=True)
+        while self._queue is not None and not self._queue.empty():
+            _, fut = self._queue.get_nowait()
+            if not fut.done():
+                fut.set_exception(RuntimeError("MicroBatcher encerrado"))
+
+    def stats(self) -> dict:
+        return {
+            "batches": self.batches,
+            "items": self.items,
+            "avg_batch": self.items / self.batches if self.batches else 0.0,
+        }
+
+
+def build_batch_prompt(textos: List[str]) -> str:
+    """Monta um único prompt com várias reclamações identificadas por ``id``."""
+    itens = json.dumps([{"id": i, "reclamacao": t} for i, t in enumerate(textos)], ensure_ascii=False)
+    return (
+        "Classifique CADA reclamação abaixo de forma independente, seguindo as mesmas regras "
+        "de uma classificação individual. Responda somente com um array JSON, um objeto por "
+        'reclamação, contendo o campo "id" de entrada e os campos da classificação.\n'
+        f"{itens}"
+    )
+
+
+def split_batch_response(text: str, n: int) -> List[Optional[dict]]:
+    """Separa a resposta do prompt em lote por ``id``; itens ausentes voltam como None."""
+    data = extract_json(text, list) or []
+    out: List[Optional[dict]] = [None] * n
+    for obj in data:
+        if isinstance(obj, dict) and isinstance(obj.get("id"), int) and 0 <= obj["id"] < n:
+            out[obj["id"]] = {k: v for k, v in obj.items() if k != "id"}
+    return out
@@ -1,8 +1,39 @@
 import sqlite3
 
-def init_db():
-    with sqlite3.connect('classificacoes.db') as conn:
+DB_PATH = 'classificacoes.db'
+
+# Rollup diário por motivo/submotivo, mantido por gatilhos a cada escrita
+ROLLUP_TRIGGERS = [
+    '''CREATE TRIGGER IF NOT EXISTS trg_classificacoes_ins AFTER INSERT ON classificacoes
+       BEGIN
+           INSERT INTO classificacoes_diarias (dia, motivo, submotivo, total)
+           VALUES (date(NEW.timestamp), COALESCE(NEW.motivo, ''), COALESCE(NEW.submotivo, ''), 1)
+           ON CONFLICT(dia, motivo, submotivo) DO UPDATE SET total = total + 1;
+       END''',
+    '''CREATE TRIGGER IF NOT EXISTS trg_classificacoes_upd
+       AFTER UPDATE OF motivo, submotivo, timestamp ON classificacoes
+       BEGIN
+           UPDATE classificacoes_diarias SET total = total - 1
+           WHERE dia = date(OLD.timestamp)
+             AND motivo = COALESCE(OLD.motivo, '') AND submotivo = COALESCE(OLD.submotivo, '');
+           INSERT INTO classificacoes_diarias (dia, motivo, submotivo, total)
+           VALUES (date(NEW.timestamp), COALESCE(NEW.motivo, ''), COALESCE(NEW.submotivo, ''), 1)
+           ON CONFLICT(dia, motivo, submotivo) DO UPDATE SET total = total + 1;
+           DELETE FROM classificacoes_diarias WHERE total <= 0;
+       END''',
+    '''CREATE TRIGGER IF NOT EXISTS trg_classificacoes_del AFTER DELETE ON classificacoes
+       BEGIN
+           UPDATE classificacoes_diarias SET total = total - 1
+           WHERE dia = date(OLD.timestamp)
+             AND motivo = COALESCE(OLD.motivo, '') AND submotivo = COALESCE(OLD.submotivo, '');
+           DELETE FROM classificacoes_diarias WHERE total <= 0;
+       END''',
+]
+
+def init_db(db_path: str = DB_PATH):
+    with sqlite3.connect(db_path) as conn:
         cursor = conn.cursor()
+        cursor.execute('PRAGMA journal_mode=WAL')
         cursor.execute('''
             CREATE TABLE IF NOT EXISTS classificacoes (
                 id INTEGER PRIMARY KEY AUTOINCREMENT,
@@ -15,7 +46,39 @@ def init_db():
                 UNIQUE(user_id, session_id)
             )
         ''')
+        # Índices da listagem paginada (a ordem por id vem de graça: o rowid fecha cada índice)
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_classificacoes_user ON classificacoes(user_id)')
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_classificacoes_session ON classificacoes(session_id)')
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_classificacoes_motivo ON classificacoes(motivo, submotivo)')
+        # Índice de cobertura para contagens por período sem tocar na tabela
+        cursor.execute('DROP INDEX IF EXISTS idx_classificacoes_timestamp')
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_classificacoes_timestamp_motivo '
+                       'ON classificacoes(timestamp, motivo, submotivo)')
+
+        novo_rollup = cursor.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'classificacoes_diarias'"
+        ).fetchone() is None
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS classificacoes_diarias (
+                dia TEXT NOT NULL,
+                motivo TEXT NOT NULL,
+                submotivo TEXT NOT NULL,
+                total INTEGER NOT NULL,
+                PRIMARY KEY (dia, motivo, submotivo)
+            ) WITHOUT ROWID
+        ''')
+        if novo_rollup:
+            # bancos já existentes: popula o rollup uma única vez a partir da tabela
+            cursor.execute('''
+                INSERT INTO classificacoes_diarias (dia, motivo, submotivo, total)
+                SELECT date(timestamp), COALESCE(motivo, ''), COALESCE(submotivo, ''), COUNT(*)
+                FROM classificacoes
+                WHERE timestamp IS NOT NULL
+                GROUP BY 1, 2, 3
+            ''')
+        for trigger in ROLLUP_TRIGGERS:
+            cursor.execute(trigger)
         conn.commit()
 
 if __name__ == "__main__":
-    init_db()
\ No newline at end of file
+    init_db()
@@ -1,17 +1,30 @@
+import time
+_IMPORT_T0 = time.perf_counter()  # início do import (métrica de cold start)
+
 from dotenv import load_dotenv
 import os
-import re
 import json
-from langfuse import Langfuse, get_client, observe
-from fastapi import FastAPI, HTTPException, APIRouter
-from pydantic import BaseModel, Field
-from google.adk.sessions import InMemorySessionService
-from google.adk.runners import Runner
-from classificador.agent import root_agent
-from google.genai import types  # para Content / Part
-from contextlib import asynccontextmanager  # CHANGED: import para lifespan
-from classificador.agent import root_agent as classificador_agent
-from atendimento.agent import root_agent as atendimento_agent
+import uuid
+import asyncio
+import logging
+from datetime import date
+from typing import TYPE_CHECKING, Optional
+from fastapi import FastAPI, HTTPException, APIRouter, Query
+from pydantic import BaseModel
+from contextlib import asynccontextmanager
+from .sqlite_pool import ConnectionPool
+from .response_cache import ResponseCache
+from .batching import MicroBatcher, build_batch_prompt, split_batch_response
+from .persistence import ClassificationWriter
+from .queries import contagens_diarias, list_classificacoes
+from .parsing import Classificacao, ResponseParseError, parse_response, with_response_schema
+from .startup import Lazy, warm_up
+from .tracing import StubTraceClient, Tracer
+
+if TYPE_CHECKING:
+    from google.adk.runners import Runner
+
+logger = logging.getLogger(__name__)
 
 load_dotenv()  
 
@@ -26,38 +39,120 @@ LANGFUSE_PUBLIC = os.getenv("LANGFUSE_PUBLIC_KEY")
 LANGFUSE_HOST = os.getenv("LANGFUSE_HOST")
 LANGFUSE_ENVIRONMENT = os.getenv ("LANGFUSE_ENVIRONMENT")
 
-if not (LANGFUSE_SECRET and LANGFUSE_PUBLIC):
+# TRACING_EXPORTER: langfuse (padrão) | stub (traces ficam em memória, sem Langfuse)
+TRACING_EXPORTER = os.getenv("TRACING_EXPORTER", "langfuse").lower()
+
+if TRACING_EXPORTER == "langfuse" and not (LANGFUSE_SECRET and LANGFUSE_PUBLIC):
     raise RuntimeError("Langfuse keys não definidas no .env!")
 
-# Inicializa Langfuse com tracing habilitado
-langfuse = Langfuse(
-    secret_key=LANGFUSE_SECRET,
-    public_key=LANGFUSE_PUBLIC,
-    host=LANGFUSE_HOST,
-    environment=LANGFUSE_ENVIRONMENT,
-   )
+# Langfuse, ADK, agentes e Runners são construídos sob demanda (Lazy): no
+# aquecimento do lifespan ou, com STARTUP_WARMUP=off, no primeiro uso.
+# STARTUP_WARMUP: blocking (padrão) | background | off
+STARTUP_WARMUP = os.getenv("STARTUP_WARMUP", "blocking").lower()
 
-# -------- infraestrutura ADK --------
-session_service = InMemorySessionService()
+def _build_langfuse():
+    from langfuse import Langfuse
+
+    # Inicializa Langfuse com tracing habilitado
+    return Langfuse(
+        secret_key=LANGFUSE_SECRET,
+        public_key=LANGFUSE_PUBLIC,
+        host=LANGFUSE_HOST,
+        environment=LANGFUSE_ENVIRONMENT,
+    )
 
-runner_classificador = Runner(
-    app_name="classificador",
-    agent=classificador_agent,
-    session_service=session_service
+# Tracing amostrado e exportado em segundo plano (a rota nunca espera o Langfuse)
+tracer = Tracer(
+    client=Lazy(_build_langfuse, "langfuse") if TRACING_EXPORTER == "langfuse" else Lazy(StubTraceClient, "tracing_stub"),
+    sample_rate=float(os.getenv("TRACE_SAMPLE_RATE", "1.0")),
+    max_payload_chars=int(os.getenv("TRACE_MAX_PAYLOAD_CHARS", "2000")),
+    max_queue=int(os.getenv("TRACE_QUEUE_SIZE", "1000")),
 )
+observe = tracer.observe
+
+# -------- infraestrutura ADK --------
+def _build_session_service():
+    from .session_store import SQLiteSessionService
+
+    # Sessões persistidas em SQLite (WAL), compartilháveis entre workers do uvicorn
+    return SQLiteSessionService(
+        db_path=os.getenv("SESSION_DB_PATH", "sessions.db"),
+        pool_size=int(os.getenv("SESSION_DB_POOL_SIZE", "4")),
+        ttl_seconds=float(os.getenv("SESSION_TTL_SECONDS", str(7 * 24 * 3600))),
+        hot_size=int(os.getenv("SESSION_HOT_SIZE", "1024")),
+    )
+
+def _build_runner_classificador():
+    from google.adk.runners import Runner
+    from classificador.agent import root_agent as classificador_agent
+
+    # Saída estruturada (response schema) opcional, numa cópia do classificador;
+    # o prompt em lote responde com um array, então nesse modo fica desligada.
+    # Sem ela, a resposta é validada por parse_response.
+    if os.getenv("CLASSIFY_RESPONSE_SCHEMA", "0") == "1" and CLASSIFY_BATCH_MODE != "prompt":
+        classificador_agent = with_response_schema(classificador_agent, Classificacao)
+    return Runner(
+        app_name="classificador",
+        agent=classificador_agent,
+        session_service=session_service.get()
+    )
+
+def _build_runner_atendimento():
+    from google.adk.runners import Runner
+    from atendimento.agent import root_agent as atendimento_agent
+
+    return Runner(
+        app_name="atendimento",
+        agent=atendimento_agent,
+        session_service=session_service.get()
+    )
+
+session_service = Lazy(_build_session_service, "session_service")
+runner_classificador = Lazy(_build_runner_classificador, "runner_classificador")
+runner_atendimento = Lazy(_build_runner_atendimento, "runner_atendimento")
 
-runner_atendimento = Runner(
-    app_name="atendimento",
-    agent=atendimento_agent,
-    session_service=session_service
+# Gravação em lote (write-behind) das classificações em classificacoes.db
+CLASSIFICACOES_DB_PATH = os.getenv("CLASSIFICACOES_DB_PATH", "classificacoes.db")
+classification_writer = ClassificationWriter(
+    db_path=CLASSIFICACOES_DB_PATH,
+    batch_size=int(os.getenv("CLASSIFICACOES_BATCH_SIZE", "200")),
+    flush_interval=float(os.getenv("CLASSIFICACOES_FLUSH_SECONDS", "0.5")),
 )
 
+startup_metrics = {"mode": STARTUP_WARMUP, "import_seconds": None, "startup_seconds": None}
+
+async def _warm_up():
+    """Aquece Langfuse, sessões e Runners numa thread, em paralelo ao resto do startup."""
+    try:
+        await asyncio.to_thread(warm_up, tracer.client, session_service, runner_classificador, runner_atendimento)
+    except Exception:
+        if STARTUP_WARMUP == "blocking":
+            raise
+        logger.exception("❌ Falha no aquecimento; os componentes serão criados no primeiro uso")
+
 @asynccontextmanager
 async def lifespan(app: FastAPI):
-    # startup logic (se necessário)…
+    # startup logic
+    global classificacoes_pool
+    t0 = time.perf_counter()
+    await tracer.start()
+    warmup = asyncio.create_task(_warm_up()) if STARTUP_WARMUP != "off" else None
+    await classification_writer.start()
+    classificacoes_pool = ConnectionPool(CLASSIFICACOES_DB_PATH, int(os.getenv("CLASSIFICACOES_POOL_SIZE", "2")))
+    if warmup is not None and STARTUP_WARMUP == "blocking":
+        await warmup
+    startup_metrics["startup_seconds"] = time.perf_counter() - t0
     yield
-    # shutdown logic: flush do Langfuse
-    get_client().flush()
+    # shutdown logic
+    if warmup is not None:
+        await asyncio.gather(warmup, return_exceptions=True)
+    if classify_batcher is not None:
+        await classify_batcher.close()
+    await classification_writer.close()
+    classificacoes_pool.close()
+    await tracer.close()  # exporta o que restou e faz o flush do Langfuse
+    if session_service.ready:
+        session_service.get().close()
 
 # -------- FastAPI --------
 app = FastAPI(
@@ -69,17 +164,49 @@ app = FastAPI(
 
 router = APIRouter()
 
+# Cache de respostas do classificador (invalidado quando app.version muda)
+classify_cache = ResponseCache(
+    version=app.version,
+    max_entries=int(os.getenv("CLASSIFY_CACHE_SIZE", "4096")),
+    ttl_seconds=float(os.getenv("CLASSIFY_CACHE_TTL_SECONDS", "3600")),
+    similarity=float(os.getenv("CLASSIFY_CACHE_SIMILARITY", "0")),  # 0 = só texto idêntico
+)
+
 class ClassifyRequest(BaseModel):
     user_id: str 
     session_id: str
     reclamacao: str
 
+
+async def run_agent(runner: "Runner", req: ClassifyRequest):
+    """Executa o agente sem bloquear o event loop e devolve o texto da resposta final.
+
+    Usa ``Runner.run_async`` e consome os eventos à medida que chegam, sem
+    acumulá-los em lista; outras requisições seguem sendo atendidas enquanto
+    a chamada ao LLM está em andamento.
+    """
+    from google.genai import types  # para Content / Part
+
+    user_content = types.Content(
+        role="user",
+        parts=[types.Part(text=req.reclamacao)]
+    )
+
+    final_text = None
+    async for event in runner.run_async(
+        user_id=req.user_id,
+        session_id=req.session_id,
+        new_message=user_content
+    ):
+        if final_text is None and event.is_final_response() and event.content and event.content.parts:
+            final_text = event.content.parts[0].text
+    return final_text
+
 # ---------- Rota Service ----------
 @router.post("/service")
 @observe() 
 async def service(req: ClassifyRequest):
-    client = get_client()
-    client.update_current_trace(
+    tracer.update(
         session_id=req.session_id,
         user_id=req.user_id,
         input=req.reclamacao,
@@ -87,123 +214,212 @@ async def service(req: ClassifyRequest):
         version=app.version, 
     )
 
-    sess = await session_service.get_session(
+    sessions = await session_service.aget()
+    sess = await sessions.get_session(
         app_name="atendimento",
         user_id=req.user_id,
         session_id=req.session_id
     )
     if sess is None:
-        sess = await session_service.create_session(
+        sess = await sessions.create_session(
             app_name="atendimento",
             user_id=req.user_id,
             session_id=req.session_id
         )
 
-    user_content = types.Content(
-        role="user",
-        parts=[types.Part(text=req.reclamacao)]
-    )
-
-    events = []
-    for event in runner_atendimento.run(
-        user_id=req.user_id,
-        session_id=req.session_id,
-        new_message=user_content
-    ):
-        events.append(event)
-
-    final_text = None
-    for ev in events:
-        if ev.is_final_response():
-            final_text = ev.content.parts[0].text
-            break
+    final_text = await run_agent(await runner_atendimento.aget(), req)
 
     if final_text is None:
         raise HTTPException(500, "Sem resposta do agente")
     
-    cleaned = final_text.replace("```json", "").replace("```", "").strip()
-    
     try:
-        payload = json.loads(cleaned)
-    except json.JSONDecodeError as exc:
+        payload = parse_response(final_text)
+    except ResponseParseError as exc:
         raise HTTPException(500, detail=f"JSON inválido: {exc}")
     
     payload["user_id"] = req.user_id
     payload["session_id"] = req.session_id
+    classification_writer.enqueue(req.user_id, req.session_id, req.reclamacao, payload)
 
-    client.update_current_trace(
+    tracer.update(
         output=payload,
         tags=["concluído"]
     )
     
     return payload
 
-# ---------- Rota classify ----------
-@router.post("/classify")
-@observe() 
-async def classify(req: ClassifyRequest):
-    client = get_client()
-    client.update_current_trace(
-        session_id=req.session_id,
-        user_id=req.user_id,
-        input=req.reclamacao,
-        metadata={"environment": LANGFUSE_ENVIRONMENT, "tag": "classificação"},
-        version=app.version,
-    )
-
-    sess = await session_service.get_session(
+# ---------- Classificação (individual ou em lote) ----------
+async def classify_one(req: ClassifyRequest):
+    sessions = await session_service.aget()
+    sess = await sessions.get_session(
         app_name="classificador",
         user_id=req.user_id,
         session_id=req.session_id
     )
     if sess is None:
-        sess = await session_service.create_session(
+        sess = await sessions.create_session(
             app_name="classificador",
             user_id=req.user_id,
             session_id=req.session_id
         )
+    return await run_agent(await runner_classificador.aget(), req)
 
-    user_content = types.Content(
-        role="user",
-        parts=[types.Part(text=req.reclamacao)]
+
+async def classify_fanout(reqs: list):
+    """Lote em fan-out: uma chamada por requisição, todas em paralelo."""
+    return await asyncio.gather(*(classify_one(r) for r in reqs), return_exceptions=True)
+
+
+async def classify_prompt(reqs: list):
+    """Lote em prompt único: uma chamada ao modelo para todas as reclamações.
+
+    Itens que o modelo não devolver (ou devolver sem ``id`` válido) caem
+    para o fan-out individual.
+    """
+    if len(reqs) == 1:
+        return await classify_fanout(reqs)
+    batch_req = ClassifyRequest(
+        user_id="batch",
+        session_id=f"batch-{uuid.uuid4().hex}",
+        reclamacao=build_batch_prompt([r.reclamacao for r in reqs]),
     )
+    sessions = await session_service.aget()
+    await sessions.create_session(
+        app_name="classificador", user_id=batch_req.user_id, session_id=batch_req.session_id
+    )
+    try:
+        text = await run_agent(await runner_classificador.aget(), batch_req)
+    finally:
+        await sessions.delete_session(
+            app_name="classificador", user_id=batch_req.user_id, session_id=batch_req.session_id
+        )
+    parts = split_batch_response(text, len(reqs))
+    missing = [i for i, p in enumerate(parts) if p is None]
+    fallback = dict(zip(missing, await classify_fanout([reqs[i] for i in missing]))) if missing else {}
+    return [json.dumps(p, ensure_ascii=False) if p is not None else fallback[i] for i, p in enumerate(parts)]
 
-    events = []
-    for event in runner_classificador.run(
-        user_id=req.user_id,
+
+# CLASSIFY_BATCH_MODE: off (padrão) | fanout | prompt
+CLASSIFY_BATCH_MODE = os.getenv("CLASSIFY_BATCH_MODE", "off").lower()
+classify_batcher = None
+if CLASSIFY_BATCH_MODE in ("fanout", "prompt"):
+    classify_batcher = MicroBatcher(
+        classify_prompt if CLASSIFY_BATCH_MODE == "prompt" else classify_fanout,
+        window_ms=float(os.getenv("CLASSIFY_BATCH_WINDOW_MS", "20")),
+        max_batch=int(os.getenv("CLASSIFY_BATCH_MAX_SIZE", "16")),
+        max_concurrency=int(os.getenv("CLASSIFY_BATCH_CONCURRENCY", "4")),
+    )
+
+# ---------- Rota classify ----------
+@router.post("/classify")
+@observe() 
+async def classify(req: ClassifyRequest):
+    tracer.update(
         session_id=req.session_id,
-        new_message=user_content
-    ):
-        events.append(event)
+        user_id=req.user_id,
+        input=req.reclamacao,
+        metadata={"environment": LANGFUSE_ENVIRONMENT, "tag": "classificação"},
+        version=app.version,
+    )
 
-    final_text = None
-    for ev in events:
-        if ev.is_final_response():
-            final_text = ev.content.parts[0].text
-            break
+    cached = classify_cache.get(req.reclamacao)
+    if cached is not None:
+        payload = {**cached, "user_id": req.user_id, "session_id": req.session_id}
+        classification_writer.enqueue(req.user_id, req.session_id, req.reclamacao, payload)
+        tracer.update(output=payload, tags=["concluído", "cache"])
+        return payload
+
+    if classify_batcher is not None:
+        final_text = await classify_batcher.submit(req)
+    else:
+        final_text = await classify_one(req)
 
     if final_text is None:
         raise HTTPException(500, "Sem resposta do agente")
     
-    cleaned = final_text.replace("```json", "").replace("```", "").strip()
-    
     try:
-        payload = json.loads(cleaned)
-    except json.JSONDecodeError as exc:
+        payload = parse_response(final_text, Classificacao)
+    except ResponseParseError as exc:
         raise HTTPException(500, detail=f"JSON inválido: {exc}")
-    
+
+    classify_cache.put(req.reclamacao, dict(payload))
     payload["user_id"] = req.user_id
     payload["session_id"] = req.session_id
+    classification_writer.enqueue(req.user_id, req.session_id, req.reclamacao, payload)
 
-    client.update_current_trace(
+    tracer.update(
         output=payload,
         tags=["concluído"]
     )
     
     return payload
 
+@router.get("/classify/cache")
+async def classify_cache_stats():
+    return classify_cache.stats()
+
+@router.get("/classify/batch")
+async def classify_batch_stats():
+    stats = classify_batcher.stats() if classify_batcher is not None else {}
+    return {"mode": CLASSIFY_BATCH_MODE, **stats}
+
+# Conexões de leitura de classificacoes.db (abertas no startup, depois do init_db)
+classificacoes_pool = None
+
+async def query_classificacoes(fn, **kwargs):
+    def _run():
+        with classificacoes_pool.connection() as conn:
+            return fn(conn, **kwargs)
+    return await asyncio.to_thread(_run)
+
+@router.get("/classificacoes")
+async def listar_classificacoes(
+    user_id: Optional[str] = None,
+    session_id: Optional[str] = None,
+    motivo: Optional[str] = None,
+    submotivo: Optional[str] = None,
+    date_from: Optional[date] = None,
+    date_to: Optional[date] = None,
+    cursor: Optional[int] = None,
+    limit: int = Query(100, ge=1, le=1000),
+):
+    return await query_classificacoes(
+        list_classificacoes,
+        user_id=user_id, session_id=session_id, motivo=motivo, submotivo=submotivo,
+        date_from=date_from and date_from.isoformat(), date_to=date_to and date_to.isoformat(),
+        cursor=cursor, limit=limit,
+    )
+
+@router.get("/classificacoes/contagens")
+async def contar_classificacoes(
+    date_from: Optional[date] = None,
+    date_to: Optional[date] = None,
+    motivo: Optional[str] = None,
+    por_dia: bool = True,
+):
+    return await query_classificacoes(
+        contagens_diarias,
+        date_from=date_from and date_from.isoformat(), date_to=date_to and date_to.isoformat(),
+        motivo=motivo, por_dia=por_dia,
+    )
+
+@router.get("/classificacoes/writer")
+async def classification_writer_stats():
+    return classification_writer.stats()
+
+@router.get("/tracing")
+async def tracing_stats():
+    return tracer.stats()
+
+@router.get("/startup")
+async def startup_stats():
+    components = (tracer.client, session_service, runner_classificador, runner_atendimento)
+    return {**startup_metrics, "components": {c.name: c.seconds for c in components}}
+
 app.include_router(router)
 
+startup_metrics["import_seconds"] = time.perf_counter() - _IMPORT_T0
+
 # ---------- Execução direta com auto‑reload ----------
 if __name__ == "__main__":
     import os
@@ -0,0 +1,91 @@
+import json
+import logging
+from typing import Any, Optional, Type
+
+from pydantic import BaseModel, ConfigDict, ValidationError
+
+logger = logging.getLogger(__name__)
+
+_decoder = json.JSONDecoder()
+
+
+class RespostaAgente(BaseModel):
+    """Resposta JSON de um agente; campos extras são preservados."""
+
+    model_config = ConfigDict(extra="allow")
+
+
+class Classificacao(RespostaAgente):
+    motivo: str
+    submotivo: str
+
+
+class ResponseParseError(ValueError):
+    """A resposta do agente não contém um JSON válido para o modelo esperado."""
+
+
+def extract_json(text: Optional[str], kind: type = dict) -> Optional[Any]:
+    """Primeiro valor JSON do tipo ``kind`` (``dict`` ou ``list``) contido em ``text``.
+
+    Caminho rápido: o texto inteiro (sem cercas ```json) já é JSON. Senão,
+    decodifica incrementalmente a partir de cada ``{``/``[`` candidato e fica
+    com o primeiro valor completo, ignorando prosa antes/depois e lixo no fim.
+    """
+    if not text:
+        return None
+    s = text.strip()
+    if s.startswith("```"):
+        s = s.split("\n", 1)[1] if "\n" in s else s[3:]
+        s = s.rsplit("```", 1)[0].strip()
+    try:
+        value = json.loads(s)
+        if isinstance(value, kind):
+            return value
+    except json.JSONDecodeError:
+        pass
+
+    opener = "{" if kind is dict else "["
+    pos = s.find(opener)
+    while pos != -1:
+        try:
+            value, _ = _decoder.raw_decode(s, pos)
+            if isinstance(value, kind):
+                return value
+        except json.JSONDecodeError:
+            pass
+        pos = s.find(opener, pos + 1)
+    return None
+
+
+def parse_response(text: Optional[str], model: Type[RespostaAgente] = RespostaAgente) -> dict:
+    """Extrai e valida a resposta do agente; levanta ``ResponseParseError`` se não der."""
+    data = extract_json(text)
+    if data is None:
+        raise ResponseParseError("nenhum objeto JSON encontrado na resposta")
+    try:
+        return model.model_validate(data).model_dump()
+    except ValidationError as exc:
+        raise ResponseParseError(str(exc)) from exc
+
+
+def with_response_schema(agent, model: Type[BaseModel]):
+    """Cópia do agente com a saída estruturada do ADK (``output_schema``) ligada.
+
+    O agente recebido (definido fora deste pacote) nunca é alterado. Como no
+    ADK ``output_schema`` desliga ferramentas e transferências, agentes com
+    ``tools`` ou ``sub_agents`` (ou que já tenham schema) voltam sem mudança;
+    a validação fica só com ``parse_response``.
+    """
+    nome = getattr(agent, "name", agent)
+    if getattr(agent, "output_schema", False) is not None or not hasattr(agent, "model_copy"):
+        return agent
+    if getattr(agent, "tools", None) or getattr(agent, "sub_agents", None):
+        logger.info(f"ℹ️ {nome} usa tools/sub_agents: saída estruturada não aplicada")
+        return agent
+    try:
+        copia = agent.model_copy(update={"output_schema": model})
+    except (AttributeError, TypeError, ValueError) as exc:
+        logger.warning(f"⚠️ Saída estruturada indisponível para {nome}: {exc}")
+        return agent
+    logger.info(f"🧩 Saída estruturada ({model.__name__}) ativada numa cópia de {nome}")
+    return copia
@@ -0,0 +1,126 @@
+import asyncio
+import logging
+import sqlite3
+from typing import Optional
+
+from .init_db import DB_PATH, init_db
+
+logger = logging.getLogger(__name__)
+
+_STOP = object()  # sentinela de encerramento da fila
+
+UPSERT_SQL = """
+INSERT INTO classificacoes (user_id, session_id, reclamacao, motivo, submotivo)
+VALUES (?, ?, ?, ?, ?)
+ON CONFLICT(user_id, session_id) DO UPDATE SET
+    reclamacao = excluded.reclamacao,
+    motivo = excluded.motivo,
+    submotivo = excluded.submotivo,
+    timestamp = CURRENT_TIMESTAMP
+"""
+
+
+class ClassificationWriter:
+    """Grava as classificações em ``classificacoes.db`` fora do caminho da requisição.
+
+    ``enqueue`` só coloca o registro numa fila em memória (nunca bloqueia);
+    uma task de fundo junta até ``batch_size`` registros, ou o que chegar em
+    ``flush_interval`` segundos, e faz um único upsert em lote numa thread.
+    Com a fila cheia o registro é descartado e contado em ``dropped``.
+    """
+
+    def __init__(
+        self,
+        db_path: str = DB_PATH,
+        batch_size: int = 200,
+        flush_interval: float = 0.5,
+        max_queue: int = 10_000,
+    ):
+        self.db_path = db_path
+        self.batch_size = max(1, batch_size)
+        self.flush_interval = flush_interval
+        self._queue: asyncio.Queue = asyncio.Queue(maxsize=max_queue)
+        self._task: Optional[asyncio.Task] = None
+        self._conn: Optional[sqlite3.Connection] = None
+        self.written = 0
+        self.dropped = 0
+        self.failed = 0
+
+    async def start(self) -> None:
+        if self._task is not None:
+            return
+        await asyncio.to_thread(self._open)
+        self._task = asyncio.get_running_loop().create_task(self._run())
+
+    def _open(self) -> None:
+        init_db(self.db_path)
+        self._conn = sqlite3.connect(self.db_path, timeout=30, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+
+    def enqueue(self, user_id: str, session_id: str, reclamacao: str, payload: dict) -> bool:
+        """Agenda a gravação de ``motivo``/``submotivo`` do payload. Retorna False se descartado."""
+        row = (user_id, session_id, reclamacao, payload.get("motivo"), payload.get("submotivo"))
+        try:
+            self._queue.put_nowait(row)
+            return True
+        except asyncio.QueueFull:
+            self.dropped += 1
+            return False
+
+    async def _run(self) -> None:
+        loop = asyncio.get_running_loop()
+        stop = False
+        while not stop:
+            rows = [await self._queue.get()]
+            deadline = loop.time() + self.flush_interval
+            while len(rows) < self.batch_size:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    rows.append(await asyncio.wait_for(self._queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+            if _STOP in rows:
+                stop = True
+                rows = [r for r in rows if r is not _STOP]
+            if rows:
+                await self._flush(rows)
+
+    async def _flush(self, rows: list) -> None:
+        try:
+            self.written += await asyncio.to_thread(self._write, rows)
+        except sqlite3.Error as exc:
+            self.failed += len(rows)
+            logger.error(f"❌ Falha ao gravar {len(rows)} classificações: {exc}")
+        except Exception:
+            # erro inesperado não pode derrubar a task: o lote é perdido e a fila segue
+            self.failed += len(rows)
+            logger.exception(f"❌ Erro inesperado ao gravar {len(rows)} classificações")
+
+    def _write(self, rows: list) -> int:
+        """Upsert do lote; retorna quantas linhas foram gravadas (após juntar repetidas)."""
+        # o último registro de cada (user_id, session_id) no lote é o que vale
+        latest = {(r[0], r[1]): r for r in rows}
+        with self._conn:
+            self._conn.executemany(UPSERT_SQL, list(latest.values()))
+        return len(latest)
+
+    async def close(self) -> None:
+        """Grava o que ainda estiver na fila e para a task de fundo."""
+        if self._task is not None:
+            await self._queue.put(_STOP)
+            await self._task
+            self._task = None
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+
+    def stats(self) -> dict:
+        return {
+            "pending": self._queue.qsize(),
+            "written": self.written,
+            "dropped": self.dropped,
+            "failed": self.failed,
+        }
@@ -0,0 +1,90 @@
+import sqlite3
+from typing import Optional
+
+MAX_LIMIT = 1000
+
+_COLUNAS = ("id", "user_id", "session_id", "reclamacao", "motivo", "submotivo", "timestamp")
+
+
+def _periodo(coluna: str, date_from: Optional[str], date_to: Optional[str], where: list, params: list) -> None:
+    # date_to é inclusivo: compara com o início do dia seguinte para aproveitar o índice
+    if date_from:
+        where.append(f"{coluna} >= date(?)")
+        params.append(date_from)
+    if date_to:
+        where.append(f"{coluna} < date(?, '+1 day')")
+        params.append(date_to)
+
+
+def list_classificacoes(
+    conn: sqlite3.Connection,
+    user_id: Optional[str] = None,
+    session_id: Optional[str] = None,
+    motivo: Optional[str] = None,
+    submotivo: Optional[str] = None,
+    date_from: Optional[str] = None,
+    date_to: Optional[str] = None,
+    cursor: Optional[int] = None,
+    limit: int = 100,
+) -> dict:
+    """Página de classificações, da mais recente para a mais antiga.
+
+    Paginação por chave (keyset): ``cursor`` é o ``id`` do último item da
+    página anterior, então o custo de cada página não cresce com o deslocamento.
+    Datas no formato ``AAAA-MM-DD`` (``date_to`` inclusivo).
+    """
+    limit = max(1, min(int(limit), MAX_LIMIT))
+    where, params = [], []
+    for coluna, valor in (("user_id", user_id), ("session_id", session_id),
+                          ("motivo", motivo), ("submotivo", submotivo)):
+        if valor is not None:
+            where.append(f"{coluna} = ?")
+            params.append(valor)
+    _periodo("timestamp", date_from, date_to, where, params)
+    if cursor is not None:
+        where.append("id < ?")
+        params.append(int(cursor))
+
+    sql = f"SELECT {', '.join(_COLUNAS)} FROM classificacoes"
+    if where:
+        sql += " WHERE " + " AND ".join(where)
+    sql += " ORDER BY id DESC LIMIT ?"
+    rows = conn.execute(sql, (*params, limit + 1)).fetchall()
+
+    items = [dict(zip(_COLUNAS, r)) for r in rows[:limit]]
+    next_cursor = items[-1]["id"] if len(rows) > limit else None
+    return {"items": items, "next_cursor": next_cursor}
+
+
+def contagens_diarias(
+    conn: sqlite3.Connection,
+    date_from: Optional[str] = None,
+    date_to: Optional[str] = None,
+    motivo: Optional[str] = None,
+    por_dia: bool = True,
+) -> list:
+    """Quantidade de classificações por dia/motivo/submotivo, lida do rollup
+    ``classificacoes_diarias`` (sem varrer a tabela principal).
+
+    Com ``por_dia=False`` soma o período inteiro por motivo/submotivo.
+    """
+    where, params = [], []
+    if date_from:
+        where.append("dia >= date(?)")
+        params.append(date_from)
+    if date_to:
+        where.append("dia <= date(?)")
+        params.append(date_to)
+    if motivo is not None:
+        where.append("motivo = ?")
+        params.append(motivo)
+    filtro = " WHERE " + " AND ".join(where) if where else ""
+
+    if por_dia:
+        sql = f"SELECT dia, motivo, submotivo, total FROM classificacoes_diarias{filtro} ORDER BY dia, motivo, submotivo"
+        cols = ("dia", "motivo", "submotivo", "total")
+    else:
+        sql = (f"SELECT motivo, submotivo, SUM(total) FROM classificacoes_diarias{filtro} "
+               "GROUP BY motivo, submotivo ORDER BY 3 DESC")
+        cols = ("motivo", "submotivo", "total")
+    return [dict(zip(cols, r)) for r in conn.execute(sql, params).fetchall()]
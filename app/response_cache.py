@@ -0,0 +1,172 @@
+import hashlib
+import random
+import re
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+from typing import Any, Optional
+
+import numpy as np
+
+# Primo > 2**32 para o hashing universal das permutações do MinHash
+_PRIME = 4294967311
+
+
+def normalize_text(text: str) -> str:
+    """Normaliza a reclamação: minúsculas, sem acento, sem pontuação e espaços colapsados."""
+    t = unicodedata.normalize("NFKD", text or "").encode("ascii", "ignore").decode()
+    t = re.sub(r"[^a-z0-9]+", " ", t.lower())
+    return t.strip()
+
+
+class MinHasher:
+    """Assinaturas MinHash sobre shingles de caracteres (similaridade de Jaccard)."""
+
+    def __init__(self, num_perm: int = 64, shingle: int = 4, seed: int = 1):
+        rng = random.Random(seed)
+        self.shingle = shingle
+        self._a = np.array([rng.randrange(1, 1 << 31) for _ in range(num_perm)], dtype=np.uint64)
+        self._b = np.array([rng.randrange(0, 1 << 31) for _ in range(num_perm)], dtype=np.uint64)
+
+    def signature(self, text: str) -> np.ndarray:
+        k = self.shingle
+        shingles = {text[i:i + k] for i in range(max(1, len(text) - k + 1))}
+        h = np.array(
+            [int.from_bytes(hashlib.blake2b(s.encode(), digest_size=4).digest(), "little") for s in shingles],
+            dtype=np.uint64,
+        )
+        return ((np.outer(self._a, h) + self._b[:, None]) % _PRIME).min(axis=1)
+
+
+class ResponseCache:
+    """Cache LRU/TTL de respostas do classificador.
+
+    Procura primeiro por igualdade do texto normalizado (hash) e, se
+    ``similarity`` > 0, por reclamações quase idênticas via MinHash + LSH
+    (bandas da assinatura), aceitando quando a similaridade estimada é maior
+    ou igual ao limiar. As entradas são marcadas com a ``version`` da API:
+    trocar a versão invalida o cache.
+    """
+
+    def __init__(
+        self,
+        version: str,
+        max_entries: int = 4096,
+        ttl_seconds: Optional[float] = 3600,
+        similarity: float = 0.0,
+        num_perm: int = 64,
+        bands: int = 16,
+    ):
+        if num_perm % bands:
+            raise ValueError("num_perm deve ser múltiplo de bands.")
+        self.version = version
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.similarity = similarity
+        self._bands = bands
+        self._rows = num_perm // bands
+        self._hasher = MinHasher(num_perm) if similarity > 0 else None
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()  # key -> (valor, expira_em, assinatura)
+        self._buckets: dict = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.similar_hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def _key(self, norm: str) -> str:
+        return hashlib.sha256(f"{self.version}\x00{norm}".encode()).hexdigest()
+
+    def _band_keys(self, sig: np.ndarray):
+        for i in range(self._bands):
+            yield (i, sig[i * self._rows:(i + 1) * self._rows].tobytes())
+
+    def _drop(self, key: str) -> None:
+        _, _, sig = self._entries.pop(key)
+        if sig is not None:
+            for band in self._band_keys(sig):
+                bucket = self._buckets.get(band)
+                if bucket is not None:
+                    bucket.discard(key)
+                    if not bucket:
+                        del self._buckets[band]
+
+    def _alive(self, key: str, now: float) -> bool:
+        entry = self._entries.get(key)
+        if entry is None:
+            return False
+        if entry[1] is not None and entry[1] < now:
+            self._drop(key)
+            self.evictions += 1
+            return False
+        return True
+
+    def set_version(self, version: str) -> None:
+        """Troca a versão (ex.: deploy com ``app.version`` nova) e descarta tudo."""
+        with self._lock:
+            if version != self.version:
+                self.version = version
+                self.clear()
+
+    def clear(self) -> None:
+        self._entries.clear()
+        self._buckets.clear()
+
+    def get(self, text: str) -> Optional[Any]:
+        norm = normalize_text(text)
+        key = self._key(norm)
+        now = time.time()
+        with self._lock:
+            if self._alive(key, now):
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return self._entries[key][0]
+
+            if self._hasher is not None:
+                sig = self._hasher.signature(norm)
+                candidates = set()
+                for band in self._band_keys(sig):
+                    candidates |= self._buckets.get(band, set())
+                best, best_score = None, self.similarity
+                for cand in candidates:
+                    if not self._alive(cand, now):
+                        continue
+                    score = float(np.mean(self._entries[cand][2] == sig))
+                    if score >= best_score:
+                        best, best_score = cand, score
+                if best is not None:
+                    self._entries.move_to_end(best)
+                    self.similar_hits += 1
+                    return self._entries[best][0]
+
+            self.misses += 1
+            return None
+
+    def put(self, text: str, value: Any) -> None:
+        norm = normalize_text(text)
+        key = self._key(norm)
+        expires = time.time() + self.ttl_seconds if self.ttl_seconds else None
+        sig = self._hasher.signature(norm) if self._hasher is not None else None
+        with self._lock:
+            if key in self._entries:
+                self._drop(key)
+            self._entries[key] = (value, expires, sig)
+            if sig is not None:
+                for band in self._band_keys(sig):
+                    self._buckets.setdefault(band, set()).add(key)
+            while len(self._entries) > self.max_entries:
+                self._drop(next(iter(self._entries)))
+                self.evictions += 1
+
+    def stats(self) -> dict:
+        total = self.hits + self.similar_hits + self.misses
+        return {
+            "version": self.version,
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "similar_hits": self.similar_hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": (self.hits + self.similar_hits) / total if total else 0.0,
+        }
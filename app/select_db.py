@@ -1,11 +1,64 @@
+import argparse
 import sqlite3
+import sys
+from pathlib import Path
+
 import pandas as pd
 
-# Conectar ao banco de dados
-with sqlite3.connect('classificacoes.db') as conn:
-    # Executar consulta SQL
-    query = "SELECT * FROM classificacoes"
-    df = pd.read_sql_query(query, conn)
+if not __package__:
+    # executado como script (python app/select_db.py): importa como parte do pacote app
+    sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+    import app  # noqa: F401
+
+    __package__ = "app"
+
+from .init_db import DB_PATH, init_db
+from .queries import contagens_diarias, list_classificacoes
+
+
+def main(argv=None) -> None:
+    # Uso: python -m app.select_db (ou python app/select_db.py) [--motivo X] [--cursor N] [--contagens]
+    parser = argparse.ArgumentParser(description="Consulta paginada de classificacoes.db")
+    parser.add_argument("--db", default=DB_PATH)
+    parser.add_argument("--user-id")
+    parser.add_argument("--session-id")
+    parser.add_argument("--motivo")
+    parser.add_argument("--submotivo")
+    parser.add_argument("--date-from", help="AAAA-MM-DD")
+    parser.add_argument("--date-to", help="AAAA-MM-DD (inclusivo)")
+    parser.add_argument("--cursor", type=int, help="id do último item da página anterior")
+    parser.add_argument("--limit", type=int, default=50)
+    parser.add_argument("--contagens", action="store_true", help="contagens diárias por motivo/submotivo")
+    args = parser.parse_args(argv)
+
+    # Garante índices e rollup também em bancos criados por versões antigas
+    init_db(args.db)
+
+    # Conectar ao banco de dados
+    with sqlite3.connect(args.db) as conn:
+        if args.contagens:
+            df = pd.DataFrame(contagens_diarias(conn, args.date_from, args.date_to, args.motivo))
+            next_cursor = None
+        else:
+            page = list_classificacoes(
+                conn,
+                user_id=args.user_id,
+                session_id=args.session_id,
+                motivo=args.motivo,
+                submotivo=args.submotivo,
+                date_from=args.date_from,
+                date_to=args.date_to,
+                cursor=args.cursor,
+                limit=args.limit,
+            )
+            df = pd.DataFrame(page["items"])
+            next_cursor = page["next_cursor"]
+
+    # Exibir os resultados
+    print(df)
+    if next_cursor is not None:
+        print(f"\nPróxima página: --cursor {next_cursor}")
+
 
-# Exibir os resultados
-print(df)
\ No newline at end of file
+if __name__ == "__main__":
+    main()
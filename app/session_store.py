@@ -0,0 +1,357 @@
+import asyncio
+import json
+import logging
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from typing import Any, Optional
+
+from google.adk.events import Event
+from google.adk.sessions import BaseSessionService, Session
+from google.adk.sessions.base_session_service import GetSessionConfig, ListSessionsResponse
+from google.adk.sessions.state import State
+
+from .sqlite_pool import ConnectionPool
+
+try:
+    from google.adk.errors.already_exists_error import AlreadyExistsError
+except ImportError:  # versões antigas do ADK
+    AlreadyExistsError = ValueError
+
+logger = logging.getLogger(__name__)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS sessions (
+    app_name TEXT NOT NULL,
+    user_id TEXT NOT NULL,
+    id TEXT NOT NULL,
+    state TEXT NOT NULL DEFAULT '{}',
+    create_time REAL NOT NULL,
+    update_time REAL NOT NULL,
+    PRIMARY KEY (app_name, user_id, id)
+);
+CREATE INDEX IF NOT EXISTS idx_sessions_update_time ON sessions(update_time);
+
+CREATE TABLE IF NOT EXISTS events (
+    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+    app_name TEXT NOT NULL,
+    user_id TEXT NOT NULL,
+    session_id TEXT NOT NULL,
+    event TEXT NOT NULL,
+    timestamp REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_events_session ON events(app_name, user_id, session_id, seq);
+
+CREATE TABLE IF NOT EXISTS app_states (
+    app_name TEXT PRIMARY KEY,
+    state TEXT NOT NULL DEFAULT '{}'
+);
+
+CREATE TABLE IF NOT EXISTS user_states (
+    app_name TEXT NOT NULL,
+    user_id TEXT NOT NULL,
+    state TEXT NOT NULL DEFAULT '{}',
+    PRIMARY KEY (app_name, user_id)
+);
+"""
+
+
+def _split_state(state: Optional[dict]) -> tuple:
+    """Separa o estado em (app, user, sessão); chaves ``temp:`` não são persistidas."""
+    app, user, session = {}, {}, {}
+    for key, value in (state or {}).items():
+        if key.startswith(State.APP_PREFIX):
+            app[key[len(State.APP_PREFIX):]] = value
+        elif key.startswith(State.USER_PREFIX):
+            user[key[len(State.USER_PREFIX):]] = value
+        elif not key.startswith(State.TEMP_PREFIX):
+            session[key] = value
+    return app, user, session
+
+
+def _light_copy(session: Session) -> Session:
+    """Cópia rasa com listas/dicts próprios: o chamador pode anexar sem afetar o cache."""
+    copied = session.model_copy(deep=False)
+    copied.events = list(session.events)
+    copied.state = dict(session.state)
+    return copied
+
+
+class SQLiteSessionService(BaseSessionService):
+    """Sessões do ADK persistidas em SQLite, com cache LRU em memória e expiração por TTL.
+
+    O banco pode ser compartilhado por vários workers do uvicorn. Cada leitura
+    confere o ``update_time`` gravado (consulta pela chave primária) antes de
+    reaproveitar a sessão do cache, então eventos gravados por outro processo
+    nunca são mascarados. Sessões sem atualização há mais de ``ttl_seconds``
+    são removidas.
+    """
+
+    def __init__(
+        self,
+        db_path: str = "sessions.db",
+        pool_size: int = 4,
+        ttl_seconds: Optional[float] = 7 * 24 * 3600,
+        hot_size: int = 1024,
+        evict_every: float = 300,
+    ):
+        self.ttl_seconds = ttl_seconds
+        self.hot_size = hot_size
+        self.evict_every = evict_every
+        self._pool = ConnectionPool(db_path, pool_size)
+        with self._pool.connection() as conn:
+            conn.executescript(SCHEMA)
+        self._hot: "OrderedDict[tuple, Session]" = OrderedDict()
+        self._hot_lock = threading.Lock()
+        self._last_evict = 0.0
+
+    # ---------- cache LRU ----------
+    def _hot_get(self, key: tuple) -> Optional[Session]:
+        with self._hot_lock:
+            session = self._hot.get(key)
+            if session is not None:
+                self._hot.move_to_end(key)
+            return session
+
+    def _hot_put(self, key: tuple, session: Session) -> None:
+        with self._hot_lock:
+            self._hot[key] = session
+            self._hot.move_to_end(key)
+            while len(self._hot) > self.hot_size:
+                self._hot.popitem(last=False)
+
+    def _hot_pop(self, key: tuple) -> None:
+        with self._hot_lock:
+            self._hot.pop(key, None)
+
+    # ---------- helpers SQL ----------
+    def _expired(self, update_time: float) -> bool:
+        return self.ttl_seconds is not None and update_time < time.time() - self.ttl_seconds
+
+    @staticmethod
+    def _merge_json(conn, table: str, keys: dict, delta: dict) -> None:
+        """Aplica ``delta`` ao estado JSON de ``app_states``/``user_states``."""
+        if not delta:
+            return
+        where = " AND ".join(f"{col} = ?" for col in keys)
+        row = conn.execute(f"SELECT state FROM {table} WHERE {where}", tuple(keys.values())).fetchone()
+        state = json.loads(row[0]) if row else {}
+        state.update(delta)
+        conn.execute(
+            f"INSERT OR REPLACE INTO {table} ({', '.join(keys)}, state) VALUES ({', '.join('?' * (len(keys) + 1))})",
+            (*keys.values(), json.dumps(state)),
+        )
+
+    @staticmethod
+    def _scoped_state(conn, app_name: str, user_id: str) -> dict:
+        merged = {}
+        row = conn.execute("SELECT state FROM app_states WHERE app_name = ?", (app_name,)).fetchone()
+        for key, value in (json.loads(row[0]) if row else {}).items():
+            merged[State.APP_PREFIX + key] = value
+        row = conn.execute(
+            "SELECT state FROM user_states WHERE app_name = ? AND user_id = ?", (app_name, user_id)
+        ).fetchone()
+        for key, value in (json.loads(row[0]) if row else {}).items():
+            merged[State.USER_PREFIX + key] = value
+        return merged
+
+    # ---------- implementações síncronas (rodam em thread) ----------
+    def _create(self, app_name: str, user_id: str, state: Optional[dict], session_id: Optional[str]) -> Session:
+        self._maybe_evict()
+        session_id = (session_id or "").strip() or uuid.uuid4().hex
+        app_delta, user_delta, session_state = _split_state(state)
+        now = time.time()
+        with self._pool.connection() as conn, conn:
+            row = conn.execute(
+                "SELECT update_time FROM sessions WHERE app_name = ? AND user_id = ? AND id = ?",
+                (app_name, user_id, session_id),
+            ).fetchone()
+            if row is not None and not self._expired(row[0]):
+                raise AlreadyExistsError(f"Session with id {session_id} already exists.")
+            self._delete_rows(conn, app_name, user_id, session_id)
+            self._merge_json(conn, "app_states", {"app_name": app_name}, app_delta)
+            self._merge_json(conn, "user_states", {"app_name": app_name, "user_id": user_id}, user_delta)
+            conn.execute(
+                "INSERT INTO sessions (app_name, user_id, id, state, create_time, update_time) VALUES (?, ?, ?, ?, ?, ?)",
+                (app_name, user_id, session_id, json.dumps(session_state), now, now),
+            )
+            scoped = self._scoped_state(conn, app_name, user_id)
+
+        session = Session(app_name=app_name, user_id=user_id, id=session_id,
+                          state=session_state, last_update_time=now)
+        self._hot_put((app_name, user_id, session_id), session)
+        copied = _light_copy(session)
+        copied.state.update(scoped)
+        return copied
+
+    def _get(self, app_name: str, user_id: str, session_id: str, config: Optional[GetSessionConfig]) -> Optional[Session]:
+        key = (app_name, user_id, (session_id or "").strip())
+        with self._pool.connection() as conn:
+            row = conn.execute(
+                "SELECT state, update_time FROM sessions WHERE app_name = ? AND user_id = ? AND id = ?", key
+            ).fetchone()
+            if row is None or self._expired(row[1]):
+                self._hot_pop(key)
+                return None
+
+            session = self._hot_get(key)
+            if session is None or session.last_update_time != row[1]:
+                events = [
+                    Event.model_validate_json(e)
+                    for (e,) in conn.execute(
+                        "SELECT event FROM events WHERE app_name = ? AND user_id = ? AND session_id = ? ORDER BY seq",
+                        key,
+                    )
+                ]
+                session = Session(app_name=app_name, user_id=user_id, id=key[2],
+                                  state=json.loads(row[0]), events=events, last_update_time=row[1])
+                self._hot_put(key, session)
+            scoped = self._scoped_state(conn, app_name, user_id)
+
+        copied = _light_copy(session)
+        if config:
+            if config.num_recent_events is not None:
+                copied.events = copied.events[-config.num_recent_events:] if config.num_recent_events else []
+            if config.after_timestamp:
+                copied.events = [e for e in copied.events if e.timestamp >= config.after_timestamp]
+        copied.state.update(scoped)
+        return copied
+
+    def _list(self, app_name: str, user_id: Optional[str]) -> ListSessionsResponse:
+        sql = "SELECT user_id, id, state, update_time FROM sessions WHERE app_name = ?"
+        params: tuple = (app_name,)
+        if user_id is not None:
+            sql += " AND user_id = ?"
+            params += (user_id,)
+        if self.ttl_seconds is not None:
+            sql += " AND update_time >= ?"
+            params += (time.time() - self.ttl_seconds,)
+        sql += " ORDER BY update_time, user_id, id"
+        sessions = []
+        with self._pool.connection() as conn:
+            scoped_by_user = {}
+            for uid, sid, state, update_time in conn.execute(sql, params).fetchall():
+                if uid not in scoped_by_user:
+                    scoped_by_user[uid] = self._scoped_state(conn, app_name, uid)
+                merged = {**json.loads(state), **scoped_by_user[uid]}
+                sessions.append(Session(app_name=app_name, user_id=uid, id=sid,
+                                        state=merged, last_update_time=update_time))
+        return ListSessionsResponse(sessions=sessions)
+
+    @staticmethod
+    def _delete_rows(conn, app_name: str, user_id: str, session_id: str) -> None:
+        conn.execute("DELETE FROM events WHERE app_name = ? AND user_id = ? AND session_id = ?",
+                     (app_name, user_id, session_id))
+        conn.execute("DELETE FROM sessions WHERE app_name = ? AND user_id = ? AND id = ?",
+                     (app_name, user_id, session_id))
+
+    def _delete(self, app_name: str, user_id: str, session_id: str) -> None:
+        key = (app_name, user_id, (session_id or "").strip())
+        with self._pool.connection() as conn, conn:
+            self._delete_rows(conn, *key)
+        self._hot_pop(key)
+
+    def _user_state(self, app_name: str, user_id: str) -> dict:
+        with self._pool.connection() as conn:
+            row = conn.execute(
+                "SELECT state FROM user_states WHERE app_name = ? AND user_id = ?", (app_name, user_id)
+            ).fetchone()
+        return json.loads(row[0]) if row else {}
+
+    def _persist_event(self, session: Session, event: Event) -> None:
+        key = (session.app_name, session.user_id, session.id)
+        delta = event.actions.state_delta if event.actions and event.actions.state_delta else {}
+        app_delta, user_delta, session_delta = _split_state(delta)
+        with self._pool.connection() as conn, conn:
+            row = conn.execute(
+                "SELECT state, update_time FROM sessions WHERE app_name = ? AND user_id = ? AND id = ?", key
+            ).fetchone()
+            if row is None:
+                raise ValueError(f"Session {session.id} not found.")
+            conn.execute(
+                "INSERT INTO events (app_name, user_id, session_id, event, timestamp) VALUES (?, ?, ?, ?, ?)",
+                (*key, event.model_dump_json(exclude_none=True), event.timestamp),
+            )
+            self._merge_json(conn, "app_states", {"app_name": session.app_name}, app_delta)
+            self._merge_json(conn, "user_states",
+                             {"app_name": session.app_name, "user_id": session.user_id}, user_delta)
+            state = json.loads(row[0])
+            state.update(session_delta)
+            conn.execute(
+                "UPDATE sessions SET state = ?, update_time = ? WHERE app_name = ? AND user_id = ? AND id = ?",
+                (json.dumps(state), event.timestamp, *key),
+            )
+
+        # Atualiza o cache só se ele refletia a versão anterior do banco
+        hot = self._hot_get(key)
+        if hot is not None and hot is not session and hot.last_update_time == row[1]:
+            hot.events.append(event)
+            hot.state.update(session_delta)
+            hot.last_update_time = event.timestamp
+        elif hot is not session:
+            self._hot_pop(key)
+
+    def evict_expired(self) -> int:
+        """Remove sessões (e seus eventos) sem atualização há mais de ``ttl_seconds``."""
+        if self.ttl_seconds is None:
+            return 0
+        cutoff = time.time() - self.ttl_seconds
+        with self._pool.connection() as conn, conn:
+            expired = conn.execute(
+                "SELECT app_name, user_id, id FROM sessions WHERE update_time < ?", (cutoff,)
+            ).fetchall()
+            for key in expired:
+                self._delete_rows(conn, *key)
+        for key in expired:
+            self._hot_pop(tuple(key))
+        if expired:
+            logger.info(f"🧹 {len(expired)} sessões expiradas removidas")
+        return len(expired)
+
+    def _maybe_evict(self) -> None:
+        now = time.time()
+        if now - self._last_evict >= self.evict_every:
+            self._last_evict = now
+            self.evict_expired()
+
+    def close(self) -> None:
+        self._pool.close()
+
+    # ---------- interface do ADK ----------
+    async def create_session(
+        self,
+        *,
+        app_name: str,
+        user_id: str,
+        state: Optional[dict[str, Any]] = None,
+        session_id: Optional[str] = None,
+    ) -> Session:
+        return await asyncio.to_thread(self._create, app_name, user_id, state, session_id)
+
+    async def get_session(
+        self,
+        *,
+        app_name: str,
+        user_id: str,
+        session_id: str,
+        config: Optional[GetSessionConfig] = None,
+    ) -> Optional[Session]:
+        return await asyncio.to_thread(self._get, app_name, user_id, session_id, config)
+
+    async def list_sessions(self, *, app_name: str, user_id: Optional[str] = None) -> ListSessionsResponse:
+        return await asyncio.to_thread(self._list, app_name, user_id)
+
+    async def delete_session(self, *, app_name: str, user_id: str, session_id: str) -> None:
+        await asyncio.to_thread(self._delete, app_name, user_id, session_id)
+
+    async def get_user_state(self, *, app_name: str, user_id: str) -> dict[str, Any]:
+        return await asyncio.to_thread(self._user_state, app_name, user_id)
+
+    async def append_event(self, session: Session, event: Event) -> Event:
+        if event.partial:
+            return event
+        event = await super().append_event(session=session, event=event)
+        await asyncio.to_thread(self._persist_event, session, event)
+        session.last_update_time = event.timestamp
+        return event
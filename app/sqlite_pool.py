@@ -0,0 +1,28 @@
+import queue
+import sqlite3
+from contextlib import contextmanager
+
+
+class ConnectionPool:
+    """Pool fixo de conexões SQLite em modo WAL, compartilhado entre threads."""
+
+    def __init__(self, db_path: str, size: int = 4):
+        self._conns = queue.Queue()
+        for _ in range(max(1, size)):
+            conn = sqlite3.connect(db_path, timeout=30, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute("PRAGMA busy_timeout=5000")
+            self._conns.put(conn)
+
+    @contextmanager
+    def connection(self):
+        conn = self._conns.get()
+        try:
+            yield conn
+        finally:
+            self._conns.put(conn)
+
+    def close(self) -> None:
+        while not self._conns.empty():
+            self._conns.get_nowait().close()
@@ -0,0 +1,123 @@
+import asyncio
+import logging
+import re
+import subprocess
+import sys
+import threading
+import time
+from typing import Any, Callable, Optional
+
+logger = logging.getLogger(__name__)
+
+_UNSET = object()
+
+
+class Lazy:
+    """Valor caro (agente, Runner, cliente) construído uma única vez.
+
+    A construção acontece no primeiro ``get``/``aget`` ou no aquecimento do
+    ``lifespan``; ``aget`` roda a fábrica numa thread para não travar o event
+    loop. O tempo de construção fica em ``seconds``.
+    """
+
+    def __init__(self, factory: Callable[[], Any], name: Optional[str] = None):
+        self._factory = factory
+        self.name = name or getattr(factory, "__name__", "lazy")
+        self._value = _UNSET
+        self._lock = threading.Lock()
+        self.seconds: Optional[float] = None
+
+    @property
+    def ready(self) -> bool:
+        return self._value is not _UNSET
+
+    def get(self) -> Any:
+        if self._value is _UNSET:
+            with self._lock:
+                if self._value is _UNSET:
+                    t0 = time.perf_counter()
+                    self._value = self._factory()
+                    self.seconds = time.perf_counter() - t0
+                    logger.info(f"🔥 {self.name} pronto em {self.seconds:.2f}s")
+        return self._value
+
+    async def aget(self) -> Any:
+        if self._value is not _UNSET:
+            return self._value
+        return await asyncio.to_thread(self.get)
+
+
+def warm_up(*lazies: Lazy) -> None:
+    """Constrói os valores em sequência numa única thread.
+
+    Importar pacotes em threads paralelas não ganha nada (GIL) e arrisca
+    disputa nos locks de import; a concorrência fica entre este aquecimento e
+    o resto do startup (ou as primeiras requisições, no modo ``background``).
+    """
+    for lazy in lazies:
+        lazy.get()
+
+
+_IMPORTTIME = re.compile(r"import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)")
+
+
+def _importtime(code: str, env: Optional[dict]) -> tuple:
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        capture_output=True, text=True, env=env,
+    )
+    rows = []
+    for line in proc.stderr.splitlines():
+        m = _IMPORTTIME.match(line)
+        if m:
+            rows.append({
+                "module": m.group(4),
+                "self_ms": int(m.group(1)) / 1000,
+                "cumulative_ms": int(m.group(2)) / 1000,
+                "depth": len(m.group(3)) // 2,
+            })
+    return proc, rows
+
+
+def importtime_report(module: str = "app.main", top: int = 20, env: Optional[dict] = None) -> dict:
+    """Perfil de import de ``module`` num interpretador novo (``python -X importtime``).
+
+    Devolve o tempo total (sem o que o próprio interpretador já carrega no
+    boot) e os ``top`` módulos mais caros (tempo acumulado), para acompanhar o
+    cold start como métrica.
+    """
+    _, boot = _importtime("pass", env)
+    boot_modules = {r["module"] for r in boot}
+    proc, rows = _importtime(f"import {module}", env)
+    rows = [r for r in rows if r["module"] not in boot_modules]
+    total = sum(r["cumulative_ms"] for r in rows if r["depth"] == 0)
+    rows.sort(key=lambda r: r["cumulative_ms"], reverse=True)
+    return {
+        "module": module,
+        "ok": proc.returncode == 0,
+        "total_ms": round(total, 1),
+        "top": rows[:top],
+        "error": proc.stderr.strip().splitlines()[-1] if proc.returncode else None,
+    }
+
+
+if __name__ == "__main__":
+    import argparse
+    import json
+
+    # Uso: python -m app.startup [app.main] [--top 20] [--json]
+    parser = argparse.ArgumentParser(description="Perfil de import (cold start)")
+    parser.add_argument("module", nargs="?", default="app.main")
+    parser.add_argument("--top", type=int, default=20)
+    parser.add_argument("--json", action="store_true")
+    args = parser.parse_args()
+
+    report = importtime_report(args.module, args.top)
+    if args.json:
+        print(json.dumps(report, ensure_ascii=False, indent=2))
+    else:
+        if not report["ok"]:
+            print(f"❌ import falhou: {report['error']}")
+        print(f"import {report['module']}: {report['total_ms']:.1f} ms")
+        for r in report["top"]:
+            print(f"{r['cumulative_ms']:10.1f} ms {r['self_ms']:9.1f} ms  {'  ' * r['depth']}{r['module']}")
@@ -0,0 +1,241 @@
+import asyncio
+import contextvars
+import functools
+import logging
+import random
+import time
+from collections import deque
+from typing import Any, Optional
+
+from fastapi import HTTPException
+
+from .startup import Lazy
+
+logger = logging.getLogger(__name__)
+
+_STOP = object()  # sentinela de encerramento da fila
+
+# Registro do trace da requisição atual (None = não amostrada)
+_current: contextvars.ContextVar[Optional[dict]] = contextvars.ContextVar("trace_atual", default=None)
+
+
+def truncate(value: Any, max_chars: int) -> Any:
+    """Corta strings longas (também dentro de dicts/listas) em ``max_chars``."""
+    if isinstance(value, str):
+        if len(value) > max_chars:
+            return f"{value[:max_chars]}…[+{len(value) - max_chars}]"
+        return value
+    if isinstance(value, dict):
+        return {k: truncate(v, max_chars) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [truncate(v, max_chars) for v in value]
+    return value
+
+
+class StubTraceClient:
+    """Substituto local do Langfuse: guarda os traces exportados em memória.
+
+    Implementa só o que o ``Tracer`` usa (``start_span`` → ``update_trace`` /
+    ``end`` e ``flush``); útil em testes e em desenvolvimento sem chaves.
+    """
+
+    def __init__(self, max_traces: int = 1000):
+        self.traces: deque = deque(maxlen=max_traces)
+        self.flushes = 0
+
+    def start_span(self, *, name: str, **fields) -> "_StubSpan":
+        return _StubSpan(self, {"name": name, **fields})
+
+    def flush(self) -> None:
+        self.flushes += 1
+
+
+class _StubSpan:
+    def __init__(self, client: StubTraceClient, span: dict):
+        self._client = client
+        self._span = span
+        self._trace: dict = {}
+
+    def update_trace(self, **fields) -> "_StubSpan":
+        self._trace.update(fields)
+        return self
+
+    def end(self, **_) -> "_StubSpan":
+        self._client.traces.append({**self._trace, "span": self._span})
+        return self
+
+
+class Tracer:
+    """Tracing das rotas fora do caminho da requisição.
+
+    - amostragem na cabeça: só ``sample_rate`` das requisições geram trace;
+      nas demais ``update`` não faz nada;
+    - ``update`` apenas acumula os campos (com strings truncadas em
+      ``max_payload_chars``) num registro local da requisição;
+    - ao fim da rota o registro vai para uma fila limitada; uma task de fundo
+      exporta em lotes para o cliente (Langfuse ou ``StubTraceClient``) numa
+      thread. Com a fila cheia o trace é descartado e contado em ``dropped``.
+
+    O tempo gasto pela própria camada no caminho da requisição fica em
+    ``overhead``; o da exportação, em ``export_seconds``.
+    """
+
+    def __init__(
+        self,
+        client: Lazy,
+        sample_rate: float = 1.0,
+        max_payload_chars: int = 2000,
+        max_queue: int = 1000,
+        batch_size: int = 50,
+        flush_interval: float = 1.0,
+    ):
+        self.client = client
+        self.sample_rate = min(max(sample_rate, 0.0), 1.0)
+        self.max_payload_chars = max_payload_chars
+        self.batch_size = max(1, batch_size)
+        self.flush_interval = flush_interval
+        self._queue: asyncio.Queue = asyncio.Queue(maxsize=max_queue)
+        self._task: Optional[asyncio.Task] = None
+        self.seen = 0
+        self.sampled = 0
+        self.dropped = 0
+        self.exported = 0
+        self.failed = 0
+        self.overhead = 0.0
+        self.export_seconds = 0.0
+
+    # ---- caminho da requisição ----
+    def observe(self, name: Optional[str] = None):
+        """Decorador das rotas (substitui ``@observe()`` do Langfuse)."""
+        def decorator(fn):
+            trace_name = name or fn.__name__
+
+            @functools.wraps(fn)
+            async def wrapper(*args, **kwargs):
+                t0 = time.perf_counter()
+                self.seen += 1
+                record = None
+                if self.sample_rate >= 1.0 or random.random() < self.sample_rate:
+                    self.sampled += 1
+                    record = {"name": trace_name, "fields": {}, "start": time.time()}
+                token = _current.set(record)
+                self.overhead += time.perf_counter() - t0
+                try:
+                    return await fn(*args, **kwargs)
+                except Exception as exc:
+                    if record is not None:
+                        status = exc.status_code if isinstance(exc, HTTPException) else 500
+                        record["error"] = f"{status}: {getattr(exc, 'detail', exc)}"
+                    raise
+                finally:
+                    _current.reset(token)
+                    if record is not None:
+                        t1 = time.perf_counter()
+                        record["duration_ms"] = (time.time() - record["start"]) * 1000
+                        self._enqueue(record)
+                        self.overhead += time.perf_counter() - t1
+
+            return wrapper
+
+        return decorator
+
+    def update(self, **fields) -> None:
+        """Acumula campos do trace atual (mesmos nomes de ``update_current_trace``)."""
+        record = _current.get()
+        if record is None:
+            return
+        t0 = time.perf_counter()
+        acc = record["fields"]
+        for key, value in fields.items():
+            if key == "tags":
+                acc.setdefault("tags", []).extend(value)
+            elif key == "metadata" and isinstance(value, dict):
+                acc.setdefault("metadata", {}).update(value)
+            elif key in ("input", "output"):
+                acc[key] = truncate(value, self.max_payload_chars)
+            else:
+                acc[key] = value
+        self.overhead += time.perf_counter() - t0
+
+    def _enqueue(self, record: dict) -> None:
+        try:
+            self._queue.put_nowait(record)
+        except asyncio.QueueFull:
+            self.dropped += 1
+
+    # ---- exportação em segundo plano ----
+    async def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def _run(self) -> None:
+        loop = asyncio.get_running_loop()
+        stop = False
+        while not stop:
+            batch = [await self._queue.get()]
+            deadline = loop.time() + self.flush_interval
+            while len(batch) < self.batch_size:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+            if _STOP in batch:
+                stop = True
+                batch = [r for r in batch if r is not _STOP]
+            if batch:
+                await asyncio.to_thread(self._export, batch)
+
+    def _export(self, batch: list) -> None:
+        t0 = time.perf_counter()
+        try:
+            client = self.client.get()
+        except Exception as exc:
+            self.failed += len(batch)
+            logger.error(f"❌ Cliente de tracing indisponível: {exc}")
+            return
+        for record in batch:
+            fields = dict(record["fields"])
+            metadata = {**fields.pop("metadata", {}), "duracao_ms": round(record["duration_ms"], 1)}
+            if "error" in record:
+                metadata["erro"] = record["error"]
+                fields["tags"] = [*fields.get("tags", []), "erro"]
+            try:
+                span = client.start_span(
+                    name=record["name"],
+                    input=fields.get("input"),
+                    output=fields.get("output"),
+                    level="ERROR" if "error" in record else None,
+                )
+                span.update_trace(name=record["name"], metadata=metadata, **fields)
+                span.end()
+                self.exported += 1
+            except Exception as exc:
+                self.failed += 1
+                logger.warning(f"⚠️ Falha ao exportar trace {record['name']}: {exc}")
+        self.export_seconds += time.perf_counter() - t0
+
+    async def close(self) -> None:
+        """Exporta o que estiver na fila, para a task e faz o flush do cliente."""
+        if self._task is not None:
+            await self._queue.put(_STOP)
+            await self._task
+            self._task = None
+        if self.client.ready:
+            await asyncio.to_thread(self.client.get().flush)
+
+    def stats(self) -> dict:
+        return {
+            "sample_rate": self.sample_rate,
+            "seen": self.seen,
+            "sampled": self.sampled,
+            "pending": self._queue.qsize(),
+            "exported": self.exported,
+            "dropped": self.dropped,
+            "failed": self.failed,
+            "overhead_ms": round(self.overhead * 1000, 3),
+            "overhead_us_per_request": round(self.overhead * 1e6 / self.seen, 2) if self.seen else 0.0,
+            "export_seconds": round(self.export_seconds, 3),
+        }
@@ -0,0 +1,91 @@
+import json
+
+import pandas as pd
+
+from vr_agent import batch
+
+SP = "SINDPD SP - SIND.TRAB.EM PROC DADOS E EMPR.EMPRESAS PROC DADOS ESTADO DE SP."
+RS = "SINDPPD RS - SINDICATO DOS TRAB. EM PROC. DE DADOS RIO GRANDE DO SUL"
+
+ARQUIVOS = {
+    "ATIVOS": "ATIVOS.xlsx",
+    "DESLIGADOS": "DESLIGADOS.xlsx",
+    "BASE_DIAS_UTEIS": "Base dias uteis.xlsx",
+    "BASE_SINDICATO_VALOR": "Base sindicato x valor.xlsx",
+}
+
+
+def _pasta(tmp_path):
+    pasta = tmp_path / "data"
+    pasta.mkdir()
+    pd.DataFrame({
+        "MATRICULA": [1, 2, 3, 4],
+        "EMPRESA": [1410, 1410, 2000, 2000],
+        "TITULO DO CARGO": ["ANALISTA", "ANALISTA", "ANALISTA", "ANALISTA"],
+        "DESC. SITUACAO": ["Trabalhando"] * 4,
+        "Sindicato": [SP, RS, SP, RS],
+    }).to_excel(pasta / "ATIVOS.xlsx", index=False)
+    pd.DataFrame({
+        "MATRICULA ": [4],
+        "DATA DEMISSÃO": [pd.Timestamp(2025, 5, 1)],
+        "COMUNICADO DE DESLIGAMENTO": ["OK"],
+    }).to_excel(pasta / "DESLIGADOS.xlsx", index=False)
+    pd.DataFrame({
+        "BASE DIAS UTEIS": ["SINDICADO", SP, RS],
+        "Unnamed: 1": ["DIAS UTEIS ", 22, 21],
+    }).to_excel(pasta / "Base dias uteis.xlsx", index=False)
+    pd.DataFrame({"ESTADO": ["São Paulo", "Rio Grande do Sul"], "VALOR": [37.5, 35.0]}).to_excel(
+        pasta / "Base sindicato x valor.xlsx", index=False)
+    return pasta
+
+
+def test_periodo_vai_do_dia_15_anterior_ao_dia_15():
+    assert batch.periodo("2025-05") == (pd.Timestamp(2025, 4, 15), pd.Timestamp(2025, 5, 15))
+    assert batch.periodo("2025-01") == (pd.Timestamp(2024, 12, 15), pd.Timestamp(2025, 1, 15))
+
+
+def test_lote_com_dois_jobs_compartilha_referencias_e_grava_relatorio(tmp_path):
+    pasta = _pasta(tmp_path)
+    (tmp_path / "jobs.json").write_text(json.dumps([
+        {"competencia": "2025-05", "data_dir": str(pasta), "arquivos": ARQUIVOS},
+        {"competencia": "2025-04", "data_dir": str(pasta), "empresa": "2000", "arquivos": ARQUIVOS},
+    ]))
+    jobs = batch.load_jobs(tmp_path / "jobs.json")
+
+    refs, chaves = batch.carregar_referencias(jobs)
+    assert len(refs) == 2  # cada referência lida uma vez para os dois jobs
+    assert chaves[0] == chaves[1]
+
+    out = tmp_path / "out"
+    report = batch.run_batch(jobs, str(out), workers=1)
+
+    assert report["STATUS"].tolist() == ["ok", "ok"]
+    assert report["PERIODO_INICIO"].tolist() == ["2025-04-15", "2025-03-15"]
+    assert report["LINHAS"].tolist() == [3, 1]  # matrícula 4 desligada; job 2 só a empresa 2000
+    assert report["VR_TOTAL"].tolist() == [22 * 37.5 + 21 * 35.0 + 22 * 37.5, 22 * 37.5]
+    assert json.loads(report["EXCLUSOES"].iloc[1])["DESLIGADOS"] == 1
+
+    relatorio = pd.read_csv(out / batch.RELATORIO_PADRAO)
+    assert relatorio["STATUS"].tolist() == ["ok", "ok"]
+    assert (out / "VR_VA_COMPRA_05_2025.xlsx").exists()
+    assert (out / "VR_VA_COMPRA_04_2025_2000.xlsx").exists()
+
+
+def test_job_com_erro_nao_interrompe_o_lote(tmp_path):
+    pasta = _pasta(tmp_path)
+    jobs = [
+        batch.Job("2025-05", str(tmp_path / "nao_existe"), arquivos=ARQUIVOS),
+        batch.Job("2025-05", str(pasta), arquivos=ARQUIVOS),
+    ]
+    report = batch.run_batch(jobs, str(tmp_path / "out"), workers=1)
+    assert report["STATUS"].tolist() == ["erro", "ok"]
+
+
+def test_pool_de_processos_igual_ao_sequencial(tmp_path):
+    pasta = _pasta(tmp_path)
+    jobs = [batch.Job("2025-05", str(pasta), arquivos=ARQUIVOS),
+            batch.Job("2025-05", str(pasta), empresa="1410", arquivos=ARQUIVOS)]
+    um = batch.run_batch(jobs, str(tmp_path / "um"), workers=1)
+    dois = batch.run_batch(jobs, str(tmp_path / "dois"), workers=2)
+    colunas = ["STATUS", "LINHAS", "DIAS_COMPRAR", "VR_TOTAL", "EXCLUSOES"]
+    pd.testing.assert_frame_equal(um[colunas], dois[colunas])
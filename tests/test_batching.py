@@ -0,0 +1,24 @@
+import asyncio
+import json
+
+from app.batching import MicroBatcher, split_batch_response
+
+
+def test_close_despacha_o_lote_parcial():
+    async def cenario():
+        async def handler(itens):
+            return [i * 2 for i in itens]
+
+        batcher = MicroBatcher(handler, window_ms=10_000, max_batch=10)
+        pedidos = [asyncio.create_task(batcher.submit(i)) for i in range(3)]
+        await asyncio.sleep(0.05)  # itens já saíram da fila, esperando a janela
+        await asyncio.wait_for(batcher.close(), 2)
+        return await asyncio.wait_for(asyncio.gather(*pedidos), 2)
+
+    assert asyncio.run(cenario()) == [0, 2, 4]
+
+
+def test_split_batch_response_nao_altera_os_objetos():
+    dados = [{"id": 1, "categoria": "b"}, {"id": 0, "categoria": "a"}]
+    partes = split_batch_response(json.dumps(dados), 3)
+    assert partes == [{"categoria": "a"}, {"categoria": "b"}, None]
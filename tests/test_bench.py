@@ -0,0 +1,23 @@
+from vr_agent.bench import comparar
+
+
+def _rel(**medidas):
+    return {"resultados": [{"n": 1000, "etapa": etapa, "segundos": s, "pico_mib": m}
+                           for etapa, (s, m) in medidas.items()]}
+
+
+def test_comparar_ignora_ruido_abaixo_dos_pisos():
+    baseline = _rel(validate=(0.001, 0.0), save_layout=(0.01, 0.01))
+    atual = _rel(validate=(0.002, 0.02), save_layout=(0.03, 0.5))
+    assert comparar(atual, baseline) == []
+
+
+def test_comparar_baseline_zero():
+    regressoes = comparar(_rel(validate=(0.001, 5.0)), _rel(validate=(0.001, 0.0)))
+    assert regressoes == [{"n": 1000, "etapa": "validate", "campo": "pico_mib",
+                           "baseline": 0.0, "atual": 5.0, "variacao": None}]
+
+
+def test_comparar_regressao_de_tempo():
+    regressoes = comparar(_rel(load_bases=(2.0, 10.0)), _rel(load_bases=(1.0, 10.0)))
+    assert [(r["campo"], r["variacao"]) for r in regressoes] == [("segundos", 1.0)]
@@ -0,0 +1,18 @@
+from vr_agent.cache import _prune_stale
+
+
+def test_prune_stale_so_remove_o_mesmo_stem(tmp_path):
+    nomes = [
+        "ATIVOS.aaa.s0.v1.parquet",
+        "ATIVOS.bbb.s0.v1.parquet",
+        "ATIVOS.v2.ccc.s0.v1.parquet",
+        "ATIVOS.ddd.s0.v2.parquet",
+    ]
+    for nome in nomes:
+        (tmp_path / nome).touch()
+    _prune_stale(tmp_path / "ATIVOS.bbb.s0.v1.parquet")
+    assert sorted(p.name for p in tmp_path.iterdir()) == [
+        "ATIVOS.bbb.s0.v1.parquet",
+        "ATIVOS.ddd.s0.v2.parquet",
+        "ATIVOS.v2.ccc.s0.v1.parquet",
+    ]
@@ -0,0 +1,63 @@
+import pandas as pd
+
+from vr_agent import rules_old
+from vr_agent.incremental import DELTA_PADRAO, compute_layout_incremental
+
+SP = "SINDPD SP - SIND.TRAB.EM PROC DADOS E EMPR.EMPRESAS PROC DADOS ESTADO DE SP."
+RS = "SINDPPD RS - SINDICATO DOS TRAB. EM PROC. DE DADOS RIO GRANDE DO SUL"
+
+
+def _bases():
+    return {
+        "ativos": pd.DataFrame({
+            "MATRICULA": [1, 2, 3, 4],
+            "EMPRESA": [1410] * 4,
+            "TITULO DO CARGO": ["ANALISTA"] * 4,
+            "SINDICATO": [SP, RS, SP, RS],
+        }),
+        "deslig": pd.DataFrame({"MATRICULA": [4], "DATA DEMISSÃO": [pd.Timestamp(2025, 5, 1)]}),
+        "adm": pd.DataFrame({"MATRICULA": [1], "ADMISSÃO": [pd.Timestamp(2025, 5, 2)]}),
+        "diasuteis": pd.DataFrame({"SINDICATO": [SP, RS], "DIAS": [22, 21]}),
+        "sind_valor": pd.DataFrame({"ESTADO": ["São Paulo", "Rio Grande do Sul"], "VALOR": [37.5, 35.0]}),
+    }
+
+
+def _rodar(state, bases):
+    layout = compute_layout_incremental(state, **bases)
+    delta = pd.read_csv(state / DELTA_PADRAO, keep_default_na=False)
+    return layout, delta, layout.attrs["incremental"]
+
+
+def _completo(bases):
+    return rules_old.compute_layout(bases["ativos"], bases["deslig"], bases["adm"], None, None, None,
+                                    bases["diasuteis"], bases["sind_valor"])
+
+
+def test_recalcula_so_as_etapas_afetadas_e_grava_o_delta(tmp_path):
+    state = tmp_path / "estado"
+    bases = _bases()
+
+    layout, delta, resumo = _rodar(state, bases)
+    assert sorted(resumo["recalculadas"]) == ["admissao", "base", "dias_uteis", "valor"]
+    assert sorted(delta["MATRICULA"]) == [1, 2, 3]
+    assert set(delta["TIPO"]) == {"ADICIONADA"}
+    pd.testing.assert_frame_equal(layout, _completo(bases))
+
+    # nada mudou: tudo vem do estado salvo e o delta fica vazio
+    layout, delta, resumo = _rodar(state, bases)
+    assert resumo["recalculadas"] == []
+    assert delta.empty
+
+    # DESLIGADOS reenviada com mais uma matrícula: só a etapa "base" roda
+    bases["deslig"] = pd.DataFrame({"MATRICULA": [4, 3], "DATA DEMISSÃO": [pd.Timestamp(2025, 5, 1)] * 2})
+    layout, delta, resumo = _rodar(state, bases)
+    assert resumo["recalculadas"] == ["base"]
+    assert delta[["MATRICULA", "TIPO"]].values.tolist() == [[3, "REMOVIDA"]]
+    pd.testing.assert_frame_equal(layout, _completo(bases))
+
+    # admissão nova para a matrícula 2: só "admissao" roda e só a 2 muda
+    bases["adm"] = pd.DataFrame({"MATRICULA": [1, 2], "ADMISSÃO": [pd.Timestamp(2025, 5, 2)] * 2})
+    layout, delta, resumo = _rodar(state, bases)
+    assert resumo["recalculadas"] == ["admissao"]
+    assert delta.values.tolist() == [[2, "ALTERADA", "ADMISSÃO,DIAS_COMPRAR,VR_TOTAL"]]
+    pd.testing.assert_frame_equal(layout, _completo(bases))
@@ -0,0 +1,48 @@
+import numpy as np
+import pandas as pd
+from openpyxl import load_workbook
+
+from vr_agent.io_utils import load_sheet_filtered, save_layout, write_layout
+
+
+def test_parquet_com_primeiro_bloco_nulo_ou_inteiro(tmp_path):
+    df = pd.DataFrame({
+        "OBS": [None, None, "texto", "outro"],
+        "VALOR": [1, 2, 3.5, np.nan],
+    })
+    df["VALOR"] = df["VALOR"].astype(object)
+    df.loc[[0, 1], "VALOR"] = [1, 2]
+    paths = write_layout(df, tmp_path / "layout.parquet", formats=["parquet", "csv"], chunksize=2)
+    lido = pd.read_parquet(paths["parquet"])
+    assert lido["OBS"].tolist() == [None, None, "texto", "outro"]
+    assert lido["VALOR"].tolist()[:3] == [1.0, 2.0, 3.5]
+    assert len(pd.read_csv(paths["csv"])) == 4
+
+
+def test_header_repetido_como_no_read_excel(tmp_path):
+    path = tmp_path / "dup.xlsx"
+    pd.DataFrame([[1, 2, 3, 4, 5]]).to_excel(path, index=False, header=False, startrow=1)
+    wb = load_workbook(path)
+    for col, nome in enumerate(["A", "A", None, "A.1", None], start=1):
+        wb.active.cell(row=1, column=col, value=nome)
+    wb.save(path)
+    esperado = pd.read_excel(path)
+    lido = load_sheet_filtered(path, chunksize=1)
+    assert list(lido.columns) == [str(c).strip().upper() for c in esperado.columns]
+
+
+def test_save_layout_mantem_o_nome_e_grava_excel_se_a_extensao_for_desconhecida(tmp_path):
+    df = pd.DataFrame({"MATRICULA": [1, 2], "VR_TOTAL": [10.0, 20.5]})
+
+    xls = save_layout(df, tmp_path / "VR_VA_COMPRA.xls")
+    assert xls == str(tmp_path / "VR_VA_COMPRA.xls")
+    pd.testing.assert_frame_equal(pd.read_excel(xls, engine="openpyxl"), df)
+
+    pontos = save_layout(df, tmp_path / "VR.05.2025", formats=["csv", "xlsx"])
+    assert pontos == str(tmp_path / "VR.05.2025")
+    pd.testing.assert_frame_equal(pd.read_excel(pontos, engine="openpyxl"), df)
+    pd.testing.assert_frame_equal(pd.read_csv(tmp_path / "VR.05.2025.csv"), df)
+
+    csv = save_layout(df, tmp_path / "saida.csv", formats=["parquet"])
+    assert csv == str(tmp_path / "saida.csv")
+    assert (tmp_path / "saida.parquet").exists()
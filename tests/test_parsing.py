@@ -0,0 +1,26 @@
+from typing import Any, Optional
+
+from pydantic import BaseModel
+
+from app.parsing import Classificacao, with_response_schema
+
+
+class _Agente(BaseModel):
+    name: str = "classificador"
+    output_schema: Optional[Any] = None
+    tools: list = []
+    sub_agents: list = []
+
+
+def test_with_response_schema_nao_altera_o_agente_original():
+    agente = _Agente()
+    copia = with_response_schema(agente, Classificacao)
+    assert copia is not agente
+    assert copia.output_schema is Classificacao
+    assert agente.output_schema is None
+
+
+def test_with_response_schema_preserva_agente_com_tools():
+    agente = _Agente(tools=[object()])
+    assert with_response_schema(agente, Classificacao) is agente
+    assert agente.output_schema is None
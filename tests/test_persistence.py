@@ -0,0 +1,28 @@
+import asyncio
+import sqlite3
+
+from app.persistence import ClassificationWriter
+
+
+def test_writer_conta_linhas_gravadas_e_sobrevive_a_erros(tmp_path):
+    db = str(tmp_path / "classificacoes.db")
+
+    async def cenario():
+        writer = ClassificationWriter(db_path=db, flush_interval=0.01)
+        await writer.start()
+        writer.enqueue("u1", "s1", "texto", {"motivo": "a", "submotivo": "x"})
+        writer.enqueue("u1", "s1", "texto", {"motivo": "b", "submotivo": "y"})
+        await asyncio.sleep(0.1)
+        # um lote com erro inesperado (registro malformado) não derruba o writer
+        writer._queue.put_nowait(None)
+        await asyncio.sleep(0.1)
+        writer.enqueue("u2", "s2", "outro", {"motivo": "c", "submotivo": "z"})
+        await writer.close()
+        return writer.stats()
+
+    stats = asyncio.run(cenario())
+    assert stats["written"] == 2
+    assert stats["failed"] == 1
+    with sqlite3.connect(db) as conn:
+        linhas = conn.execute("SELECT user_id, motivo FROM classificacoes ORDER BY user_id").fetchall()
+    assert linhas == [("u1", "b"), ("u2", "c")]
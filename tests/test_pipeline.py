@@ -0,0 +1,65 @@
+import shutil
+from pathlib import Path
+
+import pandas as pd
+import pytest
+
+from vr_agent import rules_old
+from vr_agent.pipeline import ARQUIVOS_PADRAO, executar, load_bases
+
+DATA = Path(__file__).resolve().parents[1] / "data"
+
+
+@pytest.fixture
+def data_dir(tmp_path):
+    # cópia da ./data: o cache Parquet fica no tmp, não no repositório
+    destino = tmp_path / "data"
+    shutil.copytree(DATA, destino, ignore=shutil.ignore_patterns(".cache"))
+    return destino
+
+
+def test_arquivos_padrao_carregam_todas_as_bases(data_dir):
+    bases = load_bases(data_dir, ARQUIVOS_PADRAO, workers=1)
+    assert len(bases) == 10
+    faltando = [nome for nome, df in bases.items() if df is None]
+    assert faltando == []
+
+
+def test_ativos_filtrado_em_blocos_igual_ao_cache(data_dir):
+    def layout(bases):
+        return rules_old.compute_layout(
+            bases["ativos"], bases["deslig"], bases["adm"], bases["afast"], bases["aprendiz"],
+            bases["estagio"], bases["diasuteis"], bases["sind_valor"], exterior=bases["exterior"],
+        )
+
+    crus = load_bases(data_dir, ARQUIVOS_PADRAO, workers=1)
+    cache = load_bases(data_dir, ARQUIVOS_PADRAO, workers=1, filtrar_ativos=True, streaming=False)
+    blocos = load_bases(data_dir, ARQUIVOS_PADRAO, workers=1, filtrar_ativos=True, streaming=True)
+
+    assert len(blocos["ativos"]) < len(crus["ativos"])
+    pd.testing.assert_frame_equal(cache["ativos"].reset_index(drop=True), blocos["ativos"].reset_index(drop=True))
+    assert cache["ativos"].attrs["exclusoes"] == blocos["ativos"].attrs["exclusoes"]
+    pd.testing.assert_frame_equal(cache["deslig"], blocos["deslig"])
+
+    esperado = layout(crus)
+    for bases in (cache, blocos):
+        obtido = layout(bases)
+        pd.testing.assert_frame_equal(esperado.reset_index(drop=True), obtido.reset_index(drop=True))
+        assert obtido.attrs["exclusoes"] == esperado.attrs["exclusoes"]
+
+
+def test_situacao_filtra_ativos_na_leitura(data_dir):
+    cache = load_bases(data_dir, ARQUIVOS_PADRAO, workers=1, filtrar_ativos=True, situacao="Trabalhando")
+    blocos = load_bases(data_dir, ARQUIVOS_PADRAO, workers=1, filtrar_ativos=True, situacao="trabalhando",
+                        streaming=True)
+    for bases in (cache, blocos):
+        assert set(bases["ativos"]["DESC. SITUACAO"]) == {"Trabalhando"}
+    assert len(cache["ativos"]) == len(blocos["ativos"])
+    with pytest.raises(ValueError):
+        load_bases(data_dir, ARQUIVOS_PADRAO, workers=1, situacao="Trabalhando")
+
+
+def test_executar_mantem_ativos_inteira_por_padrao(data_dir):
+    ativos = load_bases(data_dir, ARQUIVOS_PADRAO, workers=1)["ativos"]
+    resultado = executar(str(data_dir), "saida.xlsx", ARQUIVOS_PADRAO, formats=[], workers=1)
+    assert resultado["linhas"] == len(ativos)
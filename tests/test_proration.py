@@ -0,0 +1,61 @@
+import numpy as np
+import pandas as pd
+
+from vr_agent import rules_old
+from vr_agent.proration import prorate, prorate_by_local, prorate_series
+
+INICIO, FIM = rules_old.PERIOD_START, rules_old.PERIOD_END
+
+
+def _datas(rng, n):
+    # datas antes, dentro e depois do período (e vazias), incluindo fins de semana e horas
+    dias = rng.integers(-40, 70, n)
+    datas = pd.Series(INICIO + pd.to_timedelta(dias, unit="D") + pd.to_timedelta(rng.integers(0, 24, n), unit="h"))
+    return datas.mask(rng.random(n) < 0.3)
+
+
+def _por_linha(base_days, adm, dem):
+    """Referência linha a linha com bdate_range, como ``prorate_by_admission``."""
+    total = len(pd.bdate_range(INICIO, FIM, freq="C"))
+    if pd.isna(adm) and pd.isna(dem):
+        return base_days
+    if (pd.notna(adm) and adm > FIM) or (pd.notna(dem) and dem < INICIO):
+        return 0
+    inicio = max(adm, INICIO) if pd.notna(adm) else INICIO
+    fim = min(dem, FIM) if pd.notna(dem) else FIM
+    dias = len(pd.bdate_range(inicio, fim, freq="C"))
+    return min(base_days, int(round(base_days * dias / total)))
+
+
+def test_prorate_igual_ao_prorate_by_admission():
+    rng = np.random.default_rng(7)
+    base_days = pd.Series(rng.integers(15, 23, 300))
+    adm = _datas(rng, 300)
+    esperado = [rules_old.prorate_by_admission(b, a) for b, a in zip(base_days, adm)]
+    assert prorate(base_days, INICIO, FIM, admissao=adm).tolist() == esperado
+
+
+def test_prorate_com_demissao_igual_ao_calculo_por_linha():
+    rng = np.random.default_rng(11)
+    base_days = pd.Series(rng.integers(15, 23, 300))
+    adm, dem = _datas(rng, 300), _datas(rng, 300)
+    esperado = [_por_linha(b, a, d) for b, a, d in zip(base_days, adm, dem)]
+    assert prorate(base_days, INICIO, FIM, admissao=adm, demissao=dem).tolist() == esperado
+
+
+def test_prorate_series_aceita_texto_e_mantem_o_indice():
+    base_days = pd.Series([22, 22, 22, 22], index=[10, 11, 12, 13])
+    adm = pd.Series(["01/05/2025", None, "20/05/2025", "10/04/2025"], index=base_days.index)
+    dias = prorate_series(base_days, INICIO, FIM, admissao=adm)
+    assert dias.index.tolist() == [10, 11, 12, 13]
+    assert dias.tolist() == [rules_old.prorate_by_admission(22, a) for a in pd.to_datetime(adm, dayfirst=True)]
+    assert dias.tolist()[1:] == [22, 0, 22]
+
+
+def test_prorate_by_local_sem_feriados_igual_ao_prorate():
+    rng = np.random.default_rng(3)
+    base_days = pd.Series(rng.integers(15, 23, 120))
+    adm, dem = _datas(rng, 120), _datas(rng, 120)
+    uf = pd.Series(rng.choice(["SP", "PR", "RS", None], 120))
+    por_local = prorate_by_local(base_days, INICIO, FIM, uf, admissao=adm, demissao=dem, feriados=False)
+    assert por_local.tolist() == prorate(base_days, INICIO, FIM, admissao=adm, demissao=dem).tolist()
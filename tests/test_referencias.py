@@ -0,0 +1,34 @@
+import shutil
+from pathlib import Path
+
+import pandas as pd
+
+from vr_agent import rules_old
+from vr_agent.pipeline import ARQUIVOS_PADRAO, load_bases
+from vr_agent.referencias import valor_lookup
+
+DATA = Path(__file__).resolve().parents[1] / "data"
+
+
+def test_valor_lookup_chaveia_pela_sigla_da_uf():
+    sind_valor = pd.DataFrame({
+        "ESTADO": ["Paraná", "Rio de Janeiro", "Rio Grande do Sul", "São Paulo"],
+        "VALOR": [35.0, 35.0, 35.0, 37.5],
+    })
+    sv = valor_lookup(sind_valor)
+    vr = sv.map(pd.Series(["SP", "PR", "RS", "RJ", None]))
+    assert vr.tolist()[:4] == [37.5, 35.0, 35.0, 35.0]
+    assert pd.isna(vr.iloc[4])
+
+
+def test_layout_de_sp_usa_o_valor_de_sao_paulo(tmp_path):
+    data_dir = tmp_path / "data"
+    shutil.copytree(DATA, data_dir, ignore=shutil.ignore_patterns(".cache"))
+    bases = load_bases(data_dir, ARQUIVOS_PADRAO, workers=1)
+    bases.pop("ferias")
+    layout = rules_old.compute_layout(**bases)
+    vr_dia = layout.groupby("UF_INFERIDA")["VR_DIA"].unique().to_dict()
+    assert list(vr_dia["SP"]) == [37.5]
+    assert list(vr_dia["PR"]) == [35.0]
+    # a mudança de valoração atinge só as linhas de SP
+    assert (layout["VR_DIA"] != 35.0).sum() == (layout["UF_INFERIDA"] == "SP").sum()
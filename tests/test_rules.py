@@ -0,0 +1,20 @@
+import pandas as pd
+
+from vr_agent.rules import compute_layout, sanitize_df
+
+
+def test_sanitize_df_nao_altera_o_frame_recebido():
+    df = pd.DataFrame({"NOME": ["a\u200b", None], "VALOR": [1.0, 2.0]})
+    limpo = sanitize_df(df)
+    assert limpo["NOME"].tolist() == ["a", "0"]
+    assert df["NOME"].tolist() == ["a\u200b", None]
+    assert df.attrs == {}
+
+
+def test_compute_layout_preserva_as_bases_do_chamador():
+    ativos = pd.DataFrame({"MATRICULA": [1, 2], "SINDICATO": ["sind\u200b sp", None]})
+    antes = ativos.copy()
+    layout = compute_layout(ativos)
+    assert layout["SINDICATO"].tolist() == ["SIND SP", "0"]
+    pd.testing.assert_frame_equal(ativos, antes)
+    assert ativos.attrs == {}
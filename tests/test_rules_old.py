@@ -0,0 +1,41 @@
+import pandas as pd
+
+from vr_agent import rules_old
+from vr_agent.incremental import layout_delta
+
+
+def _ativos(matriculas):
+    return pd.DataFrame({
+        "MATRICULA": matriculas,
+        "EMPRESA": [1410] * len(matriculas),
+        "TITULO DO CARGO": ["ANALISTA"] * len(matriculas),
+        "SINDICATO": ["SINDPD SP - SIND"] * len(matriculas),
+    })
+
+
+def test_matricula_inteira_segue_inteira_no_layout():
+    ativos = _ativos(pd.Series([30, 10, 20], dtype="int32"))
+    deslig = pd.DataFrame({"MATRICULA": pd.Series([20], dtype="int32")})
+    adm = pd.DataFrame({"MATRICULA": ["10", "x1", None], "ADMISSÃO": pd.Timestamp(2025, 5, 1)})
+    layout = rules_old.compute_layout(ativos, deslig, adm, None, None, None, None, None)
+    assert layout["MATRICULA"].dtype == "int32"
+    assert layout["MATRICULA"].tolist() == [10, 30]
+    assert layout.attrs["exclusoes"]["DESLIGADOS"] == 1
+    admissao = layout.set_index("MATRICULA")["ADMISSÃO"]
+    assert admissao[10] == pd.Timestamp(2025, 5, 1)
+    assert pd.isna(admissao[30])
+
+
+def test_matricula_texto_casa_com_admissao_inteira():
+    ativos = _ativos(["10", "A7"])
+    adm = pd.DataFrame({"MATRICULA": pd.Series([10], dtype="int32"), "ADMISSÃO": pd.Timestamp(2025, 5, 1)})
+    layout = rules_old.compute_layout(ativos, None, adm, None, None, None, None, None)
+    assert layout["MATRICULA"].tolist() == ["10", "A7"]
+    assert layout["ADMISSÃO"].notna().tolist() == [True, False]
+
+
+def test_layout_delta_compara_layout_antigo_em_texto():
+    depois = pd.DataFrame({"MATRICULA": pd.Series([1, 2], dtype="int32"), "VR_TOTAL": [10.0, 20.0]})
+    antes = pd.DataFrame({"MATRICULA": ["1", "3"], "VR_TOTAL": [10.0, 5.0]})
+    delta = layout_delta(antes, depois)
+    assert sorted(zip(delta["MATRICULA"], delta["TIPO"])) == [("2", "ADICIONADA"), ("3", "REMOVIDA")]
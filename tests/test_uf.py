@@ -0,0 +1,53 @@
+import pandas as pd
+import pytest
+
+from vr_agent.uf import UF_LIST, resolve_uf, uf_code, uf_from_sindicato
+
+SP = "SINDPD SP - SIND.TRAB.EM PROC DADOS E EMPR.EMPRESAS PROC DADOS ESTADO DE SP."
+RS = "SINDPPD RS - SINDICATO DOS TRAB. EM PROC. DE DADOS RIO GRANDE DO SUL"
+PR = "SITEPD PR - SIND DOS TRAB EM EMPR PRIVADAS DE PROC DE DADOS DE CURITIBA E REGIAO METROPOLITANA"
+RJ = "SINDPD RJ - SINDICATO PROFISSIONAIS DE PROC DADOS DO RIO DE JANEIRO"
+
+
+def _antigo(s):
+    """``infer_uf_from_sindicato`` anterior, linha a linha."""
+    t = str(s).upper().strip()
+    for uf in UF_LIST:
+        if f" {uf} " in f" {t} " or t.startswith(uf + " ") or t.startswith("SINDPD " + uf) or f"- {uf} " in t:
+            return uf
+    return None
+
+
+@pytest.mark.parametrize("sindicato, esperado", [
+    (SP, "SP"),
+    (RS, "RS"),
+    (PR, "PR"),
+    (RJ, "RJ"),
+    (" sindpd sp - minúsculo ", "SP"),
+    ("SINDICATO SEM ESTADO", None),
+    ("nan", None),
+])
+def test_uf_from_sindicato_igual_a_regra_antiga(sindicato, esperado):
+    assert uf_from_sindicato(sindicato) == esperado == _antigo(sindicato)
+
+
+@pytest.mark.parametrize("sindicato, esperado, antigo", [
+    # override do prompt: "SITEPD PR" sem espaço depois da sigla não era reconhecido
+    ("SITEPD PR-CURITIBA", "PR", None),
+    # override tem prioridade sobre outra sigla solta no texto (antes valia a primeira de UF_LIST)
+    ("SINDPPD RS - FILIAL PR", "RS", "PR"),
+])
+def test_overrides_de_sindicato(sindicato, esperado, antigo):
+    assert uf_from_sindicato(sindicato) == esperado
+    assert _antigo(sindicato) == antigo
+
+
+def test_resolve_uf_por_linha_igual_ao_apply():
+    sindicatos = pd.Series([SP, RS, None, PR, SP, RJ, "OUTRO", RS], index=range(10, 18))
+    ufs = resolve_uf(sindicatos)
+    assert ufs.index.equals(sindicatos.index)
+    assert ufs.tolist() == [_antigo(s) if s is not None else None for s in sindicatos]
+
+
+def test_uf_code_aceita_nome_ou_sigla():
+    assert [uf_code(x) for x in ["São Paulo", "PARANA", "rj", "Exterior"]] == ["SP", "PR", "RJ", None]
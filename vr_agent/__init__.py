@@ -1 +1,9 @@
-from . import agent
\ No newline at end of file
+import importlib
+
+
+def __getattr__(name):
+    # ``vr_agent.agent`` (e o ADK) só são importados quando pedidos; o modo
+    # direto (vr_agent.run / vr_agent.pipeline) não paga esse custo
+    if name == "agent":
+        return importlib.import_module(f"{__name__}.agent")
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -1,11 +1,12 @@
 ### # vr_agent/agent.py
-import os
 import logging
 from pathlib import Path
 from dotenv import load_dotenv
 from google.adk.agents import Agent
-from .io_utils import load_first_sheet, save_layout
-from .rules import compute_layout, validate   # ✅ importa do rules.py
+from .io_utils import load_first_sheet
+from .cache import default_cache_dir
+# Pipeline determinístico (sem LLM); load_bases e OUTPUT_FORMATS_ENV seguem exportados daqui
+from .pipeline import OUTPUT_FORMATS_ENV, executar, load_bases  # noqa: F401
 
 load_dotenv()
 
@@ -18,94 +19,17 @@ if not logger.handlers:
     )
 
 
-def load_bases(base_dir: str, arquivos: dict) -> dict:
-    """Carrega planilhas a partir do diretório ./data"""
-    base_dir = Path(base_dir).resolve()
-    base_dir.mkdir(parents=True, exist_ok=True)
-
-    def maybe(name):
-        filename = (
-            arquivos.get(name)
-            or arquivos.get(f"{name}.xlsx")
-            or arquivos.get(f"{name}.xls")
-        )
-        if not filename:
-            logger.warning(f"⚠️ Nenhum arquivo encontrado para base {name}")
-            return None
-        path = base_dir / filename
-        if not path.exists():
-            raise FileNotFoundError(f"Arquivo esperado não encontrado: {path}")
-        logger.info(f"📂 Carregando base: {path.name}")
-        return load_first_sheet(path)
-
-    bases = {
-        "ativos": maybe("ATIVOS"),
-        "deslig": maybe("DESLIGADOS"),
-        "adm": maybe("ADMISSÃO ABRIL"),
-        "afast": maybe("AFASTAMENTOS"),
-        "aprendiz": maybe("APRENDIZ"),
-        "estagio": maybe("ESTÁGIO"),
-        "diasuteis": maybe("BASE_DIAS_UTEIS"),
-        "sind_valor": maybe("BASE_SINDICATO_VALOR"),
-        "ferias": maybe("FÉRIAS"),
-        "exterior": maybe("EXTERIOR"),
-    }
-    logger.info("✅ Todas as bases foram carregadas.")
-    return bases
-
-
 def gerar_compra_vr(base_dir: str, saida_arquivo: str, arquivos: dict) -> dict:
-    """Gera layout VR/VA e salva em Excel."""
+    """Gera layout VR/VA e salva em Excel, com cópias ao lado (mesmo nome, outra
+    extensão: ``<saida>.csv`` por padrão, ou os formatos de VR_AGENT_OUTPUT_FORMATS)."""
     logger.info("🚀 Iniciando gerar_compra_vr")
-
-    bases = load_bases(base_dir, arquivos)
-
-    if bases["ativos"] is None:
-        logger.error("❌ Base ATIVOS.xlsx não carregada.")
-        raise ValueError("A base ATIVOS.xlsx não foi carregada.")
-
-    # ✅ chama regras do rules.py
-    logger.info("⚙️ Executando compute_layout...")
-    layout = compute_layout(
-        ativos=bases["ativos"],
-        deslig=bases["deslig"],
-        adm=bases["adm"],
-        afast=bases["afast"],
-        aprendiz=bases["aprendiz"],
-        estagio=bases["estagio"],
-        diasuteis=bases["diasuteis"],
-        sind_valor=bases["sind_valor"],
-        ferias=bases["ferias"],
-        exterior=bases["exterior"],
-    )
-    logger.info(f"📊 Layout consolidado com {len(layout)} registros.")
-
-    # ✅ roda validação
-    logger.info("🔎 Rodando validação do layout...")
-    issues = validate(layout)
-    if issues:
-        logger.warning(f"⚠️ Validação encontrou problemas: {issues}")
-    else:
-        logger.info("✅ Validação concluída sem problemas.")
-
-    # Salva saída
-    base_dir = Path(base_dir)
-    base_dir.mkdir(parents=True, exist_ok=True)
-    path = save_layout(layout, base_dir / saida_arquivo)
-    logger.info(f"💾 Layout salvo em: {path}")
-
-    return {
-        "status": "ok",
-        "arquivo": str(path),
-        "avisos": issues,
-        "linhas": len(layout),
-    }
+    return executar(base_dir, saida_arquivo, arquivos)
 
 
 def inspecionar_colunas(base_dir: str, arquivo: str) -> dict:
     """Inspeciona colunas e amostra de um arquivo Excel."""
     logger.info(f"🔍 Inspecionando colunas do arquivo: {arquivo}")
-    df = load_first_sheet(Path(base_dir) / arquivo)
+    df = load_first_sheet(Path(base_dir) / arquivo, cache_dir=default_cache_dir(base_dir))
     return {
         "arquivo": arquivo,
         "colunas": list(df.columns),
@@ -0,0 +1,220 @@
+import json
+import logging
+import time
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Iterable, List, Optional
+
+import pandas as pd
+
+from . import rules_old
+from .cache import file_digest
+from .io_utils import load_workers, save_layout
+from .pipeline import ARQUIVOS_PADRAO, load_bases
+from .referencias import load_lookup
+
+logger = logging.getLogger(__name__)
+
+# Tabelas de referência lidas uma única vez e compartilhadas entre os jobs
+REFERENCIAS = {"diasuteis": "BASE_DIAS_UTEIS", "sind_valor": "BASE_SINDICATO_VALOR"}
+
+RELATORIO_PADRAO = "relatorio_lote.csv"
+
+# Referências já indexadas, por (base, digest do arquivo) (preenchido em cada processo)
+_REFS: dict = {}
+
+
+@dataclass
+class Job:
+    """Uma compra: competência (``AAAA-MM``), empresa opcional e pasta das planilhas."""
+
+    competencia: str
+    data_dir: str
+    empresa: Optional[str] = None
+    saida: Optional[str] = None
+    arquivos: dict = field(default_factory=lambda: dict(ARQUIVOS_PADRAO))
+
+    @property
+    def nome_saida(self) -> str:
+        if self.saida:
+            return self.saida
+        ano, mes = self.competencia.split("-")
+        sufixo = f"_{self.empresa}" if self.empresa else ""
+        return f"VR_VA_COMPRA_{mes}_{ano}{sufixo}.xlsx"
+
+
+def periodo(competencia: str) -> tuple:
+    """Período de compra da competência: dia 15 do mês anterior até o dia 15 do mês.
+
+    ``"2025-05"`` → (2025-04-15, 2025-05-15), como PERIOD_START/PERIOD_END.
+    """
+    fim = pd.Period(competencia, freq="M").to_timestamp() + pd.Timedelta(days=14)
+    return fim - pd.DateOffset(months=1), fim
+
+
+def load_jobs(path) -> List[Job]:
+    """Lê a lista de jobs de um CSV/XLSX (colunas COMPETENCIA, DATA_DIR e,
+    opcionalmente, EMPRESA e SAIDA) ou de um JSON (lista de objetos)."""
+    path = Path(path)
+    if path.suffix.lower() == ".json":
+        registros = json.loads(path.read_text(encoding="utf-8"))
+    else:
+        df = pd.read_csv(path, dtype=str) if path.suffix.lower() == ".csv" else pd.read_excel(path, dtype=str)
+        df.columns = [str(c).strip().lower() for c in df.columns]
+        registros = df.where(df.notna(), None).to_dict(orient="records")
+    return [Job(**{k: v for k, v in r.items() if v is not None}) for r in registros]
+
+
+def _ref_path(job: Job, chave: str, ref_dir: Optional[str]) -> Optional[Path]:
+    nome = job.arquivos.get(REFERENCIAS[chave])
+    if not nome:
+        return None
+    path = Path(ref_dir or job.data_dir) / nome
+    if not path.exists():
+        raise FileNotFoundError(f"Arquivo esperado não encontrado: {path}")
+    return path
+
+
+def carregar_referencias(jobs: Iterable[Job], ref_dir: Optional[str] = None) -> tuple:
+    """Lê e indexa cada arquivo de referência distinto (por conteúdo) uma única vez.
+
+    Devolve ``(refs, chaves)``: ``refs`` mapeia (base, digest) → ``RefLookup`` e ``chaves``
+    traz, para cada job, o digest de cada referência (ou None), ou ``{"erro": ...}``
+    se a referência do job não pôde ser lida.
+    """
+    refs, chaves, digests = {}, [], {}
+    for job in jobs:
+        chave_job = {}
+        try:
+            for chave in REFERENCIAS:
+                path = _ref_path(job, chave, ref_dir)
+                if path is None:
+                    chave_job[chave] = None
+                    continue
+                resolved = path.resolve()
+                if resolved not in digests:
+                    digests[resolved] = file_digest(resolved)
+                digest = digests[resolved]
+                if (chave, digest) not in refs:
+                    refs[chave, digest] = load_lookup(chave, resolved, digest=digest)
+                chave_job[chave] = digest
+        except Exception as exc:
+            # o job falha sozinho (no relatório); os demais seguem
+            chave_job = {"erro": str(exc)}
+        chaves.append(chave_job)
+    return refs, chaves
+
+
+def _init_worker(refs: dict) -> None:
+    global _REFS
+    _REFS = refs
+
+
+def run_job(job: Job, ref_keys: dict, out_dir: str, formats: Optional[List[str]] = None,
+            feriados: bool = False) -> dict:
+    """Executa um job com as referências compartilhadas e devolve a linha do relatório."""
+    t0 = time.perf_counter()
+    inicio, fim = periodo(job.competencia)
+    linha = {
+        "COMPETENCIA": job.competencia,
+        "EMPRESA": job.empresa,
+        "DATA_DIR": job.data_dir,
+        "PERIODO_INICIO": inicio.date().isoformat(),
+        "PERIODO_FIM": fim.date().isoformat(),
+    }
+    try:
+        if "erro" in ref_keys:
+            raise FileNotFoundError(ref_keys["erro"])
+        # ATIVOS já chega só com a empresa do job e sem as exclusões (em blocos, se for grande)
+        bases = load_bases(job.data_dir, job.arquivos, workers=1, skip=REFERENCIAS,
+                           filtrar_ativos=True, empresa=job.empresa)
+        ativos = bases["ativos"]
+        if ativos is None:
+            raise ValueError("A base ATIVOS.xlsx não foi carregada.")
+        refs = {chave: _REFS.get((chave, digest)) if digest else None for chave, digest in ref_keys.items()}
+        layout = rules_old.compute_layout(
+            ativos, bases["deslig"], bases["adm"], bases["afast"], bases["aprendiz"], bases["estagio"],
+            refs["diasuteis"], refs["sind_valor"], feriados=feriados, exterior=bases["exterior"],
+            period_start=inicio, period_end=fim,
+        )
+        avisos = rules_old.validate(layout)
+        out = Path(out_dir)
+        out.mkdir(parents=True, exist_ok=True)
+        path = save_layout(layout, out / job.nome_saida, formats=formats or [])
+        linha.update({
+            "STATUS": "ok",
+            "ARQUIVO": path,
+            "LINHAS": len(layout),
+            "DIAS_COMPRAR": int(layout["DIAS_COMPRAR"].sum()),
+            "VR_TOTAL": round(float(layout["VR_TOTAL"].sum()), 2),
+            "EXCLUSOES": json.dumps(layout.attrs.get("exclusoes", {}), ensure_ascii=False),
+            "AVISOS": "; ".join(avisos),
+        })
+    except Exception as exc:
+        logger.error(f"❌ Job {job.competencia}/{job.empresa or '-'} ({job.data_dir}) falhou: {exc}")
+        linha.update({"STATUS": "erro", "AVISOS": str(exc)})
+    linha["SEGUNDOS"] = round(time.perf_counter() - t0, 3)
+    return linha
+
+
+def run_batch(
+    jobs: List[Job],
+    out_dir: str,
+    ref_dir: Optional[str] = None,
+    workers: int = None,
+    formats: Optional[List[str]] = None,
+    feriados: bool = False,
+    relatorio: str = RELATORIO_PADRAO,
+) -> pd.DataFrame:
+    """Roda vários jobs (competência × empresa × pasta) num pool de processos.
+
+    As tabelas de referência são lidas uma vez no processo principal e
+    enviadas uma única vez a cada worker (initializer), não a cada job. Um
+    job com erro não interrompe os demais: aparece com STATUS "erro" no
+    relatório consolidado, gravado em ``out_dir/relatorio``.
+    """
+    refs, chaves = carregar_referencias(jobs, ref_dir)
+    workers = min(load_workers(workers), len(jobs)) if jobs else 1
+    logger.info(f"🗂️ Lote com {len(jobs)} jobs, {len(refs)} referências, {workers} processo(s)")
+
+    if workers <= 1:
+        _init_worker(refs)
+        linhas = [run_job(job, k, out_dir, formats, feriados) for job, k in zip(jobs, chaves)]
+    else:
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(refs,)) as pool:
+            futures = [pool.submit(run_job, job, k, out_dir, formats, feriados) for job, k in zip(jobs, chaves)]
+            linhas = [f.result() for f in futures]
+
+    report = pd.DataFrame(linhas)
+    out = Path(out_dir)
+    out.mkdir(parents=True, exist_ok=True)
+    report.to_csv(out / relatorio, index=False)
+    ok = int((report["STATUS"] == "ok").sum()) if len(report) else 0
+    logger.info(f"📑 Relatório do lote: {out / relatorio} ({ok}/{len(report)} ok)")
+    return report
+
+
+if __name__ == "__main__":
+    import argparse
+
+    # Uso: python -m vr_agent.batch jobs.csv --out-dir ./data/output [--workers 4]
+    parser = argparse.ArgumentParser(description="Compra VR/VA em lote (várias competências/empresas)")
+    parser.add_argument("jobs", help="CSV/XLSX/JSON com COMPETENCIA, DATA_DIR, EMPRESA, SAIDA")
+    parser.add_argument("--out-dir", default="./data/output")
+    parser.add_argument("--ref-dir", help="pasta única das referências (padrão: DATA_DIR de cada job)")
+    parser.add_argument("--workers", type=int)
+    parser.add_argument("--formats", default="", help="formatos extras, ex.: csv,parquet")
+    parser.add_argument("--feriados", action="store_true", help="calendário com feriados por localidade")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s [%(levelname)s] %(name)s - %(message)s")
+    report = run_batch(
+        load_jobs(args.jobs),
+        args.out_dir,
+        ref_dir=args.ref_dir,
+        workers=args.workers,
+        formats=[f for f in args.formats.split(",") if f.strip()],
+        feriados=args.feriados,
+    )
+    print(report.to_string(index=False))
@@ -0,0 +1,383 @@
+import gc
+import json
+import logging
+import os
+import platform
+import time
+import tracemalloc
+from pathlib import Path
+from typing import Callable, Iterable, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from . import rules, rules_old
+from .batch import periodo
+from .cache import CACHE_ENV
+from .io_utils import save_layout, write_layout
+from .pipeline import load_bases
+
+logger = logging.getLogger(__name__)
+
+TAMANHOS_PADRAO = (1_000, 10_000, 100_000)
+RESULTADOS_PADRAO = "bench_resultados.json"
+META = "bench_meta.json"
+
+# Distribuições tiradas das planilhas de exemplo em ./data
+SINDICATOS = {
+    "SINDPPD RS - SINDICATO DOS TRAB. EM PROC. DE DADOS RIO GRANDE DO SUL": 0.634,
+    "SINDPD SP - SIND.TRAB.EM PROC DADOS E EMPR.EMPRESAS PROC DADOS ESTADO DE SP.": 0.233,
+    "SITEPD PR - SIND DOS TRAB EM EMPR PRIVADAS DE PROC DE DADOS DE CURITIBA E REGIAO METROPOLITANA": 0.077,
+    "SINDPD RJ - SINDICATO PROFISSIONAIS DE PROC DADOS DO RIO DE JANEIRO": 0.056,
+}
+DIAS_UTEIS = {"SITEPD PR": 22, "SINDPPD RS": 21, "SINDPD SP": 22, "SINDPD RJ": 21}
+VALORES = {"Paraná": 35.0, "Rio de Janeiro": 35.0, "Rio Grande do Sul": 35.0, "São Paulo": 37.5}
+SITUACOES = {"Trabalhando": 0.946, "Férias": 0.042, "Licença Maternidade": 0.007,
+             "Auxílio Doença": 0.004, "Atestado": 0.001}
+CARGOS = {"ASSISTENTE DE BPO I": 0.28, "DESENVOLVEDOR III": 0.10, "ASSISTENTE DE BPO II": 0.08,
+          "DESENVOLVEDOR II": 0.07, "LIDER DE BPO": 0.03, "ANALISTA DE SUPORTE I": 0.02,
+          "ANALISTA DADOS I": 0.05, "TECH RECRUITER II": 0.04, "COORDENADOR ADMINISTRATIVO": 0.05,
+          "ANALISTA CONTABIL-FISCAL II": 0.05, "DESENVOLVEDOR I": 0.22, "DIRETOR DE OPERACOES": 0.01}
+EMPRESAS = {1410: 0.85, 1420: 0.15}
+DIAS_FERIAS = {30: 0.30, 5: 0.26, 10: 0.15, 15: 0.15, 20: 0.14}
+
+# Proporções de cada base em relação a ATIVOS (amostra: 1815 ativos)
+FRACOES = {"deslig": 0.028, "adm": 0.046, "afast": 0.011, "ferias": 0.044,
+           "aprendiz": 0.018, "estagio": 0.015, "exterior": 0.002}
+
+# Nome do arquivo gerado por base (nomes que ``load_bases`` procura)
+ARQUIVOS = {
+    "ativos": ("ATIVOS", "ATIVOS.xlsx"),
+    "deslig": ("DESLIGADOS", "DESLIGADOS.xlsx"),
+    "adm": ("ADMISSÃO ABRIL", "ADMISSÃO ABRIL.xlsx"),
+    "afast": ("AFASTAMENTOS", "AFASTAMENTOS.xlsx"),
+    "aprendiz": ("APRENDIZ", "APRENDIZ.xlsx"),
+    "estagio": ("ESTÁGIO", "ESTÁGIO.xlsx"),
+    "diasuteis": ("BASE_DIAS_UTEIS", "Base dias uteis.xlsx"),
+    "sind_valor": ("BASE_SINDICATO_VALOR", "Base sindicato x valor.xlsx"),
+    "ferias": ("FÉRIAS", "FÉRIAS.xlsx"),
+    "exterior": ("EXTERIOR", "EXTERIOR.xlsx"),
+}
+
+
+def _escolha(rng: np.random.Generator, dist: dict, n: int) -> np.ndarray:
+    chaves = list(dist)
+    p = np.array(list(dist.values()), dtype=float)
+    return np.array(chaves, dtype=object)[rng.choice(len(chaves), size=n, p=p / p.sum())]
+
+
+def _datas(rng: np.random.Generator, inicio, fim, n: int) -> pd.DatetimeIndex:
+    dias = max((pd.Timestamp(fim) - pd.Timestamp(inicio)).days, 1)
+    return pd.DatetimeIndex(pd.Timestamp(inicio) + pd.to_timedelta(rng.integers(0, dias + 1, n), unit="D"))
+
+
+def _situacao(ativos: pd.DataFrame, matriculas: np.ndarray, situacao: pd.Series) -> None:
+    """Reflete em ATIVOS a situação das matrículas de uma base especial."""
+    linhas = ativos["MATRICULA"].isin(matriculas)
+    ativos.loc[linhas, "DESC. SITUACAO"] = ativos.loc[linhas, "MATRICULA"].map(
+        dict(zip(matriculas, situacao)))
+
+
+def gerar_bases(n: int, seed: int = 0, competencia: str = "2025-05") -> dict:
+    """Bases sintéticas com ``n`` ativos, nas mesmas colunas das planilhas reais.
+
+    Sindicato, situação, cargo e dias de férias seguem as proporções da
+    amostra em ./data; desligamentos se concentram no início do mês da
+    competência e admissões caem no mês anterior. Mesma ``seed`` → mesmas bases.
+    """
+    rng = np.random.default_rng(seed)
+    inicio, fim = periodo(competencia)
+    matriculas = 20_000 + rng.permutation(n)
+
+    ativos = pd.DataFrame({
+        "MATRICULA": matriculas,
+        "EMPRESA": _escolha(rng, EMPRESAS, n).astype(np.int64),
+        "TITULO DO CARGO": _escolha(rng, CARGOS, n),
+        "DESC. SITUACAO": _escolha(rng, SITUACOES, n),
+        "SINDICATO": _escolha(rng, SINDICATOS, n),
+    })
+
+    # cada base especial pega uma fatia disjunta das matrículas
+    fatias, pos = {}, 0
+    for nome, frac in FRACOES.items():
+        k = max(1, int(round(n * frac)))
+        fatias[nome] = matriculas[pos:pos + k]
+        pos += k
+
+    m = fatias["deslig"]
+    # metade nos primeiros 5 dias do mês, o resto espalhado até alguns dias depois do fim
+    cedo = _datas(rng, fim - pd.Timedelta(days=14), fim - pd.Timedelta(days=10), len(m))
+    tarde = _datas(rng, fim - pd.Timedelta(days=14), fim + pd.Timedelta(days=5), len(m))
+    deslig = pd.DataFrame({
+        "MATRICULA": m,
+        "DATA DEMISSÃO": np.where(rng.random(len(m)) < 0.5, cedo, tarde),
+        "COMUNICADO DE DESLIGAMENTO": np.where(rng.random(len(m)) < 0.92, "OK", None),
+    })
+
+    m = fatias["adm"]
+    mes_anterior = pd.Period(competencia, freq="M") - 1
+    adm = pd.DataFrame({
+        "MATRICULA": m,
+        "ADMISSÃO": _datas(rng, mes_anterior.start_time, mes_anterior.end_time.normalize(), len(m)),
+        "CARGO": _escolha(rng, CARGOS, len(m)),
+    })
+
+    m = fatias["afast"]
+    afast = pd.DataFrame({
+        "MATRICULA": m,
+        "DESC. SITUACAO": _escolha(rng, {"Licença Maternidade": 0.6, "Auxílio Doença": 0.4}, len(m)),
+        "NA COMPRA?": np.nan,
+    })
+    _situacao(ativos, m, afast["DESC. SITUACAO"])
+
+    m = fatias["ferias"]
+    ferias = pd.DataFrame({
+        "MATRICULA": m,
+        "DESC. SITUACAO": "Férias",
+        "DIAS DE FÉRIAS": _escolha(rng, DIAS_FERIAS, len(m)).astype(np.int64),
+    })
+    _situacao(ativos, m, ferias["DESC. SITUACAO"])
+
+    aprendiz = pd.DataFrame({"MATRICULA": fatias["aprendiz"], "TITULO DO CARGO": "APRENDIZ"})
+    estagio = pd.DataFrame({"MATRICULA": fatias["estagio"], "TITULO DO CARGO": "ESTAGIARIO", "NA COMPRA?": np.nan})
+    ativos.loc[ativos["MATRICULA"].isin(fatias["aprendiz"]), "TITULO DO CARGO"] = "APRENDIZ"
+    ativos.loc[ativos["MATRICULA"].isin(fatias["estagio"]), "TITULO DO CARGO"] = "ESTAGIARIO"
+
+    m = fatias["exterior"]
+    exterior = pd.DataFrame({
+        "CADASTRO": m,
+        "VALOR": rng.uniform(0, 700, len(m)).round(2),
+        "UNNAMED: 2": "removido",
+    })
+
+    # referências no mesmo formato das planilhas originais (cabeçalho na 2ª linha)
+    nomes = {prefixo: next(s for s in SINDICATOS if s.startswith(prefixo)) for prefixo in DIAS_UTEIS}
+    diasuteis = pd.DataFrame({
+        f"BASE DIAS UTEIS DE {inicio:%d/%m} A {fim:%d/%m}": ["SINDICADO", *(nomes[p] for p in DIAS_UTEIS)],
+        "UNNAMED: 1": ["DIAS UTEIS ", *DIAS_UTEIS.values()],
+    })
+    sind_valor = pd.DataFrame({"ESTADO": list(VALORES), "VALOR": list(VALORES.values())})
+
+    return {
+        "ativos": ativos, "deslig": deslig, "adm": adm, "afast": afast, "aprendiz": aprendiz,
+        "estagio": estagio, "diasuteis": diasuteis, "sind_valor": sind_valor, "ferias": ferias,
+        "exterior": exterior,
+    }
+
+
+def gerar_dados(out_dir, n: int, seed: int = 0, competencia: str = "2025-05") -> dict:
+    """Grava as bases sintéticas como planilhas em ``out_dir`` e devolve o mapeamento de arquivos.
+
+    Se a pasta já tiver os dados de (n, seed, competência), nada é regravado.
+    """
+    out = Path(out_dir)
+    out.mkdir(parents=True, exist_ok=True)
+    arquivos = {nome: arquivo for nome, arquivo in ARQUIVOS.values()}
+    meta = {"n": n, "seed": seed, "competencia": competencia}
+    meta_path = out / META
+    if meta_path.exists() and json.loads(meta_path.read_text()) == meta:
+        if all((out / arquivo).exists() for arquivo in arquivos.values()):
+            return arquivos
+
+    t0 = time.perf_counter()
+    for chave, df in gerar_bases(n, seed, competencia).items():
+        write_layout(df, out / ARQUIVOS[chave][1], formats=["xlsx"], sheet_name="Planilha1")
+    meta_path.write_text(json.dumps(meta))
+    logger.info(f"🧪 Dados sintéticos ({n} ativos) gerados em {out} ({time.perf_counter() - t0:.1f}s)")
+    return arquivos
+
+
+def medir(fn: Callable, repeticoes: int = 1, memoria: bool = True, preparo: Callable = None) -> tuple:
+    """Executa ``fn`` e devolve ``(resultado, {"segundos", "pico_mib"})``.
+
+    ``segundos`` é o melhor de ``repeticoes`` execuções sem tracemalloc; o pico
+    de memória (alocado acima do que já existia) vem de uma execução extra com
+    tracemalloc. ``preparo()``, se informado, roda antes de cada execução, fora
+    da medição, e o seu retorno é passado a ``fn``.
+    """
+    def rodar(medir_memoria: bool):
+        arg = preparo() if preparo else None
+        gc.collect()
+        if medir_memoria:
+            tracemalloc.start()
+            base = tracemalloc.get_traced_memory()[0]
+        t0 = time.perf_counter()
+        try:
+            out = fn(arg) if preparo else fn()
+            return out, time.perf_counter() - t0, (
+                (tracemalloc.get_traced_memory()[1] - base) / 2**20 if medir_memoria else None)
+        finally:
+            if medir_memoria:
+                tracemalloc.stop()
+
+    tempos, resultado = [], None
+    for _ in range(max(1, repeticoes)):
+        resultado, segundos, _ = rodar(False)
+        tempos.append(segundos)
+    pico = rodar(True)[2] if memoria else None
+    return resultado, {"segundos": round(min(tempos), 4), "pico_mib": None if pico is None else round(pico, 2)}
+
+
+class _SemCache:
+    """Desliga o cache Parquet (env ``VR_AGENT_CACHE``) dentro do bloco."""
+
+    def __enter__(self):
+        self._antes = os.environ.get(CACHE_ENV)
+        os.environ[CACHE_ENV] = "0"
+
+    def __exit__(self, *exc):
+        if self._antes is None:
+            os.environ.pop(CACHE_ENV, None)
+        else:
+            os.environ[CACHE_ENV] = self._antes
+
+
+def _copias(bases: dict) -> dict:
+    # rules.compute_layout altera as bases recebidas: cada execução ganha a sua cópia
+    return {k: (v.copy() if v is not None else None) for k, v in bases.items()}
+
+
+def bench_tamanho(n: int, data_dir, seed: int = 0, repeticoes: int = 1, memoria: bool = True,
+                  formats: Iterable[str] = ("csv",)) -> List[dict]:
+    """Mede cada etapa do pipeline para ``n`` ativos sintéticos."""
+    pasta = Path(data_dir) / f"n{n}"
+    t0 = time.perf_counter()
+    arquivos = gerar_dados(pasta, n, seed)
+    linhas = [{"n": n, "etapa": "gerar_dados", "segundos": round(time.perf_counter() - t0, 4),
+               "pico_mib": None, "linhas": n}]
+
+    def registrar(etapa, resultado, medida):
+        tamanho = len(resultado) if isinstance(resultado, pd.DataFrame) else len(resultado or ())
+        linhas.append({"n": n, "etapa": etapa, **medida, "linhas": tamanho})
+        logger.info(f"⏱️ n={n} {etapa}: {medida['segundos']:.3f}s, pico {medida['pico_mib']} MiB")
+
+    with _SemCache():
+        bases, medida = medir(lambda: load_bases(pasta, arquivos, workers=1), repeticoes, memoria)
+    registrar("load_bases", bases["ativos"], medida)
+    load_bases(pasta, arquivos, workers=1)  # grava o cache
+    _, medida = medir(lambda: load_bases(pasta, arquivos, workers=1), repeticoes, memoria)
+    registrar("load_bases[cache]", bases["ativos"], medida)
+
+    ferias = bases.pop("ferias")  # rules_old não usa FÉRIAS
+    layout, medida = medir(lambda: rules_old.compute_layout(**bases), repeticoes, memoria)
+    registrar("compute_layout[rules_old]", layout, medida)
+    novo, medida = medir(lambda b: rules.compute_layout(**b), repeticoes, memoria,
+                         preparo=lambda: _copias({**bases, "ferias": ferias}))
+    registrar("compute_layout[rules]", novo, medida)
+
+    avisos, medida = medir(lambda: rules_old.validate(layout), repeticoes, memoria)
+    registrar("validate", avisos, medida)
+    _, medida = medir(lambda: save_layout(layout, pasta / "saida" / "VR_VA_COMPRA.xlsx", formats=list(formats)),
+                      repeticoes, memoria)
+    registrar("save_layout", layout, medida)
+    return linhas
+
+
+def run_bench(
+    tamanhos: Iterable[int] = TAMANHOS_PADRAO,
+    data_dir="./data/.bench",
+    seed: int = 0,
+    repeticoes: int = 1,
+    memoria: bool = True,
+    saida: Optional[str] = None,
+) -> dict:
+    """Roda o benchmark para cada tamanho e grava o JSON de resultados.
+
+    O JSON (padrão: ``data_dir/bench_resultados.json``) traz ``meta``
+    (versões, máquina, seed) e ``resultados`` (uma linha por tamanho × etapa,
+    com ``segundos``, ``pico_mib`` e ``linhas``).
+    """
+    resultados = []
+    for n in tamanhos:
+        resultados.extend(bench_tamanho(int(n), data_dir, seed, repeticoes, memoria))
+    relatorio = {
+        "meta": {
+            "data": pd.Timestamp.now().isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "pandas": pd.__version__,
+            "numpy": np.__version__,
+            "maquina": platform.platform(),
+            "cpus": os.cpu_count(),
+            "seed": seed,
+            "repeticoes": repeticoes,
+        },
+        "resultados": resultados,
+    }
+    path = Path(saida) if saida else Path(data_dir) / RESULTADOS_PADRAO
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(json.dumps(relatorio, ensure_ascii=False, indent=2), encoding="utf-8")
+    logger.info(f"📑 Resultados do benchmark: {path}")
+    return relatorio
+
+
+def comparar(atual: dict, baseline: dict, tolerancia: float = 0.2, minimo: float = 0.05,
+             minimo_mib: float = 1.0) -> List[dict]:
+    """Etapas que ficaram mais lentas (ou gastaram mais memória) que o baseline.
+
+    Só conta como regressão o que passar de ``tolerancia`` (fração) acima do
+    baseline. Valores abaixo do piso (``minimo`` segundos, ``minimo_mib`` MiB)
+    são ruído: o baseline é comparado como se valesse pelo menos o piso.
+    """
+    antes = {(r["n"], r["etapa"]): r for r in baseline.get("resultados", [])}
+    regressoes = []
+    for r in atual.get("resultados", []):
+        b = antes.get((r["n"], r["etapa"]))
+        if b is None or r["etapa"] == "gerar_dados":
+            continue
+        for campo, piso in (("segundos", minimo), ("pico_mib", minimo_mib)):
+            x, y = r.get(campo), b.get(campo)
+            if x is None or y is None:
+                continue
+            if x > max(y, piso) * (1 + tolerancia):
+                regressoes.append({"n": r["n"], "etapa": r["etapa"], "campo": campo,
+                                   "baseline": y, "atual": x, "variacao": round(x / y - 1, 3) if y else None})
+    return regressoes
+
+
+def resumo(relatorio: dict) -> pd.DataFrame:
+    """Tabela tamanho × etapa (segundos) e a razão rules / rules_old por tamanho."""
+    df = pd.DataFrame(relatorio["resultados"])
+    tabela = df.pivot(index="etapa", columns="n", values="segundos")
+    if {"compute_layout[rules]", "compute_layout[rules_old]"}.issubset(tabela.index):
+        tabela.loc["razao rules/rules_old"] = (
+            tabela.loc["compute_layout[rules]"] / tabela.loc["compute_layout[rules_old]"]
+        ).round(2)
+    return tabela
+
+
+if __name__ == "__main__":
+    import argparse
+    import sys
+
+    # Uso: python -m vr_agent.bench --tamanhos 1000,10000,100000,1000000 [--baseline antigo.json]
+    parser = argparse.ArgumentParser(description="Benchmark do pipeline VR com dados sintéticos")
+    parser.add_argument("--tamanhos", default=",".join(map(str, TAMANHOS_PADRAO)))
+    parser.add_argument("--data-dir", default="./data/.bench", help="onde gerar as planilhas sintéticas")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--repeticoes", type=int, default=1)
+    parser.add_argument("--sem-memoria", action="store_true", help="não mede o pico (sem a execução com tracemalloc)")
+    parser.add_argument("--saida", help=f"JSON de resultados (padrão: <data-dir>/{RESULTADOS_PADRAO})")
+    parser.add_argument("--baseline", help="JSON de uma execução anterior para detectar regressões")
+    parser.add_argument("--tolerancia", type=float, default=0.2)
+    parser.add_argument("--minimo-mib", type=float, default=1.0, help="picos abaixo disso (MiB) são ruído")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s [%(levelname)s] %(name)s - %(message)s")
+    relatorio = run_bench(
+        [int(t) for t in args.tamanhos.split(",") if t.strip()],
+        data_dir=args.data_dir,
+        seed=args.seed,
+        repeticoes=args.repeticoes,
+        memoria=not args.sem_memoria,
+        saida=args.saida,
+    )
+    print(resumo(relatorio).to_string())
+    if args.baseline:
+        regressoes = comparar(relatorio, json.loads(Path(args.baseline).read_text(encoding="utf-8")),
+                              args.tolerancia, minimo_mib=args.minimo_mib)
+        for r in regressoes:
+            variacao = f"+{r['variacao']:.0%}" if r["variacao"] is not None else "baseline zero"
+            print(f"❌ n={r['n']} {r['etapa']} {r['campo']}: {r['baseline']} → {r['atual']} ({variacao})")
+        if regressoes:
+            sys.exit(1)
+        print("✅ Sem regressões em relação ao baseline.")
@@ -0,0 +1,126 @@
+import logging
+import unicodedata
+from functools import lru_cache
+from pathlib import Path
+from typing import Optional
+
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+# Tabela local de feriados: DATA, UF (vazio = nacional), MUNICIPIO (vazio = estadual), DESCRICAO
+FERIADOS_PATH = Path(__file__).with_name("feriados.csv")
+WEEKMASK = "1111100"
+
+
+def _norm_local(value) -> str:
+    """Normaliza UF/município para comparação: maiúsculo, sem acento, sem espaços extras."""
+    if value is None or (isinstance(value, float) and np.isnan(value)):
+        return ""
+    t = unicodedata.normalize("NFKD", str(value)).encode("ascii", "ignore").decode()
+    t = t.upper().strip()
+    return "" if t in {"NAN", "NONE"} else t
+
+
+@lru_cache(maxsize=None)
+def load_feriados(path: Optional[str] = None) -> pd.DataFrame:
+    """Carrega (uma vez por processo) a tabela de feriados nacionais, estaduais e municipais."""
+    p = Path(path) if path else FERIADOS_PATH
+    df = pd.read_csv(p, dtype=str, keep_default_na=False)
+    df.columns = [str(c).strip().upper() for c in df.columns]
+    df["DATA"] = pd.to_datetime(df["DATA"]).values.astype("datetime64[D]")
+    df["UF"] = df["UF"].map(_norm_local)
+    df["MUNICIPIO"] = df["MUNICIPIO"].map(_norm_local)
+    logger.debug(f"📅 {len(df)} feriados carregados de {p.name}")
+    return df
+
+
+def holidays_for(uf: str = "", municipio: str = "", path: Optional[str] = None) -> np.ndarray:
+    """Feriados que valem para a localidade: nacionais + da UF + do município."""
+    fer = load_feriados(path)
+    uf, municipio = _norm_local(uf), _norm_local(municipio)
+    sel = fer["UF"].eq("")
+    if uf:
+        sel |= fer["UF"].eq(uf) & (fer["MUNICIPIO"].eq("") | fer["MUNICIPIO"].eq(municipio))
+    return np.unique(fer.loc[sel, "DATA"].to_numpy(dtype="datetime64[D]"))
+
+
+class BusinessCalendar:
+    """Máscara compacta de dias úteis de um período com soma de prefixos.
+
+    ``count(inicio, fim)`` responde quantos dias úteis há no intervalo fechado
+    em O(1) por par de datas (e vetorizado para arrays), sem varrer o período.
+    """
+
+    __slots__ = ("start", "end", "mask", "_prefix")
+
+    def __init__(self, start, end, holidays=(), weekmask: str = WEEKMASK):
+        self.start = np.datetime64(pd.Timestamp(start), "D")
+        self.end = np.datetime64(pd.Timestamp(end), "D")
+        days = np.arange(self.start, self.end + np.timedelta64(1, "D"), dtype="datetime64[D]")
+        self.mask = np.is_busday(days, weekmask=weekmask, holidays=list(holidays))
+        self._prefix = np.concatenate(([0], np.cumsum(self.mask, dtype=np.int32)))
+
+    def __repr__(self) -> str:
+        return f"BusinessCalendar({self.start}..{self.end}, dias_uteis={self.total})"
+
+    @property
+    def total(self) -> int:
+        """Dias úteis do período inteiro."""
+        return int(self._prefix[-1])
+
+    def count(self, inicio, fim) -> np.ndarray:
+        """Dias úteis em [inicio, fim] ∩ período; 0 quando fim < inicio."""
+        ini = np.asarray(inicio, dtype="datetime64[D]")
+        end = np.asarray(fim, dtype="datetime64[D]")
+        last = len(self.mask) - 1
+        i = np.clip((ini - self.start).astype(np.int64), 0, last + 1)
+        j = np.clip((end - self.start).astype(np.int64), -1, last)
+        n = self._prefix[j + 1] - self._prefix[i]
+        return np.maximum(n, 0).astype(np.int64)
+
+
+@lru_cache(maxsize=1024)
+def _calendar(start: str, end: str, uf: str, municipio: str, feriados: bool) -> BusinessCalendar:
+    holidays = holidays_for(uf, municipio) if feriados else ()
+    return BusinessCalendar(start, end, holidays)
+
+
+def get_calendar(start, end, uf: str = "", municipio: str = "", feriados: bool = True) -> BusinessCalendar:
+    """Calendário memoizado por (UF, município, período)."""
+    return _calendar(
+        str(np.datetime64(pd.Timestamp(start), "D")),
+        str(np.datetime64(pd.Timestamp(end), "D")),
+        _norm_local(uf),
+        _norm_local(municipio),
+        bool(feriados),
+    )
+
+
+def local_codes(uf, municipio=None):
+    """Fatoriza os pares (UF, município) distintos: códigos por linha + lista de chaves."""
+    uf = pd.Series(uf).map(_norm_local).to_numpy()
+    mun = (pd.Series(municipio).map(_norm_local).to_numpy()
+           if municipio is not None else np.full(len(uf), "", dtype=object))
+    codes, keys = pd.factorize(pd.MultiIndex.from_arrays([uf, mun]))
+    return codes, list(keys)
+
+
+def dias_uteis_por_local(uf, start, end, municipio=None, feriados: bool = True) -> np.ndarray:
+    """Total de dias úteis do período para cada linha, calculado uma vez por localidade."""
+    codes, keys = local_codes(uf, municipio)
+    totals = np.array([get_calendar(start, end, u, m, feriados).total for u, m in keys], dtype=np.int64)
+    return totals[codes] if len(codes) else np.zeros(0, dtype=np.int64)
+
+
+def count_by_local(inicio, fim, uf, start, end, municipio=None, feriados: bool = True) -> np.ndarray:
+    """Dias úteis em [inicio, fim] por linha, usando o calendário da localidade de cada uma."""
+    ini = np.asarray(inicio, dtype="datetime64[D]")
+    fim = np.asarray(fim, dtype="datetime64[D]")
+    codes, keys = local_codes(uf, municipio)
+    out = np.zeros(len(codes), dtype=np.int64)
+    for code, (u, m) in enumerate(keys):
+        idx = np.flatnonzero(codes == code)
+        out[idx] = get_calendar(start, end, u, m, feriados).count(ini[idx], fim[idx])
+    return out
@@ -0,0 +1,141 @@
+import hashlib
+import json
+import logging
+import os
+from pathlib import Path
+from typing import Callable, Optional
+
+import pandas as pd
+
+try:  # pyarrow é opcional: sem ele o cache fica desligado
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # pragma: no cover - depende do ambiente
+    pa = None
+    pq = None
+
+logger = logging.getLogger(__name__)
+
+CACHE_DIRNAME = ".cache"
+CACHE_ENV = "VR_AGENT_CACHE"
+ATTRS_KEY = b"vr_agent.attrs"
+
+
+def cache_enabled() -> bool:
+    """Indica se o cache colunar está disponível (pyarrow instalado e não desligado via env)."""
+    if pq is None:
+        return False
+    return os.getenv(CACHE_ENV, "1").strip().lower() not in {"0", "false", "no", "off"}
+
+
+def default_cache_dir(base_dir) -> Path:
+    """Diretório padrão do cache: ``<base_dir>/.cache`` (ao lado das planilhas)."""
+    return Path(base_dir) / CACHE_DIRNAME
+
+
+def file_digest(path, chunk_size: int = 1 << 20) -> str:
+    """Calcula o SHA-256 do conteúdo do arquivo, lendo em blocos."""
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def cache_path(path, sheet, version: int, cache_dir) -> Path:
+    """Monta o caminho da entrada de cache: nome do arquivo + hash + aba + versão."""
+    p = Path(path)
+    digest = file_digest(p)[:16]
+    return Path(cache_dir) / f"{p.stem}.{digest}.s{sheet}.v{version}.parquet"
+
+
+def _entry_key(name: str) -> Optional[tuple]:
+    """(stem, aba, versão) de um nome de entrada; None se não for uma entrada do cache."""
+    partes = name.rsplit(".", 4)
+    if len(partes) != 5:
+        return None
+    stem, _digest, sheet, version, _ext = partes
+    return stem, sheet, version
+
+
+def _prune_stale(entry: Path) -> None:
+    """Remove entradas antigas do mesmo arquivo/aba/versão (conteúdo que mudou)."""
+    chave = _entry_key(entry.name)
+    for old in entry.parent.glob("*.parquet"):
+        # compara o nome inteiro: "ATIVOS" não pode apagar a entrada de "ATIVOS.v2"
+        if old != entry and _entry_key(old.name) == chave:
+            old.unlink(missing_ok=True)
+            logger.debug(f"🧹 Cache obsoleto removido: {old.name}")
+
+
+def read_cached(entry: Path) -> pd.DataFrame:
+    """Lê uma entrada do cache via memory-map (sem cópia do buffer Arrow)."""
+    table = pq.read_table(entry, memory_map=True)
+    df = table.to_pandas()
+    # categorias não textuais (ex.: EMPRESA numérica) voltam do Parquet sem o dicionário
+    for col in (table.schema.pandas_metadata or {}).get("columns", []):
+        nome = col.get("name")
+        if col.get("pandas_type") == "categorical" and nome in df.columns \
+                and not isinstance(df[nome].dtype, pd.CategoricalDtype):
+            df[nome] = df[nome].astype("category")
+    attrs = (table.schema.metadata or {}).get(ATTRS_KEY)
+    if attrs:
+        df.attrs = json.loads(attrs)
+    return df
+
+
+def write_cached(df: pd.DataFrame, entry: Path) -> bool:
+    """Grava o DataFrame no cache. Retorna False se a aba não puder virar Arrow."""
+    try:
+        table = pa.Table.from_pandas(df, preserve_index=False)
+    except (pa.ArrowException, TypeError, ValueError) as exc:
+        # ex.: colunas object com tipos misturados (int + str)
+        logger.info(f"ℹ️ Aba não cacheável ({entry.name}): {exc}")
+        return False
+
+    if df.attrs:
+        # df.attrs (ex.: relatório de coerção do schema) vai junto, nos metadados
+        try:
+            attrs = json.dumps(df.attrs, ensure_ascii=False, default=str).encode()
+            table = table.replace_schema_metadata({**(table.schema.metadata or {}), ATTRS_KEY: attrs})
+        except (TypeError, ValueError):
+            pass
+
+    entry.parent.mkdir(parents=True, exist_ok=True)
+    # tmp exclusivo por processo: jobs paralelos podem gravar a mesma entrada
+    tmp = entry.with_suffix(f".{os.getpid()}.tmp")
+    pq.write_table(table, tmp, compression="none")
+    os.replace(tmp, entry)  # escrita atômica: leitores nunca veem arquivo parcial
+    _prune_stale(entry)
+    return True
+
+
+def cached_frame(
+    path,
+    loader: Callable[[], pd.DataFrame],
+    sheet=0,
+    version: int = 1,
+    cache_dir: Optional[str] = None,
+) -> pd.DataFrame:
+    """Retorna a aba a partir do cache ou chama ``loader`` e grava o resultado.
+
+    A chave é endereçada por conteúdo (hash do arquivo, aba e versão da
+    normalização de colunas), então só as planilhas alteradas são reprocessadas.
+    """
+    if cache_dir is None or not cache_enabled():
+        return loader()
+
+    entry = cache_path(path, sheet, version, cache_dir)
+    if entry.exists():
+        try:
+            df = read_cached(entry)
+            logger.info(f"⚡ Cache hit: {Path(path).name}")
+            return df
+        except (OSError, pa.ArrowException) as exc:
+            logger.warning(f"⚠️ Cache corrompido ({entry.name}), reprocessando: {exc}")
+            entry.unlink(missing_ok=True)
+
+    df = loader()
+    if write_cached(df, entry):
+        logger.info(f"💾 Cache gravado: {entry.name}")
+    return df
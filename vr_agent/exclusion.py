@@ -0,0 +1,154 @@
+from typing import Dict, Optional, Set
+
+import numpy as np
+import pandas as pd
+
+# Chave reservada para matrícula ausente (NaN/None): nunca casa com nada
+MISSING = np.iinfo(np.int64).min
+
+NAO_COMPRA = {"N", "NAO", "NÃO", "NO"}
+
+
+def _norm_str(value) -> Optional[str]:
+    """Mesma normalização de ``rules_old._extract_matriculas_as_str`` para um único valor."""
+    t = str(value)
+    if t.endswith(".0"):
+        t = t[:-2]
+    t = t.strip()
+    return None if t in {"nan", "None"} else t
+
+
+class MatriculaKeys:
+    """Converte MATRICULA em chave inteira compacta (int64).
+
+    Matrículas numéricas canônicas viram o próprio número; as demais (com
+    letras, zeros à esquerda etc.) ganham ids negativos numa tabela lateral,
+    compartilhada entre a base e as fontes de exclusão.
+    """
+
+    def __init__(self):
+        self._side: Dict[str, int] = {}
+
+    def _key(self, text: Optional[str]) -> int:
+        if text is None:
+            return MISSING
+        if text.isdigit() and text.isascii() and (text == "0" or not text.startswith("0")) and len(text) < 19:
+            return int(text)
+        key = self._side.get(text)
+        if key is None:
+            key = self._side[text] = -(len(self._side) + 1)
+        return key
+
+    def encode(self, series: Optional[pd.Series]) -> np.ndarray:
+        """Normaliza a coluna uma única vez e devolve as chaves (sem regex por linha)."""
+        if series is None:
+            return np.empty(0, dtype=np.int64)
+        s = pd.Series(series)
+        if (pd.api.types.is_integer_dtype(s) and not pd.api.types.is_extension_array_dtype(s)
+                and (s >= 0).all()):
+            return s.to_numpy(dtype=np.int64)
+        # demais tipos: normaliza só os valores distintos e propaga pelos códigos
+        codes, uniques = pd.factorize(s, use_na_sentinel=True)
+        keys = np.array([self._key(_norm_str(u)) for u in uniques], dtype=np.int64)
+        out = np.full(len(s), MISSING, dtype=np.int64)
+        hit = codes >= 0
+        out[hit] = keys[codes[hit]]
+        return out
+
+    def decode(self, keys: np.ndarray) -> Set[str]:
+        """Converte chaves de volta para as strings normalizadas."""
+        side = {v: k for k, v in self._side.items()}
+        return {str(k) if k >= 0 else side[k] for k in keys.tolist() if k != MISSING}
+
+
+class ExclusionEngine:
+    """Índice ordenado de matrículas a excluir, com o(s) motivo(s) de cada uma.
+
+    Todas as fontes viram um único array ordenado de chaves mais uma máscara de
+    bits de motivos; a exclusão é um ``searchsorted`` vetorizado e o detalhamento
+    por motivo sai do mesmo passe.
+    """
+
+    def __init__(self):
+        self.keys = MatriculaKeys()
+        self._sources: Dict[str, np.ndarray] = {}
+        self._index = None
+
+    @property
+    def reasons(self) -> list:
+        return list(self._sources)
+
+    def add(self, reason: str, series: Optional[pd.Series]) -> "ExclusionEngine":
+        """Registra uma fonte de exclusão (ex.: ``"DESLIGADOS"``)."""
+        if series is None or reason in self._sources:
+            return self
+        if len(self._sources) >= 64:
+            raise ValueError("ExclusionEngine suporta no máximo 64 motivos.")
+        k = self.keys.encode(series)
+        self._sources[reason] = np.unique(k[k != MISSING])
+        self._index = None
+        return self
+
+    def _build(self):
+        if self._index is None:
+            if self._sources:
+                all_keys = np.concatenate(list(self._sources.values()))
+                bits = np.concatenate([
+                    np.full(len(k), 1 << i, dtype=np.uint64) for i, k in enumerate(self._sources.values())
+                ])
+            else:
+                all_keys = np.empty(0, dtype=np.int64)
+                bits = np.empty(0, dtype=np.uint64)
+            uniq, inv = np.unique(all_keys, return_inverse=True)
+            merged = np.zeros(len(uniq), dtype=np.uint64)
+            np.bitwise_or.at(merged, inv, bits)
+            self._index = (uniq, merged)
+        return self._index
+
+    def match(self, series: pd.Series) -> np.ndarray:
+        """Máscara de bits de motivos por linha (0 = não excluir)."""
+        uniq, merged = self._build()
+        k = self.keys.encode(series)
+        if len(uniq) == 0:
+            return np.zeros(len(k), dtype=np.uint64)
+        pos = np.minimum(np.searchsorted(uniq, k), len(uniq) - 1)
+        hit = uniq[pos] == k
+        return np.where(hit, merged[pos], np.uint64(0))
+
+    def mask(self, series: pd.Series) -> np.ndarray:
+        """True para as linhas cuja matrícula está em alguma fonte de exclusão."""
+        return self.match(series) != 0
+
+    def breakdown(self, bits: np.ndarray) -> Dict[str, int]:
+        """Quantidade de linhas excluídas por motivo (uma linha pode ter vários)."""
+        return {
+            reason: int(np.count_nonzero(bits & np.uint64(1 << i)))
+            for i, reason in enumerate(self._sources)
+        }
+
+    def as_set(self) -> Set[str]:
+        """Conjunto de matrículas (strings normalizadas), como no ``build_exclusion_set`` antigo."""
+        uniq, _ = self._build()
+        return self.keys.decode(uniq)
+
+
+def _matricula_col(df: Optional[pd.DataFrame], *candidates: str) -> Optional[pd.Series]:
+    if df is None:
+        return None
+    col = next((c for c in candidates if c in df.columns), None)
+    return df[col] if col else None
+
+
+def build_exclusion_engine(deslig=None, afast=None, aprendiz=None, estagio=None,
+                           exterior=None) -> ExclusionEngine:
+    """Monta o motor de exclusão a partir das bases DESLIGADOS, AFASTAMENTOS,
+    APRENDIZ, ESTÁGIO e EXTERIOR (esta identificada por MATRICULA ou CADASTRO)."""
+    engine = ExclusionEngine()
+    engine.add("DESLIGADOS", _matricula_col(deslig, "MATRICULA"))
+    if afast is not None and {"MATRICULA", "NA COMPRA?"}.issubset(afast.columns):
+        mask = afast["NA COMPRA?"].astype(str).str.upper().str.strip().isin(NAO_COMPRA)
+        engine.add("AFASTAMENTOS", afast.loc[mask, "MATRICULA"])
+    engine.add("APRENDIZ", _matricula_col(aprendiz, "MATRICULA"))
+    engine.add("ESTAGIO", _matricula_col(estagio, "MATRICULA"))
+    engine.add("EXTERIOR", _matricula_col(exterior, "MATRICULA", "CADASTRO"))
+    return engine
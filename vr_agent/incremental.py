@@ -0,0 +1,190 @@
+import hashlib
+import json
+import logging
+import time
+from pathlib import Path
+from typing import Optional
+
+import pandas as pd
+
+from . import rules_old
+
+logger = logging.getLogger(__name__)
+
+# Versão do formato do estado salvo; mudar invalida tudo
+STATE_VERSION = 6
+
+# Etapa → bases de entrada de que ela depende
+STAGES = {
+    "base": ("ativos", "deslig", "afast", "aprendiz", "estagio", "exterior"),
+    "dias_uteis": ("diasuteis",),
+    "valor": ("sind_valor",),
+    "admissao": ("adm",),
+}
+
+MANIFEST = "manifest.json"
+DELTA_PADRAO = "delta.csv"
+
+
+def fingerprint(df: Optional[pd.DataFrame]) -> str:
+    """Impressão digital do conteúdo de uma base (colunas, tipos e valores)."""
+    if df is None:
+        return "none"
+    h = hashlib.sha256()
+    h.update(json.dumps([str(c) for c in df.columns]).encode())
+    h.update(json.dumps([str(t) for t in df.dtypes]).encode())
+    h.update(pd.util.hash_pandas_object(df, index=False).to_numpy().tobytes())
+    return h.hexdigest()
+
+
+def _compute_stage(stage: str, bases: dict):
+    if stage == "base":
+        return rules_old.stage_base(*(bases.get(k) for k in STAGES["base"]))
+    if stage == "dias_uteis":
+        return rules_old.dias_uteis_table(bases.get("diasuteis"))
+    if stage == "valor":
+        return rules_old.valor_table(bases.get("sind_valor"))
+    return rules_old.admissao_table(bases.get("adm"))
+
+
+def layout_delta(antes: Optional[pd.DataFrame], depois: pd.DataFrame) -> pd.DataFrame:
+    """MATRICULAs adicionadas, removidas e alteradas entre dois layouts.
+
+    Para as alteradas, ``COLUNAS`` lista as colunas que mudaram.
+    """
+    cols = ["MATRICULA", "TIPO", "COLUNAS"]
+    if antes is None:
+        antes = depois.iloc[0:0]
+    if antes["MATRICULA"].dtype != depois["MATRICULA"].dtype:
+        # layout anterior com MATRICULA em texto (antes da chave inteira): compara como texto
+        antes = antes.assign(MATRICULA=antes["MATRICULA"].astype(str))
+        depois = depois.assign(MATRICULA=depois["MATRICULA"].astype(str))
+    a = antes.drop_duplicates("MATRICULA").set_index("MATRICULA")
+    d = depois.drop_duplicates("MATRICULA").set_index("MATRICULA")
+
+    adicionadas = d.index.difference(a.index)
+    removidas = a.index.difference(d.index)
+    comuns = d.index.intersection(a.index)
+    valores = [c for c in d.columns if c in a.columns]
+    x, y = a.loc[comuns, valores], d.loc[comuns, valores]
+    diff = ~((x == y) | (x.isna() & y.isna()))
+    alteradas = diff.index[diff.any(axis=1)]
+
+    partes = [
+        pd.DataFrame({"MATRICULA": adicionadas, "TIPO": "ADICIONADA", "COLUNAS": ""}),
+        pd.DataFrame({"MATRICULA": removidas, "TIPO": "REMOVIDA", "COLUNAS": ""}),
+        pd.DataFrame({
+            "MATRICULA": alteradas,
+            "TIPO": "ALTERADA",
+            "COLUNAS": [",".join(diff.columns[diff.loc[m]]) for m in alteradas],
+        }),
+    ]
+    partes = [p for p in partes if len(p)]
+    return pd.concat(partes, ignore_index=True) if partes else pd.DataFrame(columns=cols)
+
+
+def compute_layout_incremental(
+    state_dir: str,
+    ativos,
+    deslig=None,
+    adm=None,
+    afast=None,
+    aprendiz=None,
+    estagio=None,
+    diasuteis=None,
+    sind_valor=None,
+    feriados: bool = False,
+    exterior=None,
+    period_start=None,
+    period_end=None,
+    delta_path: Optional[str] = None,
+) -> pd.DataFrame:
+    """``rules_old.compute_layout`` com reaproveitamento da execução anterior.
+
+    Cada base de entrada ganha uma impressão digital; as etapas intermediárias
+    (base pós-exclusão, tabela de dias úteis, tabela de valores, admissões)
+    ficam salvas em ``state_dir`` e só são recalculadas quando alguma base de
+    que dependem mudou. As etapas finais (baratas e vetorizadas) sempre rodam.
+
+    O layout completo é retornado; o delta em relação ao layout anterior
+    (MATRICULAs adicionadas/removidas/alteradas) vai para ``delta_path``
+    (padrão: ``state_dir/delta.csv``). O resumo fica em
+    ``layout.attrs["incremental"]``.
+    """
+    if ativos is None:
+        return rules_old.compute_layout(None, None, None, None, None, None, None, None)
+
+    t0 = time.perf_counter()
+    state = Path(state_dir)
+    state.mkdir(parents=True, exist_ok=True)
+    bases = {
+        "ativos": ativos, "deslig": deslig, "adm": adm, "afast": afast, "aprendiz": aprendiz,
+        "estagio": estagio, "diasuteis": diasuteis, "sind_valor": sind_valor, "exterior": exterior,
+    }
+    fps = {nome: fingerprint(df) for nome, df in bases.items()}
+
+    manifest_path = state / MANIFEST
+    anterior = json.loads(manifest_path.read_text()) if manifest_path.exists() else {}
+    if anterior.get("version") != STATE_VERSION:
+        anterior = {}
+    fps_ant = anterior.get("fingerprints", {})
+
+    resultados, recalculadas = {}, []
+    for stage, deps in STAGES.items():
+        arquivo = state / f"{stage}.pkl"
+        if arquivo.exists() and all(fps_ant.get(d) == fps[d] for d in deps):
+            resultados[stage] = pd.read_pickle(arquivo)
+            continue
+        resultados[stage] = _compute_stage(stage, bases)
+        pd.to_pickle(resultados[stage], arquivo)
+        recalculadas.append(stage)
+
+    base, exclusoes = resultados["base"]
+    sv, vr_dia_fallback = resultados["valor"]
+    layout = rules_old.finish_layout(
+        base, resultados["dias_uteis"], resultados["admissao"], sv, vr_dia_fallback, exclusoes,
+        feriados=feriados, period_start=period_start, period_end=period_end,
+    )
+
+    layout_path = state / "layout.pkl"
+    anterior_layout = pd.read_pickle(layout_path) if layout_path.exists() else None
+    delta = layout_delta(anterior_layout, layout)
+    delta.to_csv(delta_path or state / DELTA_PADRAO, index=False)
+    pd.to_pickle(layout, layout_path)
+    manifest_path.write_text(json.dumps({"version": STATE_VERSION, "fingerprints": fps}, indent=2))
+
+    resumo = {
+        "recalculadas": recalculadas,
+        "reaproveitadas": [s for s in STAGES if s not in recalculadas],
+        "delta": delta["TIPO"].value_counts().to_dict(),
+        "segundos": round(time.perf_counter() - t0, 3),
+    }
+    layout.attrs["incremental"] = resumo
+    logger.info(f"♻️ Recompute incremental: recalculadas={recalculadas or 'nenhuma'}, delta={resumo['delta']}")
+    return layout
+
+
+if __name__ == "__main__":
+    import argparse
+
+    from .io_utils import save_layout
+    from .pipeline import ARQUIVOS_PADRAO, load_bases
+
+    # Uso: python -m vr_agent.incremental [--base-dir ./data] [--state-dir ./data/.incremental]
+    parser = argparse.ArgumentParser(description="Layout VR com recompute incremental + arquivo delta")
+    parser.add_argument("--base-dir", default="./data")
+    parser.add_argument("--state-dir", help="padrão: <base-dir>/.incremental")
+    parser.add_argument("--saida", default="VR_VA_COMPRA_INCREMENTAL.xlsx")
+    parser.add_argument("--arquivos", help="JSON com o mapeamento base → arquivo")
+    parser.add_argument("--feriados", action="store_true")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s [%(levelname)s] %(name)s - %(message)s")
+    arquivos = json.loads(args.arquivos) if args.arquivos else ARQUIVOS_PADRAO
+    bases = load_bases(args.base_dir, arquivos)
+    bases.pop("ferias", None)
+    layout = compute_layout_incremental(args.state_dir or Path(args.base_dir) / ".incremental",
+                                        feriados=args.feriados, **bases)
+    path = save_layout(layout, Path(args.base_dir) / args.saida)
+    print(f"✅ {len(layout)} linhas → {path}")
+    print(json.dumps(layout.attrs["incremental"], ensure_ascii=False))
@@ -0,0 +1,219 @@
+import contextvars
+import cProfile
+import io
+import json
+import logging
+import os
+import pstats
+import time
+import tracemalloc
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Optional
+
+logger = logging.getLogger(__name__)
+
+# Perfis extras da execução: "cprofile", "tracemalloc" ou os dois separados por vírgula
+PROFILE_ENV = "VR_AGENT_PROFILE"
+# Onde gravar o relatório JSON da execução (arquivo .json ou pasta)
+REPORT_ENV = "VR_AGENT_RUN_REPORT"
+
+PERFIL_TOP = 25
+
+# Execução corrente (None = etapas não são registradas)
+_atual: contextvars.ContextVar[Optional["Execucao"]] = contextvars.ContextVar("execucao_atual", default=None)
+
+
+def _linhas(valor: Any) -> Optional[int]:
+    if valor is None:
+        return None
+    if isinstance(valor, int):
+        return valor
+    try:
+        return len(valor)
+    except TypeError:
+        return None
+
+
+def _rss_mib() -> Optional[float]:
+    """Memória residente do processo (Linux, via /proc); None onde não houver."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 2**20
+    except (OSError, ValueError, AttributeError):
+        return None
+
+
+class Etapa:
+    """Registro de uma etapa: ``saida`` pode ser atribuída (DataFrame ou int) dentro do bloco."""
+
+    __slots__ = ("nome", "entrada", "saida")
+
+    def __init__(self, nome: str, entrada: Any = None):
+        self.nome = nome
+        self.entrada = _linhas(entrada)
+        self.saida = None
+
+
+class Execucao:
+    """Coleta tempo, linhas e memória das etapas de uma execução.
+
+    Sem perfis, a memória de cada etapa é a variação do RSS do processo. Com
+    ``tracemalloc`` em ``profile``, cada etapa traz também o pico alocado
+    (``pico_mib``) e o relatório, os maiores pontos de alocação; com
+    ``cprofile``, as funções com maior tempo acumulado.
+    """
+
+    def __init__(self, nome: str, profile: Optional[str] = None):
+        self.nome = nome
+        perfis = os.getenv(PROFILE_ENV, "") if profile is None else profile
+        self.perfis = {p.strip().lower() for p in perfis.split(",") if p.strip()}
+        self.etapas: list = []
+        self._pilha: list = []
+        self._profiler: Optional[cProfile.Profile] = None
+        self._tracemalloc = False
+        self.inicio = time.time()
+        self.segundos: Optional[float] = None
+        self.perfil: dict = {}
+
+    # ---- ciclo de vida ----
+    def start(self) -> None:
+        self._t0 = time.perf_counter()
+        if "tracemalloc" in self.perfis and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self._tracemalloc = True
+        if "cprofile" in self.perfis:
+            self._profiler = cProfile.Profile()
+            self._profiler.enable()
+
+    def stop(self) -> None:
+        self.segundos = round(time.perf_counter() - self._t0, 4)
+        if self._profiler is not None:
+            self._profiler.disable()
+            out = io.StringIO()
+            pstats.Stats(self._profiler, stream=out).sort_stats("cumulative").print_stats(PERFIL_TOP)
+            self.perfil["cprofile"] = out.getvalue().splitlines()
+            self._profiler = None
+        if self._tracemalloc:
+            snapshot = tracemalloc.take_snapshot()
+            self.perfil["tracemalloc"] = [
+                {"local": str(s.traceback), "mib": round(s.size / 2**20, 3), "blocos": s.count}
+                for s in snapshot.statistics("lineno")[:PERFIL_TOP]
+            ]
+            tracemalloc.stop()
+            self._tracemalloc = False
+
+    # ---- etapas ----
+    @contextmanager
+    def etapa(self, nome: str, entrada: Any = None):
+        nome = "/".join([*(f["nome"] for f in self._pilha[-1:]), nome])
+        reg = Etapa(nome, entrada)
+        rastreando = self._tracemalloc  # só mexe no tracemalloc que esta execução ligou
+        if rastreando:
+            mem0, pico = tracemalloc.get_traced_memory()
+            # o pico até aqui pertence à etapa externa; o contador recomeça para esta
+            if self._pilha:
+                self._pilha[-1]["pico"] = max(self._pilha[-1]["pico"], pico)
+            tracemalloc.reset_peak()
+        frame = {"nome": nome, "pico": 0}
+        self._pilha.append(frame)
+        rss0 = _rss_mib()
+        t0 = time.perf_counter()
+        erro = None
+        try:
+            yield reg
+        except BaseException as exc:
+            erro = f"{type(exc).__name__}: {exc}"
+            raise
+        finally:
+            segundos = time.perf_counter() - t0
+            self._pilha.pop()
+            rss1 = _rss_mib()
+            linha = {
+                "etapa": nome,
+                "nivel": nome.count("/"),
+                "segundos": round(segundos, 4),
+                "linhas_entrada": reg.entrada,
+                "linhas_saida": _linhas(reg.saida),
+                "mem_delta_mib": round(rss1 - rss0, 2) if rss0 is not None and rss1 is not None else None,
+            }
+            if rastreando:
+                mem1, pico = tracemalloc.get_traced_memory()
+                pico = max(frame["pico"], pico)
+                if self._pilha:
+                    self._pilha[-1]["pico"] = max(self._pilha[-1]["pico"], pico)
+                tracemalloc.reset_peak()
+                linha["mem_delta_mib"] = round((mem1 - mem0) / 2**20, 2)
+                linha["pico_mib"] = round((pico - mem0) / 2**20, 2)
+            if erro:
+                linha["erro"] = erro
+            self.etapas.append(linha)
+            logger.info(
+                f"⏱️ {nome}: {segundos:.3f}s, linhas {reg.entrada if reg.entrada is not None else '-'}"
+                f" → {linha['linhas_saida'] if linha['linhas_saida'] is not None else '-'}"
+                f", Δmem {linha['mem_delta_mib'] if linha['mem_delta_mib'] is not None else '-'} MiB"
+            )
+
+    def tempos(self) -> dict:
+        """Segundos das etapas de primeiro nível (mais ``total``)."""
+        tempos = {e["etapa"]: e["segundos"] for e in self.etapas if e["nivel"] == 0}
+        if self.segundos is not None:
+            tempos["total"] = self.segundos
+        return tempos
+
+    def relatorio(self) -> dict:
+        return {
+            "execucao": self.nome,
+            "inicio": time.strftime("%Y-%m-%dT%H:%M:%S", time.localtime(self.inicio)),
+            "segundos": self.segundos,
+            "perfis": sorted(self.perfis),
+            "etapas": self.etapas,
+            **({"perfil": self.perfil} if self.perfil else {}),
+        }
+
+    def salvar(self, destino) -> Path:
+        """Grava o relatório em ``destino`` (arquivo .json ou pasta)."""
+        path = Path(destino)
+        if path.suffix.lower() != ".json":
+            path = path / f"relatorio_{self.nome}_{time.strftime('%Y%m%d_%H%M%S', time.localtime(self.inicio))}.json"
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(json.dumps(self.relatorio(), ensure_ascii=False, indent=2), encoding="utf-8")
+        return path
+
+
+@contextmanager
+def execucao(nome: str, profile: Optional[str] = None, relatorio: Optional[str] = None):
+    """Abre uma execução instrumentada; as ``etapa`` chamadas dentro dela são registradas.
+
+    Ao sair, o relatório vai para ``relatorio`` (ou a env ``VR_AGENT_RUN_REPORT``),
+    se informado. Execuções aninhadas reaproveitam a externa.
+    """
+    atual = _atual.get()
+    if atual is not None:
+        yield atual
+        return
+    run = Execucao(nome, profile)
+    token = _atual.set(run)
+    run.start()
+    try:
+        yield run
+    finally:
+        run.stop()
+        _atual.reset(token)
+        destino = relatorio or os.getenv(REPORT_ENV)
+        if destino:
+            try:
+                logger.info(f"📑 Relatório da execução: {run.salvar(destino)}")
+            except OSError as exc:
+                logger.warning(f"⚠️ Não foi possível gravar o relatório da execução: {exc}")
+
+
+@contextmanager
+def etapa(nome: str, entrada: Any = None):
+    """Etapa da execução corrente; fora de uma ``execucao`` só devolve o registro, sem medir."""
+    run = _atual.get()
+    if run is None:
+        yield Etapa(nome)
+        return
+    with run.etapa(nome, entrada) as reg:
+        yield reg
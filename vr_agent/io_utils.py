@@ -1,21 +1,366 @@
+import logging
+import os
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
+from typing import Callable, Iterable, Iterator, Optional
 import pandas as pd
 
-def load_first_sheet(path: str) -> pd.DataFrame:
-    """Carrega a primeira aba de um Excel e padroniza os nomes das colunas."""
+from .cache import cached_frame
+from .schema import aplicar_schema, schema_digest, schema_enabled
+
+logger = logging.getLogger(__name__)
+
+# Incrementar sempre que a padronização de colunas mudar (invalida o cache)
+COLUMNS_VERSION = 1
+
+WORKERS_ENV = "VR_AGENT_WORKERS"
+
+# Linhas por bloco na leitura em streaming
+DEFAULT_CHUNKSIZE = 50_000
+
+# Planilhas a partir deste tamanho (MB) são lidas em streaming (ver ``use_streaming``)
+STREAM_ENV = "VR_AGENT_STREAM_MB"
+STREAM_MB_PADRAO = 20
+
+
+def _header(raw) -> list:
+    """Padroniza o cabeçalho como ``load_first_sheet`` (read_excel + strip/upper).
+
+    Vazios viram 'Unnamed: n' e nomes repetidos ganham '.1', '.2'... antes do
+    strip/upper, com a mesma regra do read_excel (nomes dados antes dos vazios).
+    """
+    cols = list(raw)
+    sem_nome = [i for i, c in enumerate(cols) if c is None or c == ""]
+    for i in sem_nome:
+        cols[i] = f"Unnamed: {i}"
+    counts = defaultdict(int)
+    for i in [i for i in range(len(cols)) if i not in sem_nome] + sem_nome:
+        col = original = cols[i]
+        n = counts[col]
+        while n > 0:
+            counts[original] = n + 1
+            col = f"{original}.{n}"
+            n = n + 1 if col in cols else counts[col]
+        cols[i] = col
+        counts[col] = n + 1
+    return [str(c).strip().upper() for c in cols]
+
+
+def _iter_xlsx_chunks(p: Path, chunksize: int, usecols) -> Iterator[pd.DataFrame]:
+    import openpyxl
+
+    wb = openpyxl.load_workbook(p, read_only=True, data_only=True)
+    try:
+        rows = wb.worksheets[0].iter_rows(values_only=True)
+        header = _header(next(rows, ()))
+        keep = [i for i, c in enumerate(header) if usecols is None or c in usecols]
+        cols = [header[i] for i in keep]
+        buf = []
+        for row in rows:
+            if row is None or all(v is None for v in row):
+                continue
+            buf.append([row[i] if i < len(row) else None for i in keep])
+            if len(buf) >= chunksize:
+                yield pd.DataFrame(buf, columns=cols)
+                buf = []
+        if buf:
+            yield pd.DataFrame(buf, columns=cols)
+    finally:
+        wb.close()
+
+
+def iter_sheet_chunks(path, chunksize: int = DEFAULT_CHUNKSIZE, usecols: Iterable[str] = None) -> Iterator[pd.DataFrame]:
+    """Lê a primeira aba (ou um CSV/Parquet equivalente) em blocos de ``chunksize`` linhas.
+
+    Os nomes de coluna saem padronizados como em ``load_first_sheet``; com
+    ``usecols`` só as colunas (já padronizadas) pedidas são materializadas.
+    """
     p = Path(path)
     if not p.exists():
         raise FileNotFoundError(f"Arquivo não encontrado: {path}")
+    usecols = {str(c).strip().upper() for c in usecols} if usecols is not None else None
+
+    suffix = p.suffix.lower()
+    if suffix == ".csv":
+        for chunk in pd.read_csv(p, chunksize=chunksize):
+            chunk.columns = _header(chunk.columns)
+            yield chunk[[c for c in chunk.columns if usecols is None or c in usecols]]
+    elif suffix == ".parquet":
+        import pyarrow.parquet as pq
+
+        pf = pq.ParquetFile(p)
+        cols = [c for c in pf.schema_arrow.names if usecols is None or str(c).strip().upper() in usecols]
+        for batch in pf.iter_batches(batch_size=chunksize, columns=cols):
+            chunk = batch.to_pandas()
+            chunk.columns = _header(chunk.columns)
+            yield chunk
+    else:
+        yield from _iter_xlsx_chunks(p, chunksize, usecols)
+
+
+def load_sheet_filtered(
+    path,
+    filters: Iterable[Callable[[pd.DataFrame], pd.DataFrame]] = (),
+    chunksize: int = DEFAULT_CHUNKSIZE,
+    usecols: Iterable[str] = None,
+    schema: dict = None,
+    base: str = "",
+) -> pd.DataFrame:
+    """Lê a planilha em blocos aplicando ``filters`` a cada bloco antes de concatenar.
 
+    O pico de memória acompanha as linhas que sobrevivem aos filtros, e não o
+    tamanho bruto da aba. ``schema`` (ver ``load_first_sheet``) é aplicado
+    depois da concatenação, só nas linhas mantidas. Não passa pelo cache.
+    """
+    filters = list(filters)
+    kept, lidas = [], 0
+    for chunk in iter_sheet_chunks(path, chunksize=chunksize, usecols=usecols):
+        lidas += len(chunk)
+        for f in filters:
+            chunk = f(chunk)
+        if len(chunk):
+            kept.append(chunk)
+    if kept:
+        df = pd.concat(kept, ignore_index=True)
+    else:
+        header = next(iter_sheet_chunks(path, chunksize=1, usecols=usecols), pd.DataFrame())
+        df = header.iloc[0:0]
+    logger.info(f"🌊 {Path(path).name}: {lidas} linhas lidas, {len(df)} mantidas após filtros")
+    if schema and schema_enabled():
+        df = aplicar_schema(df, schema, base or Path(path).stem)
+    return df
+
+
+def use_streaming(path, streaming: Optional[bool] = None) -> bool:
+    """Decide a leitura em blocos: argumento > tamanho do arquivo >= env ``VR_AGENT_STREAM_MB`` (padrão 20)."""
+    if streaming is not None:
+        return bool(streaming)
+    limite = float(os.getenv(STREAM_ENV, "") or STREAM_MB_PADRAO)
+    return Path(path).stat().st_size >= limite * 2**20
+
+
+def _read_first_sheet(p: Path, schema: dict = None, base: str = "") -> pd.DataFrame:
     df = pd.read_excel(p, sheet_name=0)
     df.columns = [str(c).strip().upper() for c in df.columns]
+    if schema:
+        df = aplicar_schema(df, schema, base or p.stem)
     return df
 
 
-def save_layout(df: pd.DataFrame, path: str, sheet_name: str = "COMPRA") -> str:
-    """Salva DataFrame em Excel, criando pastas se necessário."""
+def load_first_sheet(path: str, cache_dir: str = None, schema: dict = None, base: str = "") -> pd.DataFrame:
+    """Carrega a primeira aba de um Excel e padroniza os nomes das colunas.
+
+    Com ``cache_dir`` informado, a aba é lida do cache Parquet quando o
+    conteúdo do arquivo não mudou desde a última leitura.
+
+    Com ``schema`` (ver ``schema.SCHEMAS``), as colunas declaradas saem já
+    nos tipos compactos e o cache guarda a versão tipada; as coerções ficam em
+    ``df.attrs["coercao"]``. A env ``VR_AGENT_SCHEMA=0`` desliga a tipagem.
+    """
+    p = Path(path)
+    if not p.exists():
+        raise FileNotFoundError(f"Arquivo não encontrado: {path}")
+
+    version = COLUMNS_VERSION
+    if schema and schema_enabled():
+        version = f"{COLUMNS_VERSION}-{schema_digest(schema)}"
+    else:
+        schema = None
+
+    return cached_frame(
+        p,
+        lambda: _read_first_sheet(p, schema, base),
+        sheet=0,
+        version=version,
+        cache_dir=cache_dir,
+    )
+
+
+def load_workers(workers: int = None) -> int:
+    """Número de processos para a leitura: argumento > env ``VR_AGENT_WORKERS`` > 1."""
+    if workers is None:
+        workers = int(os.getenv(WORKERS_ENV, "1") or 1)
+    return max(1, int(workers))
+
+
+def load_sheets(paths: dict, cache_dir: str = None, workers: int = None, schemas: dict = None) -> dict:
+    """Carrega várias planilhas (``{nome: caminho}``), opcionalmente em paralelo.
+
+    ``schemas`` mapeia nome → schema de tipos (ver ``load_first_sheet``).
+
+    Com ``workers > 1`` cada arquivo é lido num processo separado. O resultado
+    mantém a ordem de ``paths``; se algum arquivo falhar, todos os demais são
+    concluídos e o erro levantado é sempre o do primeiro nome (na ordem de
+    ``paths``) que falhou, independente da ordem de término dos processos.
+    """
+    schemas = schemas or {}
+    workers = min(load_workers(workers), len(paths)) if paths else 1
+    if workers <= 1:
+        return {
+            name: load_first_sheet(path, cache_dir=cache_dir, schema=schemas.get(name), base=name)
+            for name, path in paths.items()
+        }
+
+    logger.info(f"🧵 Carregando {len(paths)} planilhas com {workers} processos")
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = {
+            name: pool.submit(load_first_sheet, str(path), cache_dir=cache_dir,
+                              schema=schemas.get(name), base=name)
+            for name, path in paths.items()
+        }
+        results, errors = {}, {}
+        for name, fut in futures.items():
+            try:
+                results[name] = fut.result()
+            except Exception as exc:
+                errors[name] = exc
+
+    if errors:
+        name, exc = next(iter(errors.items()))
+        logger.error(f"❌ Falha ao carregar {name}: {exc}")
+        raise exc
+    return results
+
+
+class _CsvWriter:
+    """CSV em streaming: cabeçalho no primeiro bloco, depois só linhas."""
+
+    def __init__(self, path: Path, sheet_name: str, frame: pd.DataFrame = None):
+        self._f = open(path, "w", encoding="utf-8", newline="")
+        self._header = True
+
+    def write(self, chunk: pd.DataFrame) -> None:
+        chunk.to_csv(self._f, index=False, header=self._header)
+        self._header = False
+
+    def close(self) -> None:
+        self._f.close()
+
+
+class _ParquetWriter:
+    """Parquet em row groups, um por bloco.
+
+    O schema Arrow vem do DataFrame inteiro (``frame``): um primeiro bloco só
+    com nulos, ou com inteiros numa coluna que depois tem decimais, não pode
+    fixar um tipo que os blocos seguintes não cabem.
+    """
+
+    def __init__(self, path: Path, sheet_name: str, frame: pd.DataFrame = None):
+        import pyarrow as pa
+
+        self._path = path
+        self._writer = None
+        self._schema = pa.Schema.from_pandas(frame, preserve_index=False) if frame is not None else None
+
+    def write(self, chunk: pd.DataFrame) -> None:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        table = pa.Table.from_pandas(chunk, schema=self._schema, preserve_index=False)
+        if self._writer is None:
+            self._schema = table.schema
+            self._writer = pq.ParquetWriter(self._path, self._schema)
+        self._writer.write_table(table)
+
+    def close(self) -> None:
+        if self._writer is not None:
+            self._writer.close()
+
+
+class _XlsxWriter:
+    """XLSX via xlsxwriter em ``constant_memory``: cada linha vai direto para o disco."""
+
+    def __init__(self, path: Path, sheet_name: str, frame: pd.DataFrame = None):
+        import xlsxwriter
+
+        self._wb = xlsxwriter.Workbook(
+            str(path), {"constant_memory": True, "default_date_format": "dd/mm/yyyy"}
+        )
+        self._ws = self._wb.add_worksheet(sheet_name)
+        self._bold = self._wb.add_format({"bold": True})
+        self._row = 0
+
+    def write(self, chunk: pd.DataFrame) -> None:
+        if self._row == 0:
+            self._ws.write_row(0, 0, [str(c) for c in chunk.columns], self._bold)
+            self._row = 1
+        values = chunk.astype(object).where(chunk.notna(), None)
+        for row in values.itertuples(index=False, name=None):
+            self._ws.write_row(self._row, 0, row)
+            self._row += 1
+
+    def close(self) -> None:
+        self._wb.close()
+
+
+# Formatos de saída suportados: extensão -> writer
+WRITERS = {
+    "csv": _CsvWriter,
+    "parquet": _ParquetWriter,
+    "xlsx": _XlsxWriter,
+}
+
+
+def write_layout(
+    df: pd.DataFrame,
+    path,
+    formats: Iterable[str] = None,
+    sheet_name: str = "COMPRA",
+    chunksize: int = DEFAULT_CHUNKSIZE,
+) -> dict:
+    """Grava o layout em um ou mais formatos numa única passada pelo DataFrame.
+
+    ``formats`` (ex.: ``["xlsx", "csv"]``) define as extensões; o padrão é a
+    extensão de ``path``. Cada formato vai para ``path`` com a extensão trocada
+    (ou acrescentada, ver ``_com_formato``). Retorna ``{formato: caminho}``.
+    """
+    p = Path(path)
+    p.parent.mkdir(parents=True, exist_ok=True)  # cria diretório se não existir
+    formats = list(dict.fromkeys(f.lower().lstrip(".") for f in (formats or [p.suffix])))
+    unknown = [f for f in formats if f not in WRITERS]
+    if unknown:
+        raise ValueError(f"Formato de saída não suportado: {unknown} (use {sorted(WRITERS)})")
+    return _write_paths(df, {fmt: _com_formato(p, fmt) for fmt in formats}, sheet_name, chunksize)
+
+
+def _com_formato(p: Path, fmt: str) -> Path:
+    """``p`` com a extensão de ``fmt``: troca a de um formato conhecido, senão acrescenta (``VR.05.2025.csv``)."""
+    if p.suffix.lower().lstrip(".") in WRITERS:
+        return p.with_suffix(f".{fmt}")
+    return p.with_name(f"{p.name}.{fmt}")
+
+
+def _write_paths(df: pd.DataFrame, paths: dict, sheet_name: str, chunksize: int) -> dict:
+    writers = []
+    try:
+        for fmt, out in paths.items():
+            writers.append(WRITERS[fmt](out, sheet_name, frame=df))
+        for start in range(0, max(len(df), 1), chunksize):
+            chunk = df.iloc[start:start + chunksize]
+            for w in writers:
+                w.write(chunk)
+    finally:
+        for w in writers:
+            w.close()
+    return {fmt: str(out) for fmt, out in paths.items()}
+
+
+def save_layout(df: pd.DataFrame, path: str, sheet_name: str = "COMPRA", formats: Iterable[str] = None) -> str:
+    """Salva o layout em ``path`` (Excel, ou o formato da extensão se for csv/parquet), criando pastas se necessário.
+
+    O nome é mantido como veio; extensões fora de ``WRITERS`` (``.xls``,
+    ``VR.05.2025``) recebem Excel. Formatos extras em ``formats`` são gravados
+    na mesma passada; o retorno é o caminho do arquivo principal (``path``).
+    """
     p = Path(path)
     p.parent.mkdir(parents=True, exist_ok=True)  # cria diretório se não existir
-    with pd.ExcelWriter(p, engine="xlsxwriter") as writer:
-        df.to_excel(writer, index=False, sheet_name=sheet_name)
-    return str(p)
+    main = p.suffix.lower().lstrip(".")
+    main = main if main in WRITERS else "xlsx"
+    paths = {main: p}
+    for fmt in (formats or []):
+        fmt = fmt.lower().lstrip(".")
+        if fmt not in WRITERS:
+            raise ValueError(f"Formato de saída não suportado: {fmt!r} (use {sorted(WRITERS)})")
+        paths.setdefault(fmt, _com_formato(p, fmt))
+    return _write_paths(df, paths, sheet_name, DEFAULT_CHUNKSIZE)[main]
@@ -0,0 +1,198 @@
+import logging
+import os
+from pathlib import Path
+from typing import Iterable, Optional
+
+from .cache import default_cache_dir
+from .instrumentacao import etapa, execucao
+from .io_utils import load_first_sheet, load_sheet_filtered, load_sheets, save_layout, use_streaming
+from .rules import compute_layout, validate
+from .rules_old import EXCLUSOES_ATTR, FiltroAtivos, load_ativos_filtrado
+from .schema import SCHEMAS
+
+logger = logging.getLogger(__name__)
+
+# Formatos gravados além do da extensão de saída (ex.: "csv,parquet")
+OUTPUT_FORMATS_ENV = "VR_AGENT_OUTPUT_FORMATS"
+
+# Arquivos usuais da pasta ./data, com as chaves que ``load_bases`` procura
+ARQUIVOS_PADRAO = {
+    "ATIVOS": "ATIVOS.xlsx",
+    "DESLIGADOS": "DESLIGADOS.xlsx",
+    "ADMISSÃO ABRIL": "ADMISSÃO ABRIL.xlsx",
+    "AFASTAMENTOS": "AFASTAMENTOS.xlsx",
+    "APRENDIZ": "APRENDIZ.xlsx",
+    "ESTÁGIO": "ESTÁGIO.xlsx",
+    "BASE_DIAS_UTEIS": "Base dias uteis.xlsx",
+    "BASE_SINDICATO_VALOR": "Base sindicato x valor.xlsx",
+    "FÉRIAS": "FÉRIAS.xlsx",
+    "EXTERIOR": "EXTERIOR.xlsx",
+}
+SAIDA_PADRAO = "VR_VA_COMPRA_05_2025_ADK.xlsx"
+
+
+def load_bases(
+    base_dir: str,
+    arquivos: dict,
+    workers: int = None,
+    skip: Iterable[str] = (),
+    filtrar_ativos: bool = False,
+    empresa: Optional[str] = None,
+    situacao: Optional[str] = None,
+    streaming: Optional[bool] = None,
+) -> dict:
+    """Carrega planilhas a partir do diretório ./data (com cache Parquet em ./data/.cache)
+
+    Cada base já sai nos tipos compactos de ``schema.SCHEMAS``.
+    ``workers`` (ou a env ``VR_AGENT_WORKERS``) > 1 lê os arquivos em paralelo.
+    Bases em ``skip`` (ex.: ``"diasuteis"``) não são lidas e voltam como None.
+
+    Com ``filtrar_ativos`` (opcional: é o recorte de ``rules_old``), ATIVOS já
+    sai sem cargos excluídos, sem as matrículas das fontes de exclusão e, se
+    informados, só com ``empresa`` e com ``DESC. SITUACAO`` igual a ``situacao``
+    (``rules_old.FiltroAtivos``); as contagens ficam em ``attrs["exclusoes"]``.
+    ATIVOS (com ``filtrar_ativos``) e DESLIGADOS grandes (``io_utils.use_streaming``,
+    ou ``streaming=True``) são lidos em blocos, sem cache, com as mesmas
+    colunas da leitura inteira: a memória de ATIVOS acompanha as linhas mantidas.
+    """
+    if not filtrar_ativos and (empresa is not None or situacao is not None):
+        raise ValueError("empresa/situacao só se aplicam com filtrar_ativos=True")
+    base_dir = Path(base_dir).resolve()
+    base_dir.mkdir(parents=True, exist_ok=True)
+    cache_dir = default_cache_dir(base_dir)
+
+    def resolve(name):
+        filename = (
+            arquivos.get(name)
+            or arquivos.get(f"{name}.xlsx")
+            or arquivos.get(f"{name}.xls")
+        )
+        if not filename:
+            logger.warning(f"⚠️ Nenhum arquivo encontrado para base {name}")
+            return None
+        path = base_dir / filename
+        if not path.exists():
+            raise FileNotFoundError(f"Arquivo esperado não encontrado: {path}")
+        logger.info(f"📂 Carregando base: {path.name}")
+        return path
+
+    nomes = {
+        "ativos": "ATIVOS",
+        "deslig": "DESLIGADOS",
+        "adm": "ADMISSÃO ABRIL",
+        "afast": "AFASTAMENTOS",
+        "aprendiz": "APRENDIZ",
+        "estagio": "ESTÁGIO",
+        "diasuteis": "BASE_DIAS_UTEIS",
+        "sind_valor": "BASE_SINDICATO_VALOR",
+        "ferias": "FÉRIAS",
+        "exterior": "EXTERIOR",
+    }
+    paths = {key: resolve(name) for key, name in nomes.items() if key not in skip}
+    paths = {key: path for key, path in paths.items() if path is not None}
+    em_blocos = {key for key in ("ativos", "deslig") if key in paths and use_streaming(paths[key], streaming)}
+    if not filtrar_ativos:
+        em_blocos.discard("ativos")  # sem filtros não há o que ganhar: vai pelo cache
+    depois = {"ativos"} if filtrar_ativos else set()
+    loaded = load_sheets(
+        {key: path for key, path in paths.items() if key not in em_blocos | depois},
+        cache_dir=cache_dir,
+        workers=workers,
+        schemas=SCHEMAS,
+    )
+    if "deslig" in em_blocos:
+        loaded["deslig"] = load_sheet_filtered(paths["deslig"], schema=SCHEMAS["deslig"], base="deslig")
+    if filtrar_ativos and "ativos" in paths:
+        fontes = {key: loaded.get(key) for key in ("deslig", "afast", "aprendiz", "estagio", "exterior")}
+        if "ativos" in em_blocos:
+            loaded["ativos"] = load_ativos_filtrado(paths["ativos"], empresa=empresa, situacao=situacao,
+                                                    schema=SCHEMAS["ativos"], **fontes)
+        else:
+            filtro = FiltroAtivos(empresa=empresa, situacao=situacao, **fontes)
+            ativos = load_first_sheet(paths["ativos"], cache_dir=cache_dir, schema=SCHEMAS["ativos"], base="ativos")
+            loaded["ativos"] = filtro(ativos).copy()
+            loaded["ativos"].attrs[EXCLUSOES_ATTR] = dict(filtro.exclusoes)
+            logger.info(f"🧹 ATIVOS filtrada na leitura: {len(ativos)} → {len(loaded['ativos'])} linhas")
+    bases = {key: loaded.get(key) for key in nomes}
+    logger.info("✅ Todas as bases foram carregadas.")
+    return bases
+
+
+def executar(
+    base_dir: str,
+    saida_arquivo: str,
+    arquivos: dict,
+    formats: Optional[Iterable[str]] = None,
+    workers: int = None,
+    filtrar_ativos: bool = False,
+    situacao: Optional[str] = None,
+) -> dict:
+    """Roda o pipeline direto, sem LLM: load_bases → compute_layout → validate → save_layout.
+
+    ``formats`` (padrão: env ``VR_AGENT_OUTPUT_FORMATS`` ou "csv") são os
+    formatos gravados além do da extensão de saída. O resultado traz o tempo
+    de cada etapa em ``tempos`` e o relatório completo (etapas internas,
+    linhas, memória e perfis de ``VR_AGENT_PROFILE``) em ``instrumentacao``.
+    ``filtrar_ativos`` (e ``situacao``) pré-filtram ATIVOS na leitura (ver
+    ``load_bases``); por padrão ATIVOS segue inteira para ``compute_layout``.
+    """
+    with execucao("gerar_compra_vr") as run:
+        resultado = _executar(base_dir, saida_arquivo, arquivos, formats, workers, filtrar_ativos, situacao)
+    resultado["tempos"] = run.tempos()
+    resultado["instrumentacao"] = run.relatorio()
+    return resultado
+
+
+def _executar(base_dir, saida_arquivo, arquivos, formats, workers, filtrar_ativos=False, situacao=None) -> dict:
+    with etapa("load_bases") as e:
+        bases = load_bases(base_dir, arquivos, workers=workers, filtrar_ativos=filtrar_ativos, situacao=situacao)
+        e.saida = bases["ativos"]
+
+    if bases["ativos"] is None:
+        logger.error("❌ Base ATIVOS.xlsx não carregada.")
+        raise ValueError("A base ATIVOS.xlsx não foi carregada.")
+
+    # ✅ chama regras do rules.py
+    logger.info("⚙️ Executando compute_layout...")
+    with etapa("compute_layout", bases["ativos"]) as e:
+        layout = compute_layout(
+            ativos=bases["ativos"],
+            deslig=bases["deslig"],
+            adm=bases["adm"],
+            afast=bases["afast"],
+            aprendiz=bases["aprendiz"],
+            estagio=bases["estagio"],
+            diasuteis=bases["diasuteis"],
+            sind_valor=bases["sind_valor"],
+            ferias=bases["ferias"],
+            exterior=bases["exterior"],
+        )
+        e.saida = layout
+    logger.info(f"📊 Layout consolidado com {len(layout)} registros.")
+
+    # ✅ roda validação
+    logger.info("🔎 Rodando validação do layout...")
+    with etapa("validate", layout) as e:
+        issues = validate(layout)
+        e.saida = len(layout)
+    if issues:
+        logger.warning(f"⚠️ Validação encontrou problemas: {issues}")
+    else:
+        logger.info("✅ Validação concluída sem problemas.")
+
+    # Salva saída
+    base_dir = Path(base_dir)
+    base_dir.mkdir(parents=True, exist_ok=True)
+    if formats is None:
+        formats = os.getenv(OUTPUT_FORMATS_ENV, "csv").split(",")
+    formats = [f.strip() for f in formats if f.strip()]
+    with etapa("save_layout", layout):
+        path = save_layout(layout, base_dir / saida_arquivo, formats=formats)
+    logger.info(f"💾 Layout salvo em: {path} (+ {', '.join(formats) or 'nenhum formato extra'})")
+
+    return {
+        "status": "ok",
+        "arquivo": str(path),
+        "avisos": issues,
+        "linhas": len(layout),
+    }
@@ -0,0 +1,127 @@
+from typing import Optional
+
+import numpy as np
+import pandas as pd
+
+from .business_days import local_codes, get_calendar
+
+# Mesmo calendário do bdate_range(freq="C") padrão: segunda a sexta, sem feriados
+WEEKMASK = "1111100"
+
+
+def _as_datetime(values, n: int) -> pd.Series:
+    """Converte datas (Timestamp, str dd/mm/aaaa, NaT/None) para Series datetime64 posicional."""
+    if values is None:
+        return pd.Series(pd.NaT, index=pd.RangeIndex(n), dtype="datetime64[ns]")
+    s = pd.Series(values.to_numpy() if isinstance(values, pd.Series) else values)
+    if not pd.api.types.is_datetime64_any_dtype(s):
+        s = pd.to_datetime(s, errors="coerce", dayfirst=True)
+    return s
+
+
+def _days(s: pd.Series) -> np.ndarray:
+    """Trunca para o dia (datetime64[D]), como faz o bdate_range(normalize=True)."""
+    return s.to_numpy(dtype="datetime64[ns]").astype("datetime64[D]")
+
+
+def count_bdays(start, end, weekmask: str = WEEKMASK, holidays=()) -> np.ndarray:
+    """Dias úteis no intervalo fechado [start, end], vetorizado (0 se end < start)."""
+    start = np.asarray(start, dtype="datetime64[D]")
+    end = np.asarray(end, dtype="datetime64[D]") + np.timedelta64(1, "D")
+    n = np.busday_count(start, np.maximum(start, end), weekmask=weekmask, holidays=list(holidays))
+    return n.astype(np.int64)
+
+
+def prorate(
+    base_days,
+    period_start: pd.Timestamp,
+    period_end: pd.Timestamp,
+    admissao=None,
+    demissao=None,
+    weekmask: str = WEEKMASK,
+    holidays=(),
+    calendar=None,
+) -> np.ndarray:
+    """Calcula DIAS_COMPRAR para colunas inteiras de uma vez.
+
+    Equivale a ``prorate_by_admission`` aplicado linha a linha: os dias úteis
+    do sindicato são proporcionais à fração de dias úteis do período em que o
+    colaborador está ativo (a partir da admissão e, se informada, até a
+    demissão), arredondados e limitados a ``base_days``. O total de dias úteis
+    do período é calculado uma única vez.
+
+    Com ``calendar`` (um ``business_days.BusinessCalendar`` do período), as
+    contagens usam a soma de prefixos do calendário, já com feriados.
+    """
+    base = np.asarray(base_days, dtype=np.int64)
+
+    if calendar is not None:
+        total = calendar.total
+    else:
+        total = int(count_bdays(period_start, period_end, weekmask, holidays))
+    if total <= 0:
+        return base.copy()
+
+    adm = _as_datetime(admissao, len(base))
+    dem = _as_datetime(demissao, len(base))
+    adm_ok = adm.notna().to_numpy()
+    dem_ok = dem.notna().to_numpy()
+
+    ps, pe = np.datetime64(period_start, "D"), np.datetime64(period_end, "D")
+    start = np.where(adm_ok, np.maximum(_days(adm.fillna(period_start)), ps), ps)
+    end = np.where(dem_ok, np.minimum(_days(dem.fillna(period_end)), pe), pe)
+    if calendar is not None:
+        bdays = calendar.count(start, end)
+    else:
+        bdays = count_bdays(start, end, weekmask, holidays)
+
+    prorated = np.rint(base * (bdays / total)).astype(np.int64)
+    out = np.minimum(base, prorated)
+
+    # sem admissão nem demissão no período: mantém os dias do sindicato
+    out = np.where(adm_ok | dem_ok, out, base)
+    # admitido depois do fim ou desligado antes do início: não ganha nada
+    out[adm_ok & (adm > period_end).to_numpy()] = 0
+    out[dem_ok & (dem < period_start).to_numpy()] = 0
+    return out
+
+
+def prorate_series(
+    base_days: pd.Series,
+    period_start: pd.Timestamp,
+    period_end: pd.Timestamp,
+    admissao: Optional[pd.Series] = None,
+    demissao: Optional[pd.Series] = None,
+    **kwargs,
+) -> pd.Series:
+    """Versão de ``prorate`` que devolve uma Series alinhada ao índice de ``base_days``."""
+    values = prorate(base_days, period_start, period_end, admissao, demissao, **kwargs)
+    return pd.Series(values, index=base_days.index, name="DIAS_COMPRAR")
+
+
+def prorate_by_local(
+    base_days,
+    period_start: pd.Timestamp,
+    period_end: pd.Timestamp,
+    uf,
+    municipio=None,
+    admissao=None,
+    demissao=None,
+    feriados: bool = True,
+) -> np.ndarray:
+    """Prorrateio com o calendário de feriados de cada (UF, município).
+
+    Cada localidade distinta monta (ou reaproveita, via memoização) seu
+    calendário uma vez; as linhas do grupo são prorrateadas juntas.
+    """
+    base = np.asarray(base_days, dtype=np.int64)
+    adm = _as_datetime(admissao, len(base))
+    dem = _as_datetime(demissao, len(base))
+    codes, keys = local_codes(uf, municipio)
+    out = np.zeros(len(base), dtype=np.int64)
+    for code, (u, m) in enumerate(keys):
+        idx = np.flatnonzero(codes == code)
+        cal = get_calendar(period_start, period_end, u, m, feriados)
+        out[idx] = prorate(base[idx], period_start, period_end,
+                           admissao=adm.iloc[idx], demissao=dem.iloc[idx], calendar=cal)
+    return out
@@ -0,0 +1,114 @@
+import logging
+import threading
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Optional
+
+import numpy as np
+import pandas as pd
+
+from .cache import default_cache_dir, file_digest
+from .io_utils import load_first_sheet
+from .uf import uf_code
+
+logger = logging.getLogger(__name__)
+
+# Lookups já construídos, por (tipo, digest do arquivo): vivem enquanto o processo viver
+_LOOKUPS: dict = {}
+_LOCK = threading.Lock()
+
+
+def _chave(series: pd.Series) -> pd.Series:
+    return series.astype(str).str.upper().str.strip()
+
+
+@dataclass(frozen=True)
+class RefLookup:
+    """Tabela de referência indexada e imutável: chave normalizada → valor.
+
+    ``keys`` é um ``pd.Index`` sem repetições e ``values`` um array somente
+    leitura alinhado a ele; ``fallback`` é o valor padrão da tabela (NaN se
+    não houver). Pode ser compartilhada entre execuções e processos.
+    """
+
+    keys: pd.Index
+    values: np.ndarray
+    fallback: float = np.nan
+
+    @classmethod
+    def build(cls, chaves: pd.Series, valores: pd.Series, fallback: float = np.nan) -> "RefLookup":
+        # chave repetida: vale a primeira ocorrência
+        primeira = ~chaves.duplicated(keep="first").to_numpy()
+        values = np.asarray(valores.to_numpy()[primeira])
+        values.setflags(write=False)
+        return cls(pd.Index(chaves.to_numpy()[primeira]), values, fallback)
+
+    def __len__(self) -> int:
+        return len(self.keys)
+
+    def map(self, chaves: pd.Series) -> pd.Series:
+        """Valor por linha (NaN sem correspondência), resolvendo só as chaves distintas."""
+        codes, uniques = pd.factorize(chaves, use_na_sentinel=True)
+        pos = self.keys.get_indexer(uniques)
+        # último slot = código -1 (linha nula); chaves sem correspondência também ficam NaN
+        por_chave = np.full(len(uniques) + 1, np.nan)
+        hit = np.flatnonzero(pos >= 0)
+        por_chave[hit] = self.values[pos[hit]]
+        return pd.Series(por_chave.take(codes), index=chaves.index)
+
+
+def dias_uteis_lookup(diasuteis: Optional[pd.DataFrame]) -> Optional[RefLookup]:
+    """SINDICATO (maiúsculo, sem espaços nas pontas) → DIAS_UTEIS, ou None se a base for inválida.
+
+    Usa as duas primeiras colunas; linhas sem número (como o cabeçalho repetido) são ignoradas.
+    """
+    if diasuteis is None or diasuteis.shape[1] < 2:
+        return None
+    dias = pd.to_numeric(diasuteis.iloc[:, 1], errors="coerce")
+    ok = dias.notna()
+    return RefLookup.build(_chave(diasuteis.iloc[:, 0][ok]), dias[ok].astype(int))
+
+
+def _chave_uf(estado: pd.Series) -> pd.Series:
+    """Sigla da UF (``uf_code``) como chave; o que não for estado fica com o texto normalizado."""
+    texto = _chave(estado)
+    return texto.map(lambda t: uf_code(t) or t)
+
+
+def valor_lookup(sind_valor: Optional[pd.DataFrame]) -> Optional[RefLookup]:
+    """UF → VALOR, com a mediana dos valores como ``fallback``; None sem ESTADO/VALOR.
+
+    A base traz o nome do estado ("São Paulo") e o layout a sigla inferida do
+    sindicato (``UF_INFERIDA``), então a chave é a sigla.
+    """
+    if sind_valor is None or not {"ESTADO", "VALOR"}.issubset(sind_valor.columns):
+        return None
+    valores = pd.to_numeric(sind_valor["VALOR"], errors="coerce")
+    fallback = valores.median() if valores.notna().any() else 0.0
+    return RefLookup.build(_chave_uf(sind_valor["ESTADO"]), valores, fallback)
+
+
+BUILDERS = {"diasuteis": dias_uteis_lookup, "sind_valor": valor_lookup}
+
+
+def load_lookup(tipo: str, path, cache_dir=None, digest: Optional[str] = None) -> Optional[RefLookup]:
+    """Lê a planilha de referência e devolve o lookup, construído uma vez por conteúdo.
+
+    ``tipo`` é ``"diasuteis"`` ou ``"sind_valor"``. Chamadas seguintes com o
+    mesmo arquivo (mesmo digest) devolvem o mesmo objeto, sem reler a planilha.
+    """
+    path = Path(path).resolve()
+    chave = (tipo, digest or file_digest(path))
+    with _LOCK:
+        lookup = _LOOKUPS.get(chave)
+        if lookup is None and chave not in _LOOKUPS:
+            df = load_first_sheet(path, cache_dir=cache_dir or default_cache_dir(path.parent))
+            lookup = _LOOKUPS[chave] = BUILDERS[tipo](df)
+            logger.info(f"📚 Referência {path.name} indexada ({len(lookup) if lookup else 0} chaves)")
+    return lookup
+
+
+def clear() -> None:
+    """Descarta os lookups em memória."""
+    with _LOCK:
+        _LOOKUPS.clear()
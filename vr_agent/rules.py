@@ -1,7 +1,15 @@
+import numpy as np
 import pandas as pd
 from datetime import datetime
 from pandas.tseries.offsets import BMonthEnd
 import logging
+from typing import Iterable
+
+from .instrumentacao import etapa
+
+
+# Caracteres invisíveis removidos das colunas de texto (tabela pré-compilada para str.translate)
+_INVISIVEIS = str.maketrans("", "", "\u200b\u200c\u200d\ufeff")
 
 
 def normalize_cols(df: pd.DataFrame) -> pd.DataFrame:
@@ -11,30 +19,86 @@ def normalize_cols(df: pd.DataFrame) -> pd.DataFrame:
     if df is None:
         logger.warning("⚠️ DataFrame None recebido em normalize_cols")
         return None
-    df.columns = (
-        df.columns.str.strip()
-        .str.upper()
-        .str.replace("\xa0", "", regex=True)
-    )
+    df.columns = [str(c).strip().upper().replace("\xa0", "") for c in df.columns]
     logger.info(f"✅ Colunas normalizadas: {df.columns.tolist()}")
     return df
 
 
-def sanitize_df(df: pd.DataFrame) -> pd.DataFrame:
-    """Remove linhas totalmente nulas, converte NaN para 0 e remove caracteres invisíveis."""
+def _clean_text(s: pd.Series) -> pd.Series:
+    """Uma única passada por coluna de texto: converte para str e remove invisíveis."""
+    if isinstance(s.dtype, pd.CategoricalDtype):
+        cats = [str(c).translate(_INVISIVEIS) for c in s.cat.categories]
+        if len(set(cats)) == len(cats):
+            return s.cat.rename_categories(cats)  # mantém categórico: só as categorias são tocadas
+        s = s.astype(object)
+    elif isinstance(s.dtype, pd.StringDtype):
+        return s.str.translate(_INVISIVEIS)  # mantém string (inclusive Arrow)
+
+    values = s.to_numpy(dtype=object)
+    if pd.api.types.infer_dtype(values, skipna=False) == "string":
+        # só strings: traduz cada valor distinto uma vez
+        codes, uniques = pd.factorize(values)
+        cleaned = np.array([u.translate(_INVISIVEIS) for u in uniques], dtype=object)
+        return pd.Series(cleaned.take(codes), index=s.index, name=s.name)
+    return pd.Series([str(v).translate(_INVISIVEIS) for v in values], index=s.index, name=s.name, dtype=object)
+
+
+def _fill_zero(s: pd.Series) -> pd.Series:
+    """Converte NaN → 0 preservando categórico/string quando possível."""
+    if isinstance(s.dtype, pd.CategoricalDtype):
+        if 0 not in s.cat.categories:
+            s = s.cat.add_categories([0])
+        return s.fillna(0)
+    if isinstance(s.dtype, pd.StringDtype):
+        return s.fillna("0")
+    return s.where(s.notna(), 0)
+
+
+def sanitize_df(df: pd.DataFrame, limpas: Iterable[str] = ()) -> pd.DataFrame:
+    """Remove linhas totalmente nulas, converte NaN para 0 e remove caracteres invisíveis.
+
+    Devolve um novo DataFrame (o recebido não é alterado). ``limpas`` são
+    colunas que o chamador já sanitizou neste fluxo: só são revistas se
+    voltaram a ter NaN.
+    """
     logger = logging.getLogger(__name__)
     logger.debug("🔧 Entrou em sanitize_df")
     if df is None:
         logger.warning("⚠️ DataFrame None recebido em sanitize_df")
         return None
 
-    df = df.dropna(how="all")  # remove linhas 100% vazias
-    df = df.where(pd.notnull(df), 0)  # converte NaN → 0
-    df = df.loc[:, ~df.columns.str.contains("^Unnamed")]  # Remove colunas lixo ("Unnamed")
-
-    # Remove caracteres invisíveis de todas as colunas de texto
-    for col in df.select_dtypes(include=["object", "string"]):
-        df[col] = df[col].astype(str).str.replace(r"[\u200B\u200C\u200D\uFEFF]", "", regex=True)
+    done = set(limpas)
+    has_null = df.isna().any()
+    pending = [c for c in df.columns if c not in done or has_null[c]]
+    if not pending:
+        logger.debug("⏭️ DataFrame já sanitizado, nada a fazer")
+        return df
+
+    # cópia rasa: as colunas tratadas são substituídas só no novo frame
+    df = df.copy(deep=False)
+    if not done:
+        vazias = df.isna().all(axis=1)  # remove linhas 100% vazias
+        if vazias.any():
+            df = df.loc[~vazias].copy()
+
+    lixo = df.columns.str.contains("^Unnamed")  # Remove colunas lixo ("Unnamed")
+    if lixo.any():
+        df = df.loc[:, ~lixo].copy()
+
+    for col in pending:
+        if col not in df.columns:
+            continue
+        s = df[col]
+        texto = s.dtype == object or isinstance(s.dtype, pd.StringDtype) or (
+            isinstance(s.dtype, pd.CategoricalDtype) and s.cat.categories.dtype == object  # categorias numéricas não têm texto
+        )
+        if not (has_null[col] or texto):
+            continue
+        if has_null[col]:
+            s = _fill_zero(s)  # converte NaN → 0
+        if texto or s.dtype == object:
+            s = _clean_text(s)
+        df[col] = s
 
     logger.info(f"✅ DataFrame sanitizado com {len(df)} linhas e {len(df.columns)} colunas")
     return df
@@ -64,30 +128,35 @@ def compute_layout(
     # Normalização e sanitização
     # ==============================
     logger.debug("🔄 Normalizando e sanitizando bases...")
-    ativos = sanitize_df(normalize_cols(ativos))
-    deslig = sanitize_df(normalize_cols(deslig)) if deslig is not None else None
-    adm = sanitize_df(normalize_cols(adm)) if adm is not None else None
-    afast = sanitize_df(normalize_cols(afast)) if afast is not None else None
-    aprendiz = sanitize_df(normalize_cols(aprendiz)) if aprendiz is not None else None
-    estagio = sanitize_df(normalize_cols(estagio)) if estagio is not None else None
-    diasuteis = sanitize_df(normalize_cols(diasuteis)) if diasuteis is not None else None
-    sind_valor = sanitize_df(normalize_cols(sind_valor)) if sind_valor is not None else None
-    ferias = sanitize_df(normalize_cols(ferias)) if ferias is not None else None
-    exterior = sanitize_df(normalize_cols(exterior)) if exterior is not None else None
-
-    df = ativos.copy()
+    with etapa("sanitize", ativos) as e:
+        ativos = sanitize_df(normalize_cols(ativos))
+        e.saida = ativos
+    with etapa("sanitize_auxiliares"):
+        deslig = sanitize_df(normalize_cols(deslig)) if deslig is not None else None
+        adm = sanitize_df(normalize_cols(adm)) if adm is not None else None
+        afast = sanitize_df(normalize_cols(afast)) if afast is not None else None
+        aprendiz = sanitize_df(normalize_cols(aprendiz)) if aprendiz is not None else None
+        estagio = sanitize_df(normalize_cols(estagio)) if estagio is not None else None
+        diasuteis = sanitize_df(normalize_cols(diasuteis)) if diasuteis is not None else None
+        sind_valor = sanitize_df(normalize_cols(sind_valor)) if sind_valor is not None else None
+        ferias = sanitize_df(normalize_cols(ferias)) if ferias is not None else None
+        exterior = sanitize_df(normalize_cols(exterior)) if exterior is not None else None
+
+    df = ativos  # sanitize_df já devolveu um frame novo
     logger.info(f"📊 Base ATIVOS carregada com {len(df)} registros")
 
-    # Sindicato em maiúsculo
-    if "SINDICATO" in df.columns:
-        df["SINDICATO"] = df["SINDICATO"].str.upper().str.strip()
-        logger.debug("📝 Coluna SINDICATO normalizada em maiúsculo.")
+    with etapa("normalizar_chaves", df) as e:
+        # Sindicato em maiúsculo
+        if "SINDICATO" in df.columns:
+            df["SINDICATO"] = df["SINDICATO"].str.upper().str.strip()
+            logger.debug("📝 Coluna SINDICATO normalizada em maiúsculo.")
 
-    # Estado em maiúsculo
-    if sind_valor is not None and "ESTADO" in sind_valor.columns:
-        sind_valor["ESTADO"] = sind_valor["ESTADO"].str.upper().str.strip()
-        sind_valor = sind_valor.dropna(subset=["ESTADO"])
-        logger.info("📍 Coluna ESTADO de sind_valor normalizada e linhas nulas removidas.")
+        # Estado em maiúsculo
+        if sind_valor is not None and "ESTADO" in sind_valor.columns:
+            sind_valor["ESTADO"] = sind_valor["ESTADO"].str.upper().str.strip()
+            sind_valor = sind_valor.dropna(subset=["ESTADO"])
+            logger.info("📍 Coluna ESTADO de sind_valor normalizada e linhas nulas removidas.")
+        e.saida = df
 
     # (demais etapas continuam iguais, só acrescentei logs nos pontos principais)
     logger.debug("⚙️ Executando regras de filtro, merges e cálculos...")
@@ -97,18 +166,22 @@ def compute_layout(
     # ==========================================================
     valor_col = next((c for c in ["VALOR", "VR_VALOR", "VALOR_SINDICATO", "Valor", "Valor_Sindicato"] if c in df.columns), None)
 
-    if valor_col and "DIAS_UTEIS" in df.columns:
-        df["VALOR_VR"] = (
-            pd.to_numeric(df["DIAS_UTEIS"], errors="coerce").fillna(0)
-            * pd.to_numeric(df[valor_col], errors="coerce").fillna(0)
-        )
-        logger.info("💰 Coluna VALOR_VR calculada com sucesso.")
-    else:
-        df["VALOR_VR"] = 0
-        logger.warning("⚠️ Não foi possível calcular VALOR_VR (faltando colunas).")
+    with etapa("valor_vr", df) as e:
+        if valor_col and "DIAS_UTEIS" in df.columns:
+            df["VALOR_VR"] = (
+                pd.to_numeric(df["DIAS_UTEIS"], errors="coerce").fillna(0)
+                * pd.to_numeric(df[valor_col], errors="coerce").fillna(0)
+            )
+            logger.info("💰 Coluna VALOR_VR calculada com sucesso.")
+        else:
+            df["VALOR_VR"] = 0
+            logger.warning("⚠️ Não foi possível calcular VALOR_VR (faltando colunas).")
+        e.saida = df
 
     # 🔎 Sanitiza para garantir que não sobra NaN/None no resultado
-    df = sanitize_df(df)
+    with etapa("sanitize_final", df) as e:
+        df = sanitize_df(df, limpas=ativos.columns)
+        e.saida = df
     logger.info(f"✅ compute_layout finalizado com {len(df)} registros.")
     return df
 
@@ -3,18 +3,40 @@ from typing import Optional, Set
 import numpy as np
 import pandas as pd
 
-UF_LIST = ["AC","AL","AP","AM","BA","CE","DF","ES","GO","MA","MT","MS","MG",
-           "PA","PB","PR","PE","PI","RJ","RN","RS","RO","RR","SC","SP","SE","TO"]
+from .business_days import dias_uteis_por_local
+from .exclusion import build_exclusion_engine
+from .instrumentacao import etapa
+from .io_utils import DEFAULT_CHUNKSIZE, load_sheet_filtered
+from .proration import count_bdays, prorate_by_local, prorate_series
+from .referencias import RefLookup, dias_uteis_lookup, valor_lookup
+from .schema import MATRICULA_CANONICA
+from .uf import UF_LIST, resolve_uf, uf_from_sindicato  # noqa: F401
+
 
 PERIOD_START = pd.Timestamp(2025, 4, 15)
 PERIOD_END   = pd.Timestamp(2025, 5, 15)
 
+# Exclusões por motivo já feitas na leitura de ATIVOS (``FiltroAtivos``); somadas em stage_base
+EXCLUSOES_ATTR = "exclusoes"
+
+LAYOUT_COLS = ["MATRICULA", "EMPRESA", "TITULO DO CARGO", "SINDICATO", "UF_INFERIDA",
+               "DIAS_UTEIS", "ADMISSÃO", "DIAS_COMPRAR", "VR_DIA", "VR_TOTAL"]
+
+
+def matricula_inteira(s: pd.Series) -> bool:
+    """MATRICULA já tipada como inteiro na leitura (``schema.SCHEMAS``)."""
+    return pd.api.types.is_integer_dtype(s) and not pd.api.types.is_extension_array_dtype(s)
+
 
 def normalize_matricula(df: pd.DataFrame) -> pd.DataFrame:
-    """Normaliza a coluna MATRICULA: remove .0 final, strip e preserva NaN."""
+    """Normaliza a coluna MATRICULA: remove .0 final, strip e preserva NaN.
+
+    MATRICULA inteira (tipada na leitura) já está normalizada e segue como
+    inteiro: o motor de exclusão e o merge de admissão usam a chave numérica.
+    """
     if df is None:
         return df
-    if "MATRICULA" in df.columns:
+    if "MATRICULA" in df.columns and not matricula_inteira(df["MATRICULA"]):
         s = df["MATRICULA"].astype(str).str.replace(r"\.0$", "", regex=True).str.strip()
         # transformar strings "nan" de volta para np.nan
         s = s.replace({"nan": np.nan, "None": np.nan})
@@ -23,6 +45,23 @@ def normalize_matricula(df: pd.DataFrame) -> pd.DataFrame:
     return df
 
 
+def alinhar_matricula(df: pd.DataFrame, referencia: pd.Series) -> pd.DataFrame:
+    """Deixa MATRICULA de ``df`` no mesmo tipo (inteiro ou texto) de ``referencia``, para o merge.
+
+    Quando uma base foi tipada como inteiro e a outra caiu para texto (vazios
+    ou matrículas não numéricas), as linhas de texto não canônicas não têm
+    par numérico e saem de ``df``.
+    """
+    chaves = df["MATRICULA"]
+    if matricula_inteira(chaves) == matricula_inteira(referencia):
+        return df
+    if not matricula_inteira(referencia):
+        return df.assign(MATRICULA=chaves.astype(str))
+    canonica = chaves.astype(str).str.fullmatch(MATRICULA_CANONICA).eq(True) & chaves.notna()
+    df = df.loc[canonica]
+    return df.assign(MATRICULA=df["MATRICULA"].astype(np.int64))
+
+
 def _extract_matriculas_as_str(series: pd.Series) -> Set[str]:
     """Helper: recebe uma Series e retorna set de strings normalizadas (sem NaN)."""
     if series is None:
@@ -33,20 +72,9 @@ def _extract_matriculas_as_str(series: pd.Series) -> Set[str]:
     return set(s.astype(str))
 
 
-def build_exclusion_set(deslig, afast, aprendiz, estagio) -> set:
+def build_exclusion_set(deslig, afast, aprendiz, estagio, exterior=None) -> set:
     """Cria conjunto de matrículas a serem excluídas a partir de várias fontes."""
-    excl = set()
-    if deslig is not None and "MATRICULA" in deslig.columns:
-        excl.update(_extract_matriculas_as_str(deslig["MATRICULA"]))
-    if aprendiz is not None and "MATRICULA" in aprendiz.columns:
-        excl.update(_extract_matriculas_as_str(aprendiz["MATRICULA"]))
-    if estagio is not None and "MATRICULA" in estagio.columns:
-        excl.update(_extract_matriculas_as_str(estagio["MATRICULA"]))
-    if afast is not None and {"MATRICULA", "NA COMPRA?"}.issubset(afast.columns):
-        # padroniza a coluna NA COMPRA?
-        mask = afast["NA COMPRA?"].astype(str).str.upper().str.strip().isin(["N", "NAO", "NÃO", "NO"])
-        excl.update(_extract_matriculas_as_str(afast.loc[mask, "MATRICULA"]))
-    return excl
+    return build_exclusion_engine(deslig, afast, aprendiz, estagio, exterior).as_set()
 
 
 def exclude_by_cargo(df: pd.DataFrame) -> pd.DataFrame:
@@ -58,43 +86,97 @@ def exclude_by_cargo(df: pd.DataFrame) -> pd.DataFrame:
     return df
 
 
-def map_dias_uteis(df_base: pd.DataFrame, diasuteis: Optional[pd.DataFrame]) -> pd.DataFrame:
-    """Mapeia DIAS_UTEIS por sindicato. Se diasuteis for inválido, mantém NaN."""
-    if diasuteis is None:
-        df_base = df_base.copy()
-        df_base["DIAS_UTEIS"] = np.nan
-        return df_base
-
-    # valida quantidade de colunas do arquivo diasuteis
-    if diasuteis.shape[1] < 2:
-        df_base = df_base.copy()
-        df_base["DIAS_UTEIS"] = np.nan
-        return df_base
-
-    du = diasuteis.rename(columns={diasuteis.columns[0]: "SINDICATO_NOME",
-                                   diasuteis.columns[1]: "DIAS_UTEIS"}).copy()
-    du["SINDICATO_NOME"] = du["SINDICATO_NOME"].astype(str).str.upper().str.strip()
-    du["DIAS_UTEIS"] = pd.to_numeric(du["DIAS_UTEIS"], errors="coerce")
-    du = du[du["DIAS_UTEIS"].notna()].copy()
-    du["DIAS_UTEIS"] = du["DIAS_UTEIS"].astype(int)
+def filter_by_situacao(df: pd.DataFrame, situacao: str = "Trabalhando") -> pd.DataFrame:
+    """Mantém só as linhas com ``DESC. SITUACAO`` igual a ``situacao`` (sem diferenciar caixa)."""
+    if "DESC. SITUACAO" in df.columns:
+        ok = df["DESC. SITUACAO"].astype(str).str.strip().str.upper() == situacao.strip().upper()
+        return df.loc[ok]
+    return df
+
 
+def filtrar_empresa(ativos: pd.DataFrame, empresa: Optional[str]) -> pd.DataFrame:
+    """Só as linhas de ``empresa`` (código como texto, sem ``.0``); None mantém todas."""
+    if empresa is None or ativos is None or "EMPRESA" not in ativos.columns:
+        return ativos
+    col = ativos["EMPRESA"].astype(str).str.replace(r"\.0$", "", regex=True).str.strip()
+    return ativos.loc[col == str(empresa).strip()]
+
+
+class FiltroAtivos:
+    """Empresa, cargo, situação e exclusões de ATIVOS, para a base inteira ou bloco a bloco.
+
+    É o mesmo recorte de ``stage_base``; ``exclusoes`` acumula, por motivo, as
+    linhas removidas pelas fontes de exclusão em todas as chamadas.
+    """
+
+    def __init__(self, deslig=None, afast=None, aprendiz=None, estagio=None, exterior=None,
+                 situacao: Optional[str] = None, empresa: Optional[str] = None):
+        self.engine = build_exclusion_engine(normalize_matricula(deslig), normalize_matricula(afast),
+                                             normalize_matricula(aprendiz), normalize_matricula(estagio),
+                                             exterior)
+        self.situacao = situacao
+        self.empresa = empresa
+        self.exclusoes = dict.fromkeys(self.engine.reasons, 0)
+
+    def __call__(self, df: pd.DataFrame) -> pd.DataFrame:
+        df = exclude_by_cargo(filtrar_empresa(df, self.empresa))
+        if self.situacao:
+            df = filter_by_situacao(df, self.situacao)
+        if "MATRICULA" in df.columns:
+            motivos = self.engine.match(df["MATRICULA"])
+            for motivo, n in self.engine.breakdown(motivos).items():
+                self.exclusoes[motivo] += n
+            df = df.loc[motivos == 0]
+        return df
+
+
+def load_ativos_filtrado(path, deslig=None, afast=None, aprendiz=None, estagio=None,
+                         exterior=None, situacao: Optional[str] = None, empresa: Optional[str] = None,
+                         chunksize: int = DEFAULT_CHUNKSIZE, schema: dict = None) -> pd.DataFrame:
+    """Lê ATIVOS em blocos e aplica empresa, cargo, situação e exclusões em cada bloco.
+
+    Para planilhas muito grandes: só as linhas que sobrevivem aos filtros ficam
+    em memória. O resultado pode ir direto para ``compute_layout`` (que reaplica
+    os mesmos filtros sem efeito); as exclusões feitas aqui ficam em
+    ``df.attrs["exclusoes"]`` e entram na contagem de ``stage_base``.
+    """
+    filtro = FiltroAtivos(deslig, afast, aprendiz, estagio, exterior, situacao=situacao, empresa=empresa)
+    df = load_sheet_filtered(path, [filtro], chunksize=chunksize, schema=schema, base="ativos")
+    df.attrs[EXCLUSOES_ATTR] = dict(filtro.exclusoes)
+    return df
+
+
+def dias_uteis_table(diasuteis) -> Optional[RefLookup]:
+    """Lookup SINDICATO → DIAS_UTEIS da base de dias úteis (None se inválida).
+
+    Aceita também um ``RefLookup`` já construído (ver ``referencias.load_lookup``).
+    """
+    if isinstance(diasuteis, RefLookup):
+        return diasuteis
+    return dias_uteis_lookup(diasuteis)
+
+
+def apply_dias_uteis(df_base: pd.DataFrame, du: Optional[RefLookup]) -> pd.DataFrame:
+    """Aplica o lookup de ``dias_uteis_table`` à base (NaN onde não houver)."""
     df_base = df_base.copy()
-    if "SINDICATO" in df_base.columns:
-        df_base["SINDICATO_NOME"] = df_base["SINDICATO"].astype(str).str.upper().str.strip()
-        df_base = df_base.merge(du, on="SINDICATO_NOME", how="left")
-        # se não encontrar DIAS_UTEIS no merge, ficará NaN — ok
-    else:
-        df_base["DIAS_UTEIS"] = np.nan
+    df_base["DIAS_UTEIS"] = _dias_uteis(df_base, du)
     return df_base
 
 
+def _dias_uteis(df_base: pd.DataFrame, du: Optional[RefLookup]):
+    if du is not None and "SINDICATO" in df_base.columns:
+        # se não encontrar o sindicato, fica NaN — ok
+        return du.map(df_base["SINDICATO"].astype(str).str.upper().str.strip())
+    return np.nan
+
+
+def map_dias_uteis(df_base: pd.DataFrame, diasuteis: Optional[pd.DataFrame]) -> pd.DataFrame:
+    """Mapeia DIAS_UTEIS por sindicato. Se diasuteis for inválido, mantém NaN."""
+    return apply_dias_uteis(df_base, dias_uteis_table(diasuteis))
+
+
 def infer_uf_from_sindicato(s: str) -> Optional[str]:
-    t = str(s).upper().strip()
-    for uf in UF_LIST:
-        # checagens mais robustas para capturar variações em strings
-        if f" {uf} " in f" {t} " or t.startswith(uf + " ") or t.startswith("SINDPD " + uf) or f"- {uf} " in t:
-            return uf
-    return None
+    return uf_from_sindicato(str(s))
 
 
 def prorate_by_admission(base_days: int, adm_dt: Optional[pd.Timestamp]) -> int:
@@ -124,70 +206,89 @@ def prorate_by_admission(base_days: int, adm_dt: Optional[pd.Timestamp]) -> int:
     return min(base_days, prorated)
 
 
-def compute_layout(ativos, deslig, adm, afast, aprendiz, estagio,
-                   diasuteis, sind_valor) -> pd.DataFrame:
-    """Fluxo principal para construir o layout de VR."""
-    # normalização: reatribui os dfs normalizados
-    ativos = normalize_matricula(ativos) if ativos is not None else None
-    deslig = normalize_matricula(deslig) if deslig is not None else None
-    adm = normalize_matricula(adm) if adm is not None else None
-    afast = normalize_matricula(afast) if afast is not None else None
-    aprendiz = normalize_matricula(aprendiz) if aprendiz is not None else None
-    estagio = normalize_matricula(estagio) if estagio is not None else None
-
-    excl = build_exclusion_set(deslig, afast, aprendiz, estagio)
-
-    if ativos is None:
-        # nada para processar
-        return pd.DataFrame(columns=["MATRICULA","EMPRESA","TITULO DO CARGO","SINDICATO","UF_INFERIDA",
-                                     "DIAS_UTEIS","ADMISSÃO","DIAS_COMPRAR","VR_DIA","VR_TOTAL"])
-
-    base = ativos.copy()
-    base = exclude_by_cargo(base)
-    # garantir que MATRICULA está string e strip antes de isin
-    if "MATRICULA" in base.columns:
-        base["MATRICULA"] = base["MATRICULA"].astype(str).str.strip().replace({"nan": np.nan})
-        base = base.loc[~base["MATRICULA"].isin(excl)].copy()
-
-    # Dias úteis por sindicato
-    base = map_dias_uteis(base, diasuteis)
-
-    # Admissão: merge seguro (padroniza MATRICULA como string)
-    if adm is not None and {"MATRICULA", "ADMISSÃO"}.issubset(adm.columns):
-        adm2 = adm[["MATRICULA", "ADMISSÃO"]].copy()
+def stage_base(ativos, deslig=None, afast=None, aprendiz=None, estagio=None,
+               exterior=None) -> tuple:
+    """ATIVOS sem os cargos excluídos e sem as matrículas das fontes de exclusão.
+
+    Retorna ``(base, exclusoes)``, com a quantidade de linhas excluídas por
+    motivo (incluindo as já excluídas na leitura, ver ``load_ativos_filtrado``).
+    """
+    previas = ativos.attrs.get(EXCLUSOES_ATTR, {})
+    filtro = FiltroAtivos(deslig, afast, aprendiz, estagio, exterior)
+    base = filtro(normalize_matricula(ativos)).copy()
+    if "MATRICULA" not in base.columns:
+        return base, {}
+    return base, {motivo: previas.get(motivo, 0) + n for motivo, n in filtro.exclusoes.items()}
+
+
+def admissao_table(adm: Optional[pd.DataFrame]) -> Optional[pd.DataFrame]:
+    """MATRICULA → ADMISSÃO (datas já convertidas), ou None sem base de admissão."""
+    adm = normalize_matricula(adm)
+    if adm is None or not {"MATRICULA", "ADMISSÃO"}.issubset(adm.columns):
+        return None
+    adm2 = adm[["MATRICULA", "ADMISSÃO"]].copy()
+    if not matricula_inteira(adm2["MATRICULA"]):
         adm2["MATRICULA"] = adm2["MATRICULA"].astype(str).str.replace(r"\.0$", "", regex=True).str.strip().replace({"nan": np.nan})
-        adm2["ADMISSÃO"] = pd.to_datetime(adm2["ADMISSÃO"], errors="coerce", dayfirst=True)
-        base = base.merge(adm2, on="MATRICULA", how="left")
+    adm2["ADMISSÃO"] = pd.to_datetime(adm2["ADMISSÃO"], errors="coerce", dayfirst=True)
+    return adm2
+
+
+def valor_table(sind_valor) -> tuple:
+    """Lookup UF → VR_DIA da base sindicato x valor e o valor de fallback (mediana).
+
+    Aceita também um ``RefLookup`` já construído. Retorna ``(None, 0.0)`` se a
+    base não tiver ESTADO e VALOR.
+    """
+    sv = sind_valor if isinstance(sind_valor, RefLookup) else valor_lookup(sind_valor)
+    if sv is None:
+        return None, 0.0
+    return sv, sv.fallback
+
+
+def finish_layout(base: pd.DataFrame, du, adm2, sv, vr_dia_fallback, exclusoes: dict,
+                  feriados: bool = False, period_start=None, period_end=None) -> pd.DataFrame:
+    """Etapas finais sobre a base já filtrada: dias úteis, admissão, UF,
+    prorrateio e VR (ver ``compute_layout``).
+
+    ``du`` e ``sv`` são ``RefLookup`` (de ``dias_uteis_table``/``valor_table``);
+    ``base`` ganha as colunas no lugar, sem cópias da base inteira.
+    """
+    period_start = pd.Timestamp(period_start) if period_start is not None else PERIOD_START
+    period_end = pd.Timestamp(period_end) if period_end is not None else PERIOD_END
+
+    # Dias úteis por sindicato (lookup indexado, sem merge: a base é alterada no lugar)
+    base["DIAS_UTEIS"] = _dias_uteis(base, du)
+
+    # Admissão: merge seguro (MATRICULA da admissão no mesmo tipo da base)
+    if adm2 is not None:
+        base = base.merge(alinhar_matricula(adm2, base["MATRICULA"]), on="MATRICULA", how="left")
     else:
         base["ADMISSÃO"] = pd.NaT
 
-    # Prorrateio
-    total_bdays = len(pd.bdate_range(PERIOD_START, PERIOD_END, freq="C"))
-    base["DIAS_UTEIS"] = base["DIAS_UTEIS"].fillna(total_bdays).astype(int)
-    base["DIAS_COMPRAR"] = base.apply(lambda r: prorate_by_admission(int(r["DIAS_UTEIS"]), r.get("ADMISSÃO", pd.NaT)), axis=1)
-
     # UF inferida
     if "SINDICATO" in base.columns:
-        base["UF_INFERIDA"] = base["SINDICATO"].astype(str).apply(infer_uf_from_sindicato)
+        base["UF_INFERIDA"] = resolve_uf(base["SINDICATO"])
     else:
         base["UF_INFERIDA"] = None
 
+    # Prorrateio (vetorizado: calendário do período calculado uma única vez). Só por
+    # admissão: todo DESLIGADO já saiu em stage_base, então não há DATA DEMISSÃO a aplicar
+    if feriados:
+        municipio = base["MUNICIPIO"] if "MUNICIPIO" in base.columns else None
+        total_bdays = dias_uteis_por_local(base["UF_INFERIDA"], period_start, period_end, municipio)
+        base["DIAS_UTEIS"] = base["DIAS_UTEIS"].fillna(pd.Series(total_bdays, index=base.index)).astype(int)
+        base["DIAS_COMPRAR"] = prorate_by_local(base["DIAS_UTEIS"], period_start, period_end,
+                                                base["UF_INFERIDA"], municipio,
+                                                admissao=base.get("ADMISSÃO"))
+    else:
+        total_bdays = int(count_bdays(period_start, period_end))
+        base["DIAS_UTEIS"] = base["DIAS_UTEIS"].fillna(total_bdays).astype(int)
+        base["DIAS_COMPRAR"] = prorate_series(base["DIAS_UTEIS"], period_start, period_end,
+                                              admissao=base.get("ADMISSÃO"))
+
     # VR por estado (sind_valor)
-    vr_dia_fallback = 0.0
-    if sind_valor is not None and {"ESTADO", "VALOR"}.issubset(sind_valor.columns):
-        sv = sind_valor.rename(columns={"ESTADO": "UF", "VALOR": "VR_DIA"}).copy()
-        sv["UF"] = sv["UF"].astype(str).str.upper().str.strip()
-        sv["VR_DIA"] = pd.to_numeric(sv["VR_DIA"], errors="coerce")
-        # pick a median only among non-null
-        if sv["VR_DIA"].dropna().shape[0] > 0:
-            vr_dia_fallback = sv["VR_DIA"].median()
-        else:
-            vr_dia_fallback = 0.0
-        # merge e depois dropar a coluna UF redundante
-        base = base.merge(sv, left_on="UF_INFERIDA", right_on="UF", how="left")
-        if "UF" in base.columns:
-            # manter UF_INFERIDA e remover UF criado pelo merge
-            base = base.drop(columns=["UF"])
+    if sv is not None:
+        base["VR_DIA"] = sv.map(base["UF_INFERIDA"])
     else:
         base["VR_DIA"] = np.nan
 
@@ -201,14 +302,47 @@ def compute_layout(ativos, deslig, adm, afast, aprendiz, estagio,
         if c not in base.columns:
             base[c] = np.nan
 
-    out_cols = ["MATRICULA", "EMPRESA", "TITULO DO CARGO", "SINDICATO", "UF_INFERIDA",
-                "DIAS_UTEIS", "ADMISSÃO", "DIAS_COMPRAR", "VR_DIA", "VR_TOTAL"]
     # seleciona apenas colunas existentes no DataFrame resultante; completa faltantes com NaN
-    for c in out_cols:
+    for c in LAYOUT_COLS:
         if c not in base.columns:
             base[c] = np.nan
 
-    return base[out_cols].sort_values(["EMPRESA", "SINDICATO", "MATRICULA"]).reset_index(drop=True)
+    layout = base[LAYOUT_COLS].sort_values(["EMPRESA", "SINDICATO", "MATRICULA"]).reset_index(drop=True)
+    layout.attrs["exclusoes"] = exclusoes
+    return layout
+
+
+def compute_layout(ativos, deslig, adm, afast, aprendiz, estagio,
+                   diasuteis, sind_valor, feriados: bool = False, exterior=None,
+                   period_start=None, period_end=None) -> pd.DataFrame:
+    """Fluxo principal para construir o layout de VR.
+
+    ``period_start``/``period_end`` definem o período de compra (padrão:
+    PERIOD_START/PERIOD_END).
+
+    Com ``feriados=True`` o prorrateio e o DIAS_UTEIS de quem não está na base
+    de dias úteis usam o calendário com feriados nacionais, da UF inferida e do
+    município (coluna MUNICIPIO, se existir).
+
+    A quantidade de linhas excluídas por motivo fica em ``layout.attrs["exclusoes"]``.
+    As etapas (``stage_base``, ``dias_uteis_table``, ``admissao_table``,
+    ``valor_table`` e ``finish_layout``) também podem ser chamadas em separado.
+    """
+    if ativos is None:
+        # nada para processar
+        return pd.DataFrame(columns=LAYOUT_COLS)
+
+    with etapa("stage_base", ativos) as e:
+        base, exclusoes = stage_base(ativos, deslig, afast, aprendiz, estagio, exterior)
+        e.saida = base
+    with etapa("referencias"):
+        sv, vr_dia_fallback = valor_table(sind_valor)
+        du, adm2 = dias_uteis_table(diasuteis), admissao_table(adm)
+    with etapa("finish_layout", base) as e:
+        layout = finish_layout(base, du, adm2, sv, vr_dia_fallback, exclusoes,
+                               feriados=feriados, period_start=period_start, period_end=period_end)
+        e.saida = layout
+    return layout
 
 
 def validate(df: pd.DataFrame) -> list[str]:
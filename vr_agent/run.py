@@ -1,47 +1,85 @@
+import argparse
+import asyncio
+import json
+import logging
+import sys
 from pathlib import Path
-from google.adk.runners import InMemoryRunner
-from google.genai.types import Content, Part
-from vr_agent.agent import root_agent
 
-if __name__ == "__main__":
-    # Configuração do agente
-    runner = InMemoryRunner(root_agent)
-    session = runner.session_service().create_session(root_agent.name, "user").blocking_get()
+from vr_agent.pipeline import ARQUIVOS_PADRAO, SAIDA_PADRAO, executar
+
+# Uso:
+#   python -m vr_agent.run                         → pipeline direto (sem LLM), com tempos por etapa
+#   python -m vr_agent.run --perguntar "texto"     → pergunta livre, respondida pelo agente
+
+
+def perguntar_agente(pergunta: str) -> None:
+    """Envia uma pergunta livre ao agente (ADK) e imprime as respostas."""
+    from google.adk.runners import InMemoryRunner
+    from google.genai.types import Content, Part
+    from vr_agent.agent import root_agent
+
+    async def _run():
+        runner = InMemoryRunner(root_agent)
+        session = await runner.session_service.create_session(app_name=runner.app_name, user_id="user")
+        async for ev in runner.run_async(
+            user_id="user",
+            session_id=session.id,
+            new_message=Content(role="user", parts=[Part(text=pergunta)]),
+        ):
+            if ev.content and ev.content.parts:
+                for part in ev.content.parts:
+                    if part.text:
+                        print(part.text)
+
+    asyncio.run(_run())
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Gera o layout de compra VR/VA")
+    parser.add_argument("--base-dir", default="./data", help="pasta das planilhas (padrão: ./data)")
+    parser.add_argument("--saida", default=SAIDA_PADRAO, help="arquivo de saída dentro de --base-dir")
+    parser.add_argument("--arquivos", help="JSON com o mapeamento base → arquivo (padrão: nomes usuais)")
+    parser.add_argument("--formats", help="formatos extras, ex.: csv,parquet (padrão: VR_AGENT_OUTPUT_FORMATS)")
+    parser.add_argument("--workers", type=int, help="leitura paralela das planilhas")
+    parser.add_argument("--filtrar-ativos", action="store_true",
+                        help="pré-filtra ATIVOS na leitura (cargos e fontes de exclusão, como em rules_old)")
+    parser.add_argument("--situacao", help='com --filtrar-ativos, só DESC. SITUACAO igual a este valor (ex.: "Trabalhando")')
+    parser.add_argument("--json", action="store_true", help="imprime o resultado em JSON")
+    parser.add_argument("--perguntar", metavar="TEXTO", help="pergunta livre para o agente (usa o LLM)")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s [%(levelname)s] %(name)s - %(message)s")
+
+    if args.perguntar:
+        perguntar_agente(args.perguntar)
+        return 0
 
     # Diretório base seguro e arquivos
-    base_dir = Path("./data")  # relativo ao projeto, não root
-    arquivos = {
-        "ATIVOS": "ATIVOS.xlsx",
-        "DESLIGADOS": "DESLIGADOS.xlsx",
-        "ADMISSAO": "ADMISSÃO ABRIL.xlsx",
-        "AFASTAMENTOS": "AFASTAMENTOS.xlsx",
-        "APRENDIZ": "APRENDIZ.xlsx",
-        "ESTAGIO": "ESTÁGIO.xlsx",
-        "BASE_DIAS_UTEIS": "Base dias uteis.xlsx",
-        "BASE_SINDICATO_VALOR": "Base sindicato x valor.xlsx"
-    }
-    saida_arquivo = "VR_VA_COMPRA_05_2025_ADK.xlsx"
+    base_dir = Path(args.base_dir)  # relativo ao projeto, não root
+    arquivos = json.loads(args.arquivos) if args.arquivos else ARQUIVOS_PADRAO
 
     # Validação automática: checar se todos os arquivos existem
     missing_files = [f for f in arquivos.values() if not (base_dir / f).exists()]
     if missing_files:
-        print("⚠️ Erro: os seguintes arquivos não foram encontrados em './data':")
+        print(f"⚠️ Erro: os seguintes arquivos não foram encontrados em '{base_dir}':")
         for f in missing_files:
             print(f"  - {f}")
-        exit(1)  # interrompe execução
-
-    # Prompt textual para o agente (continua via ADK)
-    prompt_text = (
-        "Gerar layout VR. Base dir: ./data. "
-        f"Arquivos: {arquivos}. "
-        f"Saída: {saida_arquivo}"
-    )
-
-    # Executa o agente
-    events = runner.run_async("user", session.id(), Content.from_parts(Part.fromText(prompt_text)))
-    for ev in events.blocking_iterable():
-        print(ev.stringify_content())
-
-    # Alternativa opcional: chamar a função Python diretamente (debug)
-    # result = root_agent.tools[0](str(base_dir), saida_arquivo, arquivos)
-    # print(result)
+        return 1  # interrompe execução
+
+    formats = args.formats.split(",") if args.formats is not None else None
+    result = executar(str(base_dir), args.saida, arquivos, formats=formats, workers=args.workers,
+                      filtrar_ativos=args.filtrar_ativos, situacao=args.situacao)
+
+    if args.json:
+        print(json.dumps(result, ensure_ascii=False, indent=2))
+    else:
+        print(f"✅ {result['linhas']} linhas → {result['arquivo']}")
+        for aviso in result["avisos"]:
+            print(f"⚠️ {aviso}")
+        for etapa, segundos in result["tempos"].items():
+            print(f"⏱️ {etapa:<15} {segundos:8.3f}s")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
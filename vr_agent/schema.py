@@ -0,0 +1,164 @@
+import hashlib
+import json
+import logging
+import os
+from typing import Optional
+
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+# "0"/"false"/"off" desliga a tipagem na leitura (bases voltam como o read_excel entrega)
+SCHEMA_ENV = "VR_AGENT_SCHEMA"
+# Incrementar sempre que a conversão de algum tipo mudar (invalida o cache)
+SCHEMA_VERSION = 1
+
+# Registro das coerções em df.attrs
+COERCAO_ATTR = "coercao"
+
+# Tipos declarados
+MATRICULA = "matricula"  # int32 (int64 se não couber); texto normalizado se houver não numéricos ou vazios
+CATEGORIA = "categoria"  # category
+DATA = "data"            # datetime64 (texto lido com dayfirst)
+VALOR = "valor"          # float32
+MOEDA = "moeda"          # float64: entra em contas de VR, sem perder precisão
+INTEIRO = "inteiro"      # menor inteiro que couber (float32 se houver vazios)
+
+# Schema por base (mesmas chaves de ``load_bases``); colunas ausentes são ignoradas
+SCHEMAS = {
+    "ativos": {"MATRICULA": MATRICULA, "EMPRESA": CATEGORIA, "TITULO DO CARGO": CATEGORIA,
+               "DESC. SITUACAO": CATEGORIA, "SINDICATO": CATEGORIA},
+    "deslig": {"MATRICULA": MATRICULA, "DATA DEMISSÃO": DATA, "COMUNICADO DE DESLIGAMENTO": CATEGORIA},
+    "adm": {"MATRICULA": MATRICULA, "ADMISSÃO": DATA, "CARGO": CATEGORIA},
+    "afast": {"MATRICULA": MATRICULA, "DESC. SITUACAO": CATEGORIA},
+    "aprendiz": {"MATRICULA": MATRICULA, "TITULO DO CARGO": CATEGORIA},
+    "estagio": {"MATRICULA": MATRICULA, "TITULO DO CARGO": CATEGORIA},
+    "ferias": {"MATRICULA": MATRICULA, "DESC. SITUACAO": CATEGORIA, "DIAS DE FÉRIAS": INTEIRO},
+    "exterior": {"CADASTRO": MATRICULA, "MATRICULA": MATRICULA, "VALOR": VALOR},
+    "sind_valor": {"ESTADO": CATEGORIA, "VALOR": MOEDA},
+}
+
+_EXEMPLOS = 5
+
+# Matrícula numérica canônica (sem zeros à esquerda, cabe em int64): vira inteiro
+MATRICULA_CANONICA = r"0|[1-9]\d{0,17}"
+
+
+def schema_enabled() -> bool:
+    return os.getenv(SCHEMA_ENV, "1").strip().lower() not in {"0", "false", "no", "off"}
+
+
+def schema_digest(schema: dict) -> str:
+    """Identificador curto do schema (entra na chave do cache)."""
+    texto = json.dumps({"v": SCHEMA_VERSION, "schema": schema}, sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(texto.encode()).hexdigest()[:8]
+
+
+def _norm_matricula(s: pd.Series) -> pd.Series:
+    """Mesma normalização de ``rules_old.normalize_matricula`` (sem ``.0``, strip, NaN preservado)."""
+    t = s.astype(str).str.replace(r"\.0$", "", regex=True).str.strip()
+    return t.where(s.notna() & ~t.isin(["nan", "None"]), np.nan)
+
+
+def _int_compacto(valores: np.ndarray) -> np.ndarray:
+    info = np.iinfo(np.int32)
+    if len(valores) == 0 or (valores.min() >= info.min and valores.max() <= info.max):
+        return valores.astype(np.int32)
+    return valores.astype(np.int64)
+
+
+def _matricula(s: pd.Series) -> tuple:
+    if pd.api.types.is_integer_dtype(s) and not pd.api.types.is_extension_array_dtype(s):
+        return _int_compacto(s.to_numpy()), None
+    texto = _norm_matricula(s)
+    nulos = int(texto.isna().sum())
+    canonico = texto.str.fullmatch(MATRICULA_CANONICA).eq(True)
+    if nulos == 0 and canonico.all():
+        return _int_compacto(texto.astype(np.int64).to_numpy()), None
+    # vazios ou não numéricos: texto normalizado (object, NaN nos vazios), como o resto do fluxo espera
+    motivo = []
+    if nulos:
+        motivo.append(f"{nulos} vazios")
+    fora = texto.notna() & ~canonico
+    if fora.any():
+        motivo.append(f"{int(fora.sum())} não numéricos")
+    return texto.astype(object), {"convertido": "texto", "motivo": ", ".join(motivo),
+                                  "exemplos": texto[fora].head(_EXEMPLOS).tolist()}
+
+
+def _categoria(s: pd.Series) -> tuple:
+    if isinstance(s.dtype, pd.CategoricalDtype):
+        return s, None
+    aviso = None
+    if s.dtype == object:
+        tipos = {type(v) for v in s.dropna().to_numpy()}
+        if len(tipos) > 1:
+            # int + str na mesma coluna: tudo vira texto (o Arrow não aceita categorias misturadas)
+            s = s.where(s.isna(), s.astype(str))
+            aviso = {"convertido": "texto", "motivo": "tipos misturados: " + ", ".join(sorted(t.__name__ for t in tipos))}
+    elif pd.api.types.is_float_dtype(s) and s.notna().all() and (s % 1 == 0).all():
+        s = s.astype(np.int64)  # ex.: EMPRESA lida como 1410.0
+    return s.astype("category"), aviso
+
+
+def _erros(original: pd.Series, convertido: pd.Series) -> Optional[dict]:
+    falhou = original.notna() & convertido.isna()
+    if not falhou.any():
+        return None
+    return {"erros": int(falhou.sum()), "exemplos": [str(v) for v in original[falhou].head(_EXEMPLOS)]}
+
+
+def _data(s: pd.Series) -> tuple:
+    if pd.api.types.is_datetime64_any_dtype(s):
+        return s, None
+    convertido = pd.to_datetime(s, errors="coerce", dayfirst=True)
+    return convertido, _erros(s, convertido)
+
+
+def _numero(s: pd.Series, dtype) -> tuple:
+    convertido = pd.to_numeric(s, errors="coerce")
+    return convertido.astype(dtype), _erros(s, convertido)
+
+
+def _inteiro(s: pd.Series) -> tuple:
+    convertido = pd.to_numeric(s, errors="coerce")
+    erros = _erros(s, convertido)
+    if convertido.notna().all() and (convertido % 1 == 0).all():
+        return pd.to_numeric(convertido.astype(np.int64), downcast="integer"), erros
+    return convertido.astype(np.float32), erros
+
+
+CONVERSORES = {
+    MATRICULA: _matricula,
+    CATEGORIA: _categoria,
+    DATA: _data,
+    VALOR: lambda s: _numero(s, np.float32),
+    MOEDA: lambda s: _numero(s, np.float64),
+    INTEIRO: _inteiro,
+}
+
+
+def aplicar_schema(df: pd.DataFrame, schema: dict, base: str = "") -> pd.DataFrame:
+    """Converte as colunas declaradas em ``schema`` para os tipos compactos.
+
+    Valores que não puderam ser convertidos (viraram NaN/NaT) e colunas que
+    caíram para texto ficam em ``df.attrs["coercao"]`` e no log.
+    """
+    if df is None:
+        return df
+    df = df.copy(deep=False)
+    antes = df.memory_usage(deep=True).sum()
+    relatorio = []
+    for coluna, tipo in schema.items():
+        if coluna not in df.columns:
+            continue
+        convertido, problema = CONVERSORES[tipo](df[coluna])
+        df[coluna] = convertido
+        if problema:
+            relatorio.append({"base": base, "coluna": coluna, "tipo": tipo, **problema})
+            logger.warning(f"⚠️ Schema {base}.{coluna} ({tipo}): {problema}")
+    depois = df.memory_usage(deep=True).sum()
+    logger.info(f"🧱 Schema aplicado em {base or 'base'}: {antes / 2**20:.2f} → {depois / 2**20:.2f} MiB")
+    df.attrs[COERCAO_ATTR] = relatorio
+    return df
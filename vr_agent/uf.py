@@ -0,0 +1,77 @@
+import re
+import unicodedata
+from functools import lru_cache
+from typing import Optional
+
+import numpy as np
+import pandas as pd
+
+UF_LIST = ["AC","AL","AP","AM","BA","CE","DF","ES","GO","MA","MT","MS","MG",
+           "PA","PB","PR","PE","PI","RJ","RN","RS","RO","RR","SC","SP","SE","TO"]
+
+UF_NOMES = {
+    "AC": "Acre", "AL": "Alagoas", "AP": "Amapá", "AM": "Amazonas", "BA": "Bahia",
+    "CE": "Ceará", "DF": "Distrito Federal", "ES": "Espírito Santo", "GO": "Goiás",
+    "MA": "Maranhão", "MT": "Mato Grosso", "MS": "Mato Grosso do Sul", "MG": "Minas Gerais",
+    "PA": "Pará", "PB": "Paraíba", "PR": "Paraná", "PE": "Pernambuco", "PI": "Piauí",
+    "RJ": "Rio de Janeiro", "RN": "Rio Grande do Norte", "RS": "Rio Grande do Sul",
+    "RO": "Rondônia", "RR": "Roraima", "SC": "Santa Catarina", "SP": "São Paulo",
+    "SE": "Sergipe", "TO": "Tocantins",
+}
+
+# Sindicato (prefixo) → estado, como no prompt do agente; tem prioridade sobre a inferência
+SINDICATO_UF_OVERRIDES = {
+    "SITEPD PR": "Paraná",
+    "SINDPD RJ": "Rio de Janeiro",
+    "SINDPD SP": "São Paulo",
+    "SINDPPD RS": "Rio Grande do Sul",
+}
+
+_ALT = "|".join(UF_LIST)
+# mesmas regras da checagem antiga: sigla isolada por espaços ou "SINDPD <UF>" no início
+_UF_RE = re.compile(rf"^SINDPD (?P<prefixo>{_ALT})|(?:^| )(?P<token>{_ALT})(?= |$)")
+_ORDEM = {uf: i for i, uf in enumerate(UF_LIST)}
+
+
+def _sem_acento(texto: str) -> str:
+    texto = unicodedata.normalize("NFKD", str(texto))
+    return "".join(c for c in texto if not unicodedata.combining(c)).upper().strip()
+
+
+_NOME_PARA_UF = {_sem_acento(nome): uf for uf, nome in UF_NOMES.items()}
+
+
+def uf_code(estado) -> Optional[str]:
+    """Sigla da UF a partir da sigla ou do nome do estado ("Paraná", "PARANA", "PR")."""
+    t = _sem_acento(estado)
+    if t in _ORDEM:
+        return t
+    return _NOME_PARA_UF.get(t)
+
+
+_OVERRIDES = {k.upper(): uf_code(v) for k, v in SINDICATO_UF_OVERRIDES.items()}
+_OVERRIDE_RE = re.compile(
+    "^(" + "|".join(re.escape(k) for k in sorted(_OVERRIDES, key=len, reverse=True)) + r")(?![A-Z0-9])"
+)
+
+
+@lru_cache(maxsize=4096)
+def uf_from_sindicato(s: str) -> Optional[str]:
+    """UF de um sindicato: tabela de overrides e, se não houver, a regex das siglas.
+
+    Entre várias siglas no texto vale a primeira de ``UF_LIST``, como antes.
+    """
+    t = str(s).upper().strip()
+    override = _OVERRIDE_RE.match(t)
+    if override:
+        return _OVERRIDES[override.group(1)]
+    achadas = [m.group("prefixo") or m.group("token") for m in _UF_RE.finditer(t)]
+    return min(achadas, key=_ORDEM.__getitem__) if achadas else None
+
+
+def resolve_uf(sindicato: pd.Series) -> pd.Series:
+    """UF por linha, resolvendo só os sindicatos distintos e propagando pelos códigos."""
+    codes, uniques = pd.factorize(sindicato.astype(str), use_na_sentinel=True)
+    ufs = np.array([uf_from_sindicato(u) for u in uniques] + [None], dtype=object)
+    # código -1 (ausente) aponta para o None do fim
+    return pd.Series(ufs[codes], index=sindicato.index, dtype=object)